@@ -33,7 +33,7 @@ export const CSVUploader: React.FC<CSVUploaderProps> = ({
       setIsDragging(false);
       
       const file = e.dataTransfer.files[0];
-      if (file && file.name.endsWith('.csv')) {
+      if (file && /\.(csv|csv\.gz|csv\.zst|zip)$/i.test(file.name)) {
         onFileSelect(file);
       }
     },
@@ -70,7 +70,7 @@ export const CSVUploader: React.FC<CSVUploaderProps> = ({
       >
         <input
           type="file"
-          accept=".csv"
+          accept=".csv,.gz,.zst,.zip"
           onChange={handleFileChange}
           className="hidden"
           disabled={isLoading}
@@ -1,4 +1,4 @@
-import { useState, useCallback } from 'react';
+import { useState, useCallback, useEffect } from 'react';
 import { EquipmentData, DataSummary, UploadHistory, ParsedCSV } from '@/types/equipment';
 import { parseCSVFile, calculateSummary, generateSampleData } from '@/lib/csvParser';
 import axios from 'axios';
@@ -191,6 +191,37 @@ export const useEquipmentData = () => {
     }
   }, []);
 
+  // Subscribe to pushed updates instead of polling /summary/ and /history/:
+  // the server sends an event only when a dataset is created or changed
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return;
+    const source = new EventSource(`${API_BASE_URL}/events/`);
+    // The first event is the state at connect time, not a new upload
+    let initial = true;
+    source.addEventListener('update', (event) => {
+      const update = JSON.parse((event as MessageEvent).data);
+      const dataset = update.dataset;
+      if (dataset) {
+        const historyEntry: UploadHistory = {
+          id: `upload-${dataset.id}`,
+          fileName: dataset.file_name,
+          uploadedAt: new Date(dataset.uploaded_at),
+          recordCount: dataset.record_count,
+          summary: update.summary,
+        };
+        setUploadHistory((prev) => [
+          historyEntry,
+          ...prev.filter((h) => h.id !== historyEntry.id),
+        ].slice(0, MAX_HISTORY));
+        if (!initial) {
+          setSummary(update.summary);
+        }
+      }
+      initial = false;
+    });
+    return () => source.close();
+  }, []);
+
   const clearData = useCallback(() => {
     setData([]);
     setSummary(null);
@@ -12,5 +12,8 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
+# Read by core.database: persistent connections are per thread, and under
+# ASGI every request runs in a new one
+os.environ.setdefault('DJANGO_ASGI', 'true')
 
 application = get_asgi_application()
@@ -1,14 +1,135 @@
 # Custom authentication that doesn't trigger browser popup
 import base64
-from django.contrib.auth import authenticate
+import hashlib
+import hmac
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
+from django.core import signing
+from django.utils.crypto import constant_time_compare
 from rest_framework.authentication import BaseAuthentication
 from rest_framework.exceptions import AuthenticationFailed
 
+from core.instrumentation import metrics
+
+TOKEN_SALT = 'core.authentication.access-token'
+
+
+def issue_token(user):
+    """
+    Return a signed, expiring bearer token for ``user``.
+
+    The token carries the user id and a fingerprint of the password hash, so
+    changing the password revokes it. Checking it is one HMAC, not a
+    password hash.
+    """
+    return signing.dumps({'uid': user.pk, 'pwd': user.get_session_auth_hash()}, salt=TOKEN_SALT)
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """Authenticates ``Authorization: Bearer <token>`` issued by LoginView."""
+
+    def authenticate(self, request):
+        auth_header = request.META.get('HTTP_AUTHORIZATION', '')
+        if not auth_header.startswith('Bearer '):
+            return None
+
+        try:
+            payload = signing.loads(
+                auth_header.split(' ', 1)[1].strip(),
+                salt=TOKEN_SALT,
+                max_age=settings.AUTH_TOKEN_MAX_AGE,
+            )
+        except signing.SignatureExpired:
+            raise AuthenticationFailed('Token expired')
+        except signing.BadSignature:
+            raise AuthenticationFailed('Invalid token')
+
+        user = get_user_model().objects.filter(pk=payload.get('uid'), is_active=True).first()
+        if user is None or not constant_time_compare(payload.get('pwd', ''), user.get_session_auth_hash()):
+            raise AuthenticationFailed('Invalid token')
+        return (user, None)
+
+    def authenticate_header(self, request):
+        return None
+
+
+class VerifiedCredentialCache:
+    """
+    Bounded, TTL-evicted map of verified Basic credentials to user ids.
+
+    Keys are an HMAC of the raw header under SECRET_KEY, so neither the
+    password nor a plain hash of it is kept in memory.
+    """
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(header):
+        return hmac.new(settings.SECRET_KEY.encode(), header.encode(), hashlib.sha256).hexdigest()
+
+    def get(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_rate': self.hits / lookups if lookups else 0.0,
+        }
+
+
+credential_cache = VerifiedCredentialCache(settings.AUTH_CACHE_SIZE, settings.AUTH_CACHE_TTL)
+metrics.register_counters(
+    lambda: {'auth_cache_hits_total': credential_cache.hits, 'auth_cache_misses_total': credential_cache.misses},
+    {
+        'auth_cache_hits_total': 'Basic credentials accepted from the verified credential cache.',
+        'auth_cache_misses_total': 'Basic credentials not in the cache, checked with a full password hash.',
+    },
+)
+
 
 class BasicAuthenticationNoBrowserPopup(BaseAuthentication):
     """
     HTTP Basic authentication without WWW-Authenticate header.
     This prevents the browser from showing its native auth popup.
+
+    Successful checks are remembered in ``credential_cache`` for
+    AUTH_CACHE_TTL seconds, so polling clients do not pay for a full
+    password hash on every request. Its hits and misses are exported on
+    ``/api/metrics/``.
     """
 
     def authenticate(self, request):
@@ -17,6 +138,16 @@ class BasicAuthenticationNoBrowserPopup(BaseAuthentication):
         if not auth_header.startswith('Basic '):
             return None
         
+        key = credential_cache.key(auth_header)
+        cached = credential_cache.get(key)
+        if cached is not None:
+            user_id, auth_hash = cached
+            user = get_user_model().objects.filter(pk=user_id, is_active=True).first()
+            # A changed password invalidates the cached verification
+            if user is not None and constant_time_compare(user.get_session_auth_hash(), auth_hash):
+                return (user, None)
+            credential_cache.discard(key)
+
         try:
             encoded_credentials = auth_header.split(' ', 1)[1]
             decoded_credentials = base64.b64decode(encoded_credentials).decode('utf-8')
@@ -29,6 +160,7 @@ class BasicAuthenticationNoBrowserPopup(BaseAuthentication):
         if user is None:
             raise AuthenticationFailed('Invalid username or password')
         
+        credential_cache.set(key, (user.pk, user.get_session_auth_hash()))
         return (user, None)
 
     def authenticate_header(self, request):
@@ -0,0 +1,132 @@
+"""
+Database configuration: the ``DATABASES['default']`` entry, per-connection
+SQLite tuning and retry of writes that hit a locked database.
+
+SQLite (the default) runs in WAL mode so dashboard reads are not blocked by
+an upload's writes, and waits for locks instead of failing at once. With
+``DATABASE_URL`` set (e.g. Postgres on Neon) connections are pooled or kept
+alive to match.
+"""
+import functools
+import importlib.util
+import logging
+import os
+import random
+import time
+
+import dj_database_url
+import django
+from django.conf import settings
+from django.db import OperationalError, connection
+
+logger = logging.getLogger(__name__)
+
+# Applied to every new SQLite connection. journal_mode is stored in the file,
+# the others are per connection.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    # Durable at checkpoints; WAL keeps the database consistent either way
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+}
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def database_config(base_dir):
+    """
+    Return the default database settings.
+
+    ``DATABASE_URL`` selects the server; otherwise SQLite at
+    ``base_dir/db.sqlite3``. Tunables come from ``DB_*`` environment
+    variables.
+    """
+    # Django runs each ASGI request's sync code in a new thread, so a
+    # persistent connection would be left open per request; without a pool
+    # connections are closed after each request there
+    asgi = os.environ.get('DJANGO_ASGI', 'false').lower() == 'true'
+    conn_max_age = _env_int('DB_CONN_MAX_AGE', 0 if asgi else 600)
+    # transaction_mode and connection pools are Django 5.1+ options; older
+    # versions pass unknown OPTIONS straight to the driver, which rejects them
+    supports_new_options = django.VERSION >= (5, 1)
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        options = {
+            # Seconds to wait for a lock before "database is locked"
+            'timeout': _env_int('DB_BUSY_TIMEOUT', 20),
+        }
+        if supports_new_options:
+            # Take the write lock when a transaction starts, so two writers
+            # queue on the busy timeout instead of deadlocking on a lock
+            # upgrade (retry_on_locked covers older versions)
+            options['transaction_mode'] = 'IMMEDIATE'
+        return {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': base_dir / 'db.sqlite3',
+            'CONN_MAX_AGE': conn_max_age,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': options,
+        }
+
+    config = dj_database_url.parse(url, conn_max_age=conn_max_age, conn_health_checks=True)
+    if config['ENGINE'] == 'django.db.backends.postgresql':
+        options = config.setdefault('OPTIONS', {})
+        options.setdefault('connect_timeout', _env_int('DB_CONNECT_TIMEOUT', 10))
+        # psycopg 3 with psycopg_pool: a pool per worker process, which also
+        # works under ASGI where persistent connections are not shared
+        # across the threads serving requests
+        if supports_new_options and importlib.util.find_spec('psycopg_pool') and importlib.util.find_spec('psycopg'):
+            options['pool'] = {
+                'min_size': _env_int('DB_POOL_MIN_SIZE', 1),
+                'max_size': _env_int('DB_POOL_MAX_SIZE', 10),
+                'timeout': _env_int('DB_POOL_TIMEOUT', 10),
+            }
+            config['CONN_MAX_AGE'] = 0
+    return config
+
+
+def configure_connection(sender, connection, **kwargs):
+    """``connection_created`` receiver applying the SQLite PRAGMAs."""
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = {
+        **SQLITE_PRAGMAS,
+        # Bytes of the file read through mmap instead of read() calls
+        'mmap_size': settings.SQLITE_MMAP_SIZE,
+        # Negative: KiB of page cache per connection
+        'cache_size': -settings.SQLITE_CACHE_KIB,
+    }
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def is_locked(error):
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def retry_on_locked(func):
+    """
+    Retry ``func`` with jittered exponential backoff while SQLite reports
+    the database as locked, up to ``DB_WRITE_RETRIES`` times.
+
+    For short write units only: ``func`` must be safe to run again and is
+    not retried inside an outer transaction, where the lock error has
+    already broken the transaction.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        retries = settings.DB_WRITE_RETRIES
+        for attempt in range(retries + 1):
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as e:
+                if attempt == retries or not is_locked(e) or connection.in_atomic_block:
+                    raise
+                delay = min(settings.DB_WRITE_BACKOFF * 2 ** attempt, settings.DB_WRITE_BACKOFF_MAX)
+                logger.warning('Database locked in %s, retry %d in %.2fs', func.__qualname__, attempt + 1, delay)
+                time.sleep(delay * random.uniform(0.5, 1.5))
+    return wrapper
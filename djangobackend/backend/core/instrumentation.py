@@ -0,0 +1,339 @@
+"""
+Request instrumentation: phase timings, latency histograms and sampled
+profiles of slow requests.
+
+Code marks the phases of a request with ``span``::
+
+    with span('read_csv'):
+        chunk = next(reader)
+
+Spans of the same name add up, nested spans each count, and outside a
+request ``span`` does nothing. ``core.middleware.InstrumentationMiddleware``
+reports the phases in the ``Server-Timing`` header and records them in
+per-route histograms, which ``/api/metrics/`` serves in the Prometheus text
+format, merged across worker processes.
+"""
+import bisect
+import contextvars
+import cProfile
+import importlib.util
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Histogram bucket bounds in seconds, as in Prometheus client defaults but
+# extended to cover large uploads
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+_current = contextvars.ContextVar('request_timings', default=None)
+
+# Counter name -> HELP text, for counters registered with
+# ``MetricsRegistry.register_counters``
+COUNTER_HELP = {}
+
+
+class RequestTimings:
+    """Phase durations of one request."""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        # (phase, seconds); spans may end on executor threads, and
+        # list.append is atomic
+        self.spans = []
+
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    def phases(self):
+        totals = {}
+        for name, seconds in self.spans:
+            totals[name] = totals.get(name, 0.0) + seconds
+        return totals
+
+
+def start_request():
+    """Start timing a request; returns ``(timings, token)`` for ``end_request``."""
+    timings = RequestTimings()
+    return timings, _current.set(timings)
+
+
+def end_request(token):
+    _current.reset(token)
+
+
+@contextmanager
+def span(name):
+    """Time the block as phase ``name`` of the current request."""
+    timings = _current.get()
+    if timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings.spans.append((name, time.perf_counter() - start))
+
+
+def server_timing(phases, total):
+    """``Server-Timing`` header value (milliseconds) for a request's phases."""
+    entries = [f'{name};dur={seconds * 1000:.1f}' for name, seconds in phases.items()]
+    entries.append(f'total;dur={total * 1000:.1f}')
+    return ', '.join(entries)
+
+
+class Histogram:
+    __slots__ = ('counts', 'sum')
+
+    def __init__(self, counts=None, total=0.0):
+        # One count per bucket plus the +Inf overflow, not cumulative
+        self.counts = counts or [0] * (len(BUCKETS) + 1)
+        self.sum = total
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.sum += value
+
+    def merge(self, counts, total):
+        self.counts = [a + b for a, b in zip(self.counts, counts)]
+        self.sum += total
+
+
+class MetricsRegistry:
+    """
+    Request counts and latency histograms of this process.
+
+    Each process writes its snapshot to ``METRICS_DIR/<pid>.json`` at most
+    every ``METRICS_FLUSH_INTERVAL`` seconds, so whichever gunicorn worker
+    answers ``/api/metrics/`` can report the totals of all of them.
+    Snapshots of processes that are no longer running are deleted when
+    collected, so restarted workers do not count forever.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flushed = 0.0
+        self.requests = {}   # (route, method, status) -> count
+        self.durations = {}  # (route, method) -> Histogram
+        self.phases = {}     # (route, phase) -> Histogram
+        self._sources = []   # functions returning {counter name: count}
+
+    def register_counters(self, source, help):
+        """
+        Export the cumulative per-process counts ``source()`` returns, as
+        ``{name: count}``, as Prometheus counters; ``help`` maps each name
+        to its description.
+        """
+        COUNTER_HELP.update(help)
+        self._sources.append(source)
+
+    def observe(self, route, method, status, total, phases):
+        with self._lock:
+            key = (route, method, str(status))
+            self.requests[key] = self.requests.get(key, 0) + 1
+            self.durations.setdefault((route, method), Histogram()).observe(total)
+            for phase, seconds in phases.items():
+                self.phases.setdefault((route, phase), Histogram()).observe(seconds)
+
+    def snapshot(self):
+        counters = {}
+        for source in self._sources:
+            counters.update(source())
+        with self._lock:
+            return {
+                'requests': [[*key, count] for key, count in self.requests.items()],
+                'durations': [[*key, h.counts, h.sum] for key, h in self.durations.items()],
+                'phases': [[*key, h.counts, h.sum] for key, h in self.phases.items()],
+                'counters': [[name, count] for name, count in counters.items()],
+            }
+
+    def flush(self, force=False):
+        directory = settings.METRICS_DIR
+        now = time.monotonic()
+        if not directory or (not force and now - self._flushed < settings.METRICS_FLUSH_INTERVAL):
+            return
+        self._flushed = now
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f'{os.getpid()}.json')
+        with open(f'{path}.tmp', 'w') as f:
+            json.dump(self.snapshot(), f)
+        os.replace(f'{path}.tmp', path)
+
+    def collect(self):
+        """Snapshots of every process, this one included, merged."""
+        snapshots = [self.snapshot()]
+        own = f'{os.getpid()}.json'
+        directory = settings.METRICS_DIR
+        if directory and os.path.isdir(directory):
+            for name in os.listdir(directory):
+                if not name.endswith('.json') or name == own:
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    if not _running(int(name[:-len('.json')])):
+                        os.remove(path)
+                        continue
+                    with open(path) as f:
+                        snapshots.append(json.load(f))
+                except (OSError, ValueError):
+                    continue
+        return merge_snapshots(snapshots)
+
+
+def _running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass  # alive, under another user
+    return True
+
+
+def merge_snapshots(snapshots):
+    requests, durations, phases, counters = {}, {}, {}, {}
+    for snapshot in snapshots:
+        for *key, count in snapshot['requests']:
+            requests[tuple(key)] = requests.get(tuple(key), 0) + count
+        for target, rows in ((durations, snapshot['durations']), (phases, snapshot['phases'])):
+            for first, second, counts, total in rows:
+                target.setdefault((first, second), Histogram()).merge(counts, total)
+        # Snapshots written before counters were exported have none
+        for name, count in snapshot.get('counters', []):
+            counters[name] = counters.get(name, 0) + count
+    return requests, durations, phases, counters
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+
+
+def _histogram_lines(name, histograms, first, second):
+    for (a, b), histogram in sorted(histograms.items()):
+        labels = _labels(**{first: a, second: b})
+        cumulative = 0
+        for bound, count in zip([*BUCKETS, '+Inf'], histogram.counts):
+            cumulative += count
+            yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+        yield f'{name}_sum{{{labels}}} {histogram.sum!r}'
+        yield f'{name}_count{{{labels}}} {cumulative}'
+
+
+def render_prometheus(requests, durations, phases, counters=None):
+    """Merged metrics in the Prometheus text exposition format (0.0.4)."""
+    lines = [
+        '# HELP http_requests_total Requests served, by route, method and status.',
+        '# TYPE http_requests_total counter',
+    ]
+    for (route, method, status), count in sorted(requests.items()):
+        lines.append(f'http_requests_total{{{_labels(route=route, method=method, status=status)}}} {count}')
+    lines += [
+        '# HELP http_request_duration_seconds Time until the response is returned, by route and method.',
+        '# TYPE http_request_duration_seconds histogram',
+        *_histogram_lines('http_request_duration_seconds', durations, 'route', 'method'),
+        '# HELP http_request_phase_duration_seconds Time spent in each phase of a request, by route and phase.',
+        '# TYPE http_request_phase_duration_seconds histogram',
+        *_histogram_lines('http_request_phase_duration_seconds', phases, 'route', 'phase'),
+    ]
+    for name, count in sorted((counters or {}).items()):
+        lines += [
+            f'# HELP {name} {COUNTER_HELP.get(name, name)}',
+            f'# TYPE {name} counter',
+            f'{name} {count}',
+        ]
+    return '\n'.join(lines) + '\n'
+
+
+metrics = MetricsRegistry()
+
+# Profilers hook the interpreter, so one request per process is profiled at
+# a time; concurrent samples are skipped
+_profile_lock = threading.Lock()
+
+
+class SampledProfile:
+    """
+    Profile of one sampled request, kept only if the request is slow.
+
+    Uses pyinstrument when installed and selected (``PROFILER``), which
+    follows async views across awaits; otherwise cProfile, which for async
+    views sees the event loop thread only, other requests' work included.
+    """
+
+    def __init__(self, is_async):
+        if settings.PROFILER == 'pyinstrument' and importlib.util.find_spec('pyinstrument'):
+            from pyinstrument import Profiler
+
+            self.profiler = Profiler(async_mode='enabled' if is_async else 'disabled')
+            self.profiler.start()
+        else:
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+
+    def finish(self, request, route, total):
+        try:
+            if isinstance(self.profiler, cProfile.Profile):
+                self.profiler.disable()
+            else:
+                self.profiler.stop()
+        finally:
+            _profile_lock.release()
+        if total >= settings.PROFILE_SLOW_REQUESTS:
+            self.save(request, route, total)
+
+    def save(self, request, route, total):
+        directory = settings.PROFILE_DIR
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^A-Za-z0-9]+', '-', route).strip('-') or 'root'
+        stem = f'{time.strftime("%Y%m%dT%H%M%S")}-{request.method}-{slug}-{total * 1000:.0f}ms'
+        if isinstance(self.profiler, cProfile.Profile):
+            path = os.path.join(directory, f'{stem}.prof')
+            self.profiler.dump_stats(path)
+        else:
+            path = os.path.join(directory, f'{stem}.html')
+            with open(path, 'w') as f:
+                f.write(self.profiler.output_html())
+        logger.warning('Slow request %s %s took %.0f ms, profile saved to %s',
+                       request.method, request.path, total * 1000, path)
+        _prune(directory, settings.PROFILE_KEEP)
+
+
+def _prune(directory, keep):
+    paths = sorted(
+        (os.path.join(directory, name) for name in os.listdir(directory) if name.endswith(('.prof', '.html'))),
+        key=os.path.getmtime,
+    )
+    for path in paths[:-keep] if keep else []:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def start_profile(is_async=False):
+    """
+    A ``SampledProfile`` for ``PROFILE_SAMPLE_RATE`` of requests when slow
+    request profiling is on (``PROFILE_SLOW_REQUESTS`` seconds), else None.
+    """
+    if not settings.PROFILE_SLOW_REQUESTS or random.random() >= settings.PROFILE_SAMPLE_RATE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        return SampledProfile(is_async)
+    except Exception:
+        _profile_lock.release()
+        raise
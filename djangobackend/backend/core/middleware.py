@@ -0,0 +1,95 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from core.instrumentation import end_request, metrics, server_timing, start_profile, start_request
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoise that also runs natively under ASGI.
+
+    WhiteNoise's middleware is sync-only, so Django would run every request
+    through it on the single shared sync thread, serializing async views.
+    Here only a static file hit leaves the event loop; everything else is
+    passed straight to the async handler.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, *args, **kwargs):
+        super().__init__(get_response, *args, **kwargs)
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            # Looks the file up on disk (DEBUG only)
+            static_file = await sync_to_async(self.find_file, thread_sensitive=False)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve, thread_sensitive=False)(static_file, request)
+        return await self.get_response(request)
+
+
+class InstrumentationMiddleware:
+    """
+    Times every request and the phases its view marks with
+    ``core.instrumentation.span``.
+
+    Adds a ``Server-Timing`` header (``SERVER_TIMING``), records the request
+    in the ``/api/metrics/`` histograms under its URL route, and profiles a
+    sample of requests, keeping the profile of those slower than
+    ``PROFILE_SLOW_REQUESTS``. Timing stops when the view returns its
+    response, so a streamed body is not included.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings, token = start_request()
+        profile = start_profile()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, timings, profile)
+
+    async def __acall__(self, request):
+        timings, token = start_request()
+        profile = start_profile(is_async=True)
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self.finish(request, response, timings, profile)
+
+    def finish(self, request, response, timings, profile):
+        total = timings.elapsed()
+        phases = timings.phases()
+        match = request.resolver_match
+        route = match.route if match is not None else ''
+        if profile is not None:
+            profile.finish(request, route, total)
+        if settings.SERVER_TIMING:
+            response['Server-Timing'] = server_timing(phases, total)
+        metrics.observe(route, request.method, response.status_code, total, phases)
+        metrics.flush()
+        return response
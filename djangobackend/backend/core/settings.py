@@ -20,7 +20,9 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 # See https://docs.djangoproject.com/en/6.0/howto/deployment/checklist/
 
 import os
-import dj_database_url
+import tempfile
+
+from core.database import database_config
 
 # SECURITY WARNING: keep the secret key used in production secret!
 SECRET_KEY = os.environ.get('SECRET_KEY', 'django-insecure-e2ovm0l8&8=#x8zu^v#$z#@2i)02_@s!q4$(b&8i9=$^+qiscb')
@@ -49,9 +51,12 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # First, so its timings cover the rest of the stack
+    'core.middleware.InstrumentationMiddleware',
     'django.middleware.security.SecurityMiddleware',
-    # WhiteNoise serves static files efficiently in production
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # WhiteNoise serves static files efficiently in production; this subclass
+    # also runs natively under ASGI
+    'core.middleware.AsyncWhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -85,13 +90,22 @@ WSGI_APPLICATION = 'core.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/6.0/ref/settings/#databases
 
+# SQLite at BASE_DIR/db.sqlite3 in WAL mode, or DATABASE_URL (e.g. Postgres);
+# see core/database.py for connection reuse, pooling and DB_* variables
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': database_config(BASE_DIR),
 }
 
+# Per-connection SQLite tuning: bytes memory-mapped, KiB of page cache
+SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+SQLITE_CACHE_KIB = int(os.environ.get('SQLITE_CACHE_KIB', 64 * 1024))
+
+# Writes that still find the database locked after the busy timeout are
+# retried this many times, backing off from DB_WRITE_BACKOFF seconds
+DB_WRITE_RETRIES = int(os.environ.get('DB_WRITE_RETRIES', 3))
+DB_WRITE_BACKOFF = float(os.environ.get('DB_WRITE_BACKOFF', 0.1))
+DB_WRITE_BACKOFF_MAX = float(os.environ.get('DB_WRITE_BACKOFF_MAX', 2.0))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -147,6 +161,7 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # Django REST Framework settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
+        'core.authentication.SignedTokenAuthentication',
         'core.authentication.BasicAuthenticationNoBrowserPopup',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -158,6 +173,12 @@ REST_FRAMEWORK = {
     ],
 }
 
+# Bearer tokens issued by LoginView expire after this many seconds
+AUTH_TOKEN_MAX_AGE = int(os.environ.get('AUTH_TOKEN_MAX_AGE', 12 * 3600))
+# Verified Basic credentials are cached per process (entries, seconds)
+AUTH_CACHE_SIZE = int(os.environ.get('AUTH_CACHE_SIZE', 1024))
+AUTH_CACHE_TTL = int(os.environ.get('AUTH_CACHE_TTL', 300))
+
 # CORS settings
 # Allow all origins for development (more permissive)
 # Temporarily allow all origins for production debugging
@@ -219,4 +240,86 @@ CSRF_TRUSTED_ORIGINS = [
 
 # Disable CSRF for API endpoints (token-based auth doesn't need CSRF protection)
 CSRF_COOKIE_HTTPONLY = False
-CSRF_USE_SESSIONS = False
\ No newline at end of file
+CSRF_USE_SESSIONS = False
+# Equipment CSV ingestion: rows parsed per chunk (bounds upload memory use)
+CSV_CHUNK_ROWS = int(os.environ.get('CSV_CHUNK_ROWS', 100000))
+
+# Row endpoints: default and maximum rows per page for ?cursor=&limit=
+DATA_PAGE_SIZE = int(os.environ.get('DATA_PAGE_SIZE', 1000))
+DATA_MAX_PAGE_SIZE = int(os.environ.get('DATA_MAX_PAGE_SIZE', 10000))
+
+# Threads for the blocking file reads and JSON encoding of the async read
+# endpoints (summary, history, data, health) when served over ASGI
+ASYNC_READ_WORKERS = int(os.environ.get('ASYNC_READ_WORKERS', min(32, (os.cpu_count() or 1) + 4)))
+
+# Dashboard push (/api/events/ SSE and /api/updates/ long poll): how often
+# each worker checks the dataset version while clients are connected, the
+# SSE keep-alive interval and the longest a long poll is held (seconds)
+PUSH_POLL_INTERVAL = float(os.environ.get('PUSH_POLL_INTERVAL', 1.0))
+PUSH_HEARTBEAT = float(os.environ.get('PUSH_HEARTBEAT', 15))
+LONG_POLL_TIMEOUT = float(os.environ.get('LONG_POLL_TIMEOUT', 25))
+
+# Chart endpoint: default/maximum points per downsampled series and how long
+# computed series stay cached (seconds)
+CHART_DEFAULT_POINTS = int(os.environ.get('CHART_DEFAULT_POINTS', 1000))
+CHART_MAX_POINTS = int(os.environ.get('CHART_MAX_POINTS', 10000))
+CHART_CACHE_TIMEOUT = int(os.environ.get('CHART_CACHE_TIMEOUT', 3600))
+
+# Trends endpoint: datasets returned per series by default and at most
+TRENDS_DEFAULT_POINTS = int(os.environ.get('TRENDS_DEFAULT_POINTS', 500))
+TRENDS_MAX_POINTS = int(os.environ.get('TRENDS_MAX_POINTS', 5000))
+
+# Cache for computed dataset responses and chart series. File-based so every
+# gunicorn worker sees the same entries and invalidations.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('DJANGO_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'chemical-visualizer-cache')),
+        'TIMEOUT': 3600,
+    }
+}
+
+# Dataset retention, applied after each upload and by `manage.py prune_datasets`.
+# Datasets are ranked and aged by their last upload or append; unset limits
+# are not enforced.
+EQUIPMENT_RETENTION = {
+    'KEEP_LAST': int(os.environ['RETENTION_KEEP_LAST']) if os.environ.get('RETENTION_KEEP_LAST') else 5,
+    'MAX_AGE_DAYS': float(os.environ['RETENTION_MAX_AGE_DAYS']) if os.environ.get('RETENTION_MAX_AGE_DAYS') else None,
+    'MAX_BYTES': int(os.environ['RETENTION_MAX_BYTES']) if os.environ.get('RETENTION_MAX_BYTES') else None,
+    'RUN_ON_UPLOAD': os.environ.get('RETENTION_RUN_ON_UPLOAD', 'true').lower() == 'true',
+}
+
+# Asynchronous uploads (?async=1 or "Prefer: respond-async"): worker threads
+# per process, whether uploads are async by default, and an eager mode that
+# runs jobs inline (used by tests)
+UPLOAD_JOB_WORKERS = int(os.environ.get('UPLOAD_JOB_WORKERS', 2))
+UPLOAD_ASYNC_DEFAULT = os.environ.get('UPLOAD_ASYNC_DEFAULT', 'false').lower() == 'true'
+UPLOAD_JOBS_EAGER = os.environ.get('UPLOAD_JOBS_EAGER', 'false').lower() == 'true'
+# Seconds without progress after which `manage.py reap_upload_jobs` treats a
+# queued or running job as stranded by a restart
+UPLOAD_JOB_STALE_AFTER = int(os.environ.get('UPLOAD_JOB_STALE_AFTER', 900))
+
+# Request instrumentation: Server-Timing headers, /api/metrics/ (bearer
+# METRICS_TOKEN; disabled when unset) with per-process snapshots shared via METRICS_DIR,
+# and profiles of a sample of requests slower than PROFILE_SLOW_REQUESTS
+# seconds (0 disables) saved to PROFILE_DIR, newest PROFILE_KEEP kept.
+# PROFILER is "cprofile" or "pyinstrument" (if installed).
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() == 'true'
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'chemical-visualizer-metrics'))
+METRICS_FLUSH_INTERVAL = float(os.environ.get('METRICS_FLUSH_INTERVAL', 5))
+PROFILE_SLOW_REQUESTS = float(os.environ.get('PROFILE_SLOW_REQUESTS', 0))
+PROFILE_SAMPLE_RATE = float(os.environ.get('PROFILE_SAMPLE_RATE', 0.1))
+PROFILE_DIR = os.environ.get('PROFILE_DIR', os.path.join(tempfile.gettempdir(), 'chemical-visualizer-profiles'))
+PROFILE_KEEP = int(os.environ.get('PROFILE_KEEP', 50))
+PROFILER = os.environ.get('PROFILER', 'cprofile')
+
+# Compressed uploads (.csv.gz, .csv.zst, .zip) are rejected once they expand
+# past this ratio or size while being parsed (0 disables a limit)
+UPLOAD_MAX_DECOMPRESSION_RATIO = int(os.environ.get('UPLOAD_MAX_DECOMPRESSION_RATIO', 100))
+UPLOAD_MAX_DECOMPRESSED_BYTES = int(os.environ.get('UPLOAD_MAX_DECOMPRESSED_BYTES', 8 * 1024 ** 3))
+
+# Batch uploads (/api/upload/batch/): parser processes per server process and
+# the most CSV files accepted in one request, archives included
+BATCH_UPLOAD_WORKERS = int(os.environ.get('BATCH_UPLOAD_WORKERS', os.cpu_count() or 2))
+BATCH_UPLOAD_MAX_FILES = int(os.environ.get('BATCH_UPLOAD_MAX_FILES', 500))
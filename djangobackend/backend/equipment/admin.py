@@ -1,7 +1,12 @@
 from django.contrib import admin
-from .models import EquipmentDataset
+from .models import EquipmentDataset, UploadJob
 
 @admin.register(EquipmentDataset)
 class EquipmentDatasetAdmin(admin.ModelAdmin):
     list_display = ('file_name', 'uploaded_at', 'record_count')
     readonly_fields = ('uploaded_at', 'summary')
+
+@admin.register(UploadJob)
+class UploadJobAdmin(admin.ModelAdmin):
+    list_display = ('file_name', 'status', 'rows_processed', 'created_at')
+    list_filter = ('status',)
@@ -0,0 +1,221 @@
+import io
+import logging
+import os
+import shutil
+import tarfile
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+
+import django
+from django.conf import settings
+from django.db import transaction
+
+from core.database import retry_on_locked
+
+from . import storage
+from .caching import bump_version
+from .compression import CompressedUploadError, LimitedReader, open_upload
+from .ingest import CSVParseError, MissingColumnsError, write_csv
+from .jobs import SPOOL_DIR
+from .models import EquipmentDataset
+from .retention import apply_retention, remove_files, retention_policy
+
+logger = logging.getLogger(__name__)
+
+TAR_SUFFIXES = ('.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz')
+# Loose files spooled as they are and decompressed by the worker
+CSV_SUFFIXES = ('.csv', '.csv.gz', '.csv.zst')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+class BatchUploadError(ValueError):
+    pass
+
+
+def get_process_pool():
+    """
+    Process-wide pool for parsing batch members, created on first use.
+
+    Workers run ``django.setup()`` once so they can import the app; they only
+    write to MEDIA_ROOT and never open a database connection.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.BATCH_UPLOAD_WORKERS,
+                initializer=django.setup,
+            )
+        return _pool
+
+
+def _is_csv(name):
+    base = os.path.basename(name)
+    return base.lower().endswith('.csv') and not base.startswith('.') and '__MACOSX/' not in name
+
+
+def _zip_members(archive):
+    for info in archive.infolist():
+        if not info.is_dir() and _is_csv(info.filename):
+            with archive.open(info) as src:
+                yield os.path.basename(info.filename), src
+
+
+def _tar_members(archive):
+    for member in archive:
+        if member.isfile() and _is_csv(member.name):
+            with archive.extractfile(member) as src:
+                yield os.path.basename(member.name), src
+
+
+class _Spool:
+    """Copies batch members to MEDIA_ROOT/uploads for the worker processes."""
+
+    def __init__(self, max_files):
+        self.max_files = max_files
+        self.entries = []
+
+    def add(self, file_name, src):
+        if sum(1 for e in self.entries if e['path']) >= self.max_files:
+            raise BatchUploadError(f'A batch may contain at most {self.max_files} CSV files')
+        path = storage.dataset_path(f'{SPOOL_DIR}/{uuid.uuid4().hex}.csv')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        try:
+            with open(path, 'wb') as out:
+                shutil.copyfileobj(src, out, 1024 * 1024)
+        except BaseException:
+            os.remove(path)
+            raise
+        self.entries.append({'file_name': file_name, 'path': path, 'error': None})
+
+    def add_members(self, members, archive_size):
+        """
+        Spool the ``(file_name, stream)`` members of one archive. The upload
+        decompression limits apply to the running total of their output
+        against the archive's size, raising ``DecompressionLimitError``.
+        """
+        bytes_out = 0
+        for file_name, src in members:
+            limited = LimitedReader(
+                src,
+                lambda: archive_size,
+                settings.UPLOAD_MAX_DECOMPRESSION_RATIO,
+                settings.UPLOAD_MAX_DECOMPRESSED_BYTES,
+                bytes_out=bytes_out,
+            )
+            self.add(file_name, io.BufferedReader(limited, buffer_size=1024 * 1024))
+            bytes_out = limited.bytes_out
+
+    def reject(self, file_name, error):
+        self.entries.append({'file_name': file_name, 'path': None, 'error': error})
+
+    def add_upload(self, upload):
+        name = upload.name
+        lower = name.lower()
+        if lower.endswith(CSV_SUFFIXES):
+            self.add(name, upload)
+        elif lower.endswith('.zip'):
+            try:
+                with zipfile.ZipFile(upload) as archive:
+                    self.add_members(_zip_members(archive), upload.size)
+            except zipfile.BadZipFile as e:
+                self.reject(name, f'Invalid ZIP archive: {e}')
+        elif lower.endswith(TAR_SUFFIXES):
+            try:
+                with tarfile.open(fileobj=upload, mode='r:*') as archive:
+                    self.add_members(_tar_members(archive), upload.size)
+            except tarfile.TarError as e:
+                self.reject(name, f'Invalid tar archive: {e}')
+        else:
+            self.reject(name, 'Only CSV files or ZIP/tar archives of CSV files are allowed')
+
+    def cleanup(self):
+        for entry in self.entries:
+            if entry['path'] and os.path.exists(entry['path']):
+                os.remove(entry['path'])
+
+
+def parse_spooled(path, file_name):
+    """
+    Worker entry point: parse and persist one spooled CSV, decompressing it
+    according to the suffix of ``file_name``.
+
+    Returns ``(fields, error)``; errors are passed back as strings because
+    the ingest exceptions do not survive pickling.
+    """
+    try:
+        with open(path, 'rb') as f, open_upload(f, file_name) as stream:
+            return write_csv(stream), None
+    except (MissingColumnsError, CompressedUploadError, CSVParseError) as e:
+        return None, str(e)
+    except Exception as e:
+        logger.exception('Parsing batch member %s failed', path)
+        return None, f'Upload failed: {e}'
+
+
+def _parse_all(entries):
+    paths = [e['path'] for e in entries]
+    names = [e['file_name'] for e in entries]
+    if settings.UPLOAD_JOBS_EAGER or len(paths) < 2:
+        return list(map(parse_spooled, paths, names))
+    return list(get_process_pool().map(parse_spooled, paths, names))
+
+
+@retry_on_locked
+def _insert(datasets):
+    with transaction.atomic():
+        EquipmentDataset.objects.bulk_create(datasets)
+        # bulk_create sends no post_save, so invalidate cached reads here
+        transaction.on_commit(bump_version)
+
+
+def ingest_batch(uploads):
+    """
+    Ingest many CSV uploads (or ZIP/tar archives of them) at once.
+
+    Members are parsed in parallel on the process pool and every dataset is
+    inserted with one ``bulk_create`` in a single transaction. Returns one
+    result per CSV file, in upload order.
+    """
+    spool = _Spool(settings.BATCH_UPLOAD_MAX_FILES)
+    try:
+        for upload in uploads:
+            spool.add_upload(upload)
+        parsed = iter(_parse_all([e for e in spool.entries if e['path']]))
+    finally:
+        spool.cleanup()
+
+    results = []
+    datasets = []
+    for entry in spool.entries:
+        if entry['path']:
+            fields, entry['error'] = next(parsed)
+            if fields is not None:
+                dataset = EquipmentDataset(file_name=entry['file_name'], **fields)
+                # bulk_create bypasses save(), which derives these columns
+                dataset.refresh_denormalized()
+                datasets.append(dataset)
+                results.append({'file_name': entry['file_name'], 'dataset': dataset})
+                continue
+        results.append({'file_name': entry['file_name'], 'status': 'failed', 'error': entry['error']})
+
+    try:
+        _insert(datasets)
+    except Exception:
+        remove_files([d.data_file.name for d in datasets if d.data_file])
+        raise
+
+    for result in results:
+        dataset = result.pop('dataset', None)
+        if dataset is not None:
+            result.update(status='created', id=dataset.id, record_count=dataset.record_count)
+
+    # The batch's own datasets were just reported as created, so retention
+    # only removes older ones, however many files the batch held
+    if datasets and retention_policy()['RUN_ON_UPLOAD']:
+        apply_retention(exempt=[d.id for d in datasets])
+    return results
@@ -0,0 +1,200 @@
+"""
+Benchmarks of the API hot paths, run in-process through Django's test
+client: upload parse + summary, DataView serialization, summary/history
+latency and PDF generation, over synthetic equipment CSVs.
+
+Run with ``python manage.py benchmark``; results are JSON so runs can be
+compared with a stored baseline.
+"""
+import os
+import platform
+import statistics
+import tempfile
+import time
+
+import django
+import numpy as np
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from django.core.cache import cache
+
+from . import storage
+from .models import EquipmentDataset
+from .reports import report_name
+
+# Dataset sizes and type cardinalities; every combination is one case
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000)
+DEFAULT_TYPES = (8, 1_000)
+DATA_PAGE = 1_000
+
+# A run counts as a regression when it is this much slower than the baseline,
+# and by more than MIN_DELTA seconds so millisecond noise is not flagged
+DEFAULT_TOLERANCE = 0.25
+MIN_DELTA = 0.005
+
+
+def make_csv(path, rows, types, seed=0):
+    """
+    Write a synthetic equipment CSV with ``rows`` rows and ``types``
+    distinct types; about 1% of flowrates and pressures are missing.
+    """
+    rng = np.random.default_rng(seed)
+    batch = 1_000_000
+    with pa_csv.CSVWriter(path, pa.schema([
+        ('Equipment Name', pa.string()),
+        ('Type', pa.string()),
+        ('Flowrate', pa.float64()),
+        ('Pressure', pa.float64()),
+        ('Temperature', pa.float64()),
+    ])) as writer:
+        for start in range(0, rows, batch):
+            n = min(batch, rows - start)
+            flow = rng.lognormal(4.5, 0.5, n).round(2)
+            pressure = rng.normal(25, 5, n).round(2)
+            writer.write_table(pa.table({
+                'Equipment Name': pa.array(np.char.add('Unit-', np.arange(start, start + n).astype(str))),
+                'Type': pa.array(np.char.add('Type', rng.integers(0, types, n).astype(str))),
+                'Flowrate': pa.array(flow, mask=rng.random(n) < 0.01),
+                'Pressure': pa.array(pressure, mask=rng.random(n) < 0.01),
+                'Temperature': rng.normal(75, 10, n).round(2),
+            }))
+
+
+def cached_csv(rows, types, directory=None):
+    """Path of the synthetic CSV for ``(rows, types)``, generated once."""
+    directory = directory or os.path.join(tempfile.gettempdir(), 'equipment-bench')
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'equipment-{rows}-{types}.csv')
+    if not os.path.exists(path):
+        make_csv(path + '.part', rows, types)
+        os.replace(path + '.part', path)
+    return path
+
+
+def _timed(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return {'seconds': statistics.median(timings), 'min_seconds': min(timings)}
+
+
+def _ok(response):
+    if response.status_code != 200:
+        raise RuntimeError(f'{response.request["PATH_INFO"]} returned {response.status_code}')
+    return response
+
+
+def _consume(response):
+    _ok(response)
+    if not response.streaming:
+        return len(response.content)
+    if response.is_async:
+        from asgiref.sync import async_to_sync
+
+        async def drain():
+            return sum([len(chunk) async for chunk in response.streaming_content])
+
+        return async_to_sync(drain)()
+    return sum(len(chunk) for chunk in response.streaming_content)
+
+
+def bench_case(client, rows, types, repeat=3, csv_dir=None):
+    """Benchmark one synthetic dataset; returns a list of result dicts."""
+    path = cached_csv(rows, types, csv_dir)
+    size = os.path.getsize(path)
+    case = {'rows': rows, 'types': types}
+    results = []
+
+    def upload():
+        with open(path, 'rb') as f:
+            upload.dataset_id = _ok(client.post('/api/upload/', {'file': f})).json()['id']
+
+    timing = _timed(upload, 1)
+    results.append({
+        'name': 'upload', **case, **timing,
+        'rows_per_second': rows / timing['seconds'],
+        'mb_per_second': size / 1e6 / timing['seconds'],
+    })
+    dataset_id = upload.dataset_id
+
+    timing = _timed(lambda: _consume(client.get('/api/data/', {'id': dataset_id})), repeat)
+    results.append({'name': 'data_full', **case, **timing, 'rows_per_second': rows / timing['seconds']})
+    middle = max(rows // 2 - DATA_PAGE, 0)
+    timing = _timed(
+        lambda: _consume(client.get('/api/data/', {'id': dataset_id, 'cursor': middle, 'limit': DATA_PAGE})),
+        repeat * 10,
+    )
+    results.append({'name': 'data_page', **case, **timing})
+
+    for name, url, params in (
+        ('summary', '/api/summary/', {'id': dataset_id}),
+        ('history', '/api/history/', {}),
+    ):
+        def cold():
+            cache.clear()
+            _consume(client.get(url, params))
+
+        results.append({'name': f'{name}_cold', **case, **_timed(cold, repeat)})
+        results.append({'name': f'{name}_warm', **case, **_timed(lambda: _consume(client.get(url, params)), repeat * 10)})
+
+    dataset = EquipmentDataset.objects.get(id=dataset_id)
+
+    def pdf():
+        # Render from scratch every time rather than serving the stored file
+        path = storage.dataset_path(report_name(dataset))
+        if os.path.exists(path):
+            os.remove(path)
+        _consume(client.get('/api/report/', {'id': dataset_id}))
+
+    results.append({'name': 'pdf', **case, **_timed(pdf, repeat)})
+    return results
+
+
+def run_suite(client, rows=DEFAULT_ROWS, types=DEFAULT_TYPES, repeat=3, csv_dir=None, progress=None):
+    """Benchmark every ``(rows, types)`` combination and return the report."""
+    # Warm imports, fonts and caches so the first case is not penalised
+    bench_case(client, 1_000, 4, 1, csv_dir)
+    results = []
+    for n in rows:
+        for k in types:
+            if progress is not None:
+                progress(f'{n:,} rows, {k:,} types')
+            results.extend(bench_case(client, n, k, repeat, csv_dir))
+    return {'meta': environment(), 'results': results}
+
+
+def environment():
+    return {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def result_key(result):
+    return f'{result["name"]}[rows={result["rows"]},types={result["types"]}]'
+
+
+def compare(report, baseline, tolerance=DEFAULT_TOLERANCE):
+    """
+    Compare ``report`` with ``baseline`` result by result, on the best
+    time of each, which is the least noisy.
+
+    Returns rows of ``(key, baseline_seconds, seconds, ratio, regressed)``
+    for the benchmarks present in both.
+    """
+    previous = {result_key(r): r for r in baseline['results']}
+    rows = []
+    for result in report['results']:
+        old = previous.get(result_key(result))
+        if old is None:
+            continue
+        before, after = old['min_seconds'], result['min_seconds']
+        ratio = after / before if before else float('inf')
+        regressed = ratio > 1 + tolerance and after - before > MIN_DELTA
+        rows.append((result_key(result), before, after, ratio, regressed))
+    return rows
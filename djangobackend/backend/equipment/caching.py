@@ -0,0 +1,96 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+
+from core.instrumentation import span
+
+VERSION_KEY = 'equipment:datasets:version'
+
+
+def bump_version():
+    """
+    Mark every cached dataset response as stale.
+
+    Called whenever a dataset is created, changed or deleted. The token is
+    time-based rather than a counter so it never repeats, even if the cache
+    is flushed and repopulated.
+    """
+    value = _new_version()
+    cache.set(VERSION_KEY, value, None)
+    return value
+
+
+def _new_version():
+    return (format(time.time_ns(), 'x'), time.time())
+
+
+def datasets_version():
+    """Return ``(token, modified_timestamp)`` for the current set of datasets."""
+    value = cache.get(VERSION_KEY)
+    if value is None:
+        value = bump_version()
+    return value
+
+
+async def adatasets_version():
+    """``datasets_version`` for async views, through the async cache API."""
+    value = await cache.aget(VERSION_KEY)
+    if value is None:
+        value = _new_version()
+        await cache.aset(VERSION_KEY, value, None)
+    return value
+
+
+def _query_key(request):
+    query = request.GET.urlencode()
+    return hashlib.sha1(f'{request.path}?{query}'.encode()).hexdigest()[:16] if query else request.path
+
+
+def version_etag(token, request):
+    return f'{token}-{_query_key(request)}'
+
+
+def response_etag(request, *args, **kwargs):
+    token, _ = datasets_version()
+    return version_etag(token, request)
+
+
+def response_last_modified(request, *args, **kwargs):
+    _, modified = datasets_version()
+    return datetime.fromtimestamp(int(modified), tz=timezone.utc)
+
+
+def cached_response_data(request, build):
+    """
+    Return the response data for ``request``, computing it with ``build()``
+    only once per dataset version and query string.
+    """
+    token, _ = datasets_version()
+    key = f'equipment:response:{token}:{_query_key(request)}'
+    with span('cache'):
+        data = cache.get(key)
+    if data is None:
+        with span('build'):
+            data = build()
+        with span('cache'):
+            cache.set(key, data)
+    return data
+
+
+async def acached_response_data(request, build):
+    """
+    ``cached_response_data`` for async views; ``build`` is a coroutine
+    function.
+    """
+    token, _ = await adatasets_version()
+    key = f'equipment:response:{token}:{_query_key(request)}'
+    with span('cache'):
+        data = await cache.aget(key)
+    if data is None:
+        with span('build'):
+            data = await build()
+        with span('cache'):
+            await cache.aset(key, data)
+    return data
@@ -0,0 +1,157 @@
+import gzip
+import io
+import os
+import zipfile
+from contextlib import contextmanager
+
+import zstandard
+from django.conf import settings
+
+# Upload names accepted by the single-file upload endpoint
+UPLOAD_SUFFIXES = ('.csv', '.csv.gz', '.csv.zst', '.zip')
+
+# Output below this size is never rejected for its ratio, so small, highly
+# repetitive files are fine
+RATIO_CHECK_MIN_BYTES = 1024 * 1024
+
+
+class CompressedUploadError(ValueError):
+    pass
+
+
+class DecompressionLimitError(CompressedUploadError):
+    pass
+
+
+def is_supported(file_name):
+    return file_name.lower().endswith(UPLOAD_SUFFIXES)
+
+
+class CountingReader(io.RawIOBase):
+    """Binary file wrapper that counts the bytes handed to the parser."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_read = 0
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.raw.read(len(buffer))
+        n = len(data)
+        buffer[:n] = data
+        self.bytes_read += n
+        return n
+
+    # ZIP archives need random access to their central directory
+    def seekable(self):
+        return getattr(self.raw, 'seekable', lambda: False)()
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        return self.raw.seek(offset, whence)
+
+    def tell(self):
+        return self.raw.tell()
+
+
+class LimitedReader(io.RawIOBase):
+    """
+    Passes decompressed bytes through to the parser and raises
+    ``DecompressionLimitError`` once the output exceeds ``max_bytes`` or
+    ``max_ratio`` times the compressed input consumed so far. ``bytes_out``
+    starts the count, e.g. at the output of earlier members of an archive.
+    """
+
+    def __init__(self, stream, compressed_bytes, max_ratio, max_bytes, bytes_out=0):
+        self.stream = stream
+        self.compressed_bytes = compressed_bytes
+        self.max_ratio = max_ratio
+        self.max_bytes = max_bytes
+        self.bytes_out = bytes_out
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        n = self.stream.readinto(buffer)
+        self.bytes_out += n
+        if self.max_bytes and self.bytes_out > self.max_bytes:
+            raise DecompressionLimitError(
+                f'Decompressed upload exceeds {self.max_bytes} bytes'
+            )
+        if (
+            self.max_ratio
+            and self.bytes_out > RATIO_CHECK_MIN_BYTES
+            and self.bytes_out > self.max_ratio * max(self.compressed_bytes(), 1)
+        ):
+            raise DecompressionLimitError(
+                f'Upload decompresses more than {self.max_ratio}x its compressed size'
+            )
+        return n
+
+
+def _zip_member(archive):
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and info.filename.lower().endswith('.csv')
+        and not os.path.basename(info.filename).startswith('.')
+        and '__MACOSX/' not in info.filename
+    ]
+    if len(members) != 1:
+        raise CompressedUploadError(
+            'ZIP uploads must contain exactly one CSV file; '
+            'use /api/upload/batch/ for several'
+        )
+    return members[0]
+
+
+@contextmanager
+def open_upload(file_obj, file_name):
+    """
+    Yield a binary stream of the CSV text in an upload named ``file_name``.
+
+    ``.csv.gz``, ``.csv.zst`` and single-CSV ``.zip`` uploads are decompressed
+    block by block as the parser reads, so the decompressed file is never
+    held in memory. Plain CSV uploads are passed through untouched.
+    """
+    name = file_name.lower()
+    max_ratio = settings.UPLOAD_MAX_DECOMPRESSION_RATIO
+    max_bytes = settings.UPLOAD_MAX_DECOMPRESSED_BYTES
+    if name.endswith('.csv'):
+        yield file_obj
+        return
+
+    if name.endswith('.zip'):
+        try:
+            archive = zipfile.ZipFile(file_obj)
+        except zipfile.BadZipFile as e:
+            raise CompressedUploadError(f'Invalid ZIP archive: {e}') from e
+        with archive:
+            info = _zip_member(archive)
+            # The declared sizes can lie, so they are only an early check;
+            # the stream itself is still limited below
+            if max_ratio and info.file_size > RATIO_CHECK_MIN_BYTES and info.file_size > max_ratio * max(info.compress_size, 1):
+                raise DecompressionLimitError(
+                    f'Upload decompresses more than {max_ratio}x its compressed size'
+                )
+            with archive.open(info) as member:
+                yield io.BufferedReader(
+                    LimitedReader(member, lambda: info.compress_size, max_ratio, max_bytes),
+                    buffer_size=1024 * 1024,
+                )
+        return
+
+    counter = CountingReader(file_obj)
+    if name.endswith('.gz'):
+        stream = gzip.GzipFile(fileobj=counter, mode='rb')
+    elif name.endswith('.zst'):
+        stream = zstandard.ZstdDecompressor().stream_reader(counter)
+    else:
+        raise CompressedUploadError(f'Unsupported upload type: {file_name}')
+    with stream:
+        yield io.BufferedReader(
+            LimitedReader(stream, lambda: counter.bytes_read, max_ratio, max_bytes),
+            buffer_size=1024 * 1024,
+        )
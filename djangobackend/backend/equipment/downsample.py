@@ -0,0 +1,100 @@
+import numpy as np
+
+
+def _valid(y):
+    """Drop missing readings, keeping each value's row number as its x."""
+    x = np.arange(len(y), dtype=np.int64)
+    mask = ~np.isnan(y)
+    return x[mask], y[mask]
+
+
+def lttb(y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series to ``threshold``
+    points. Returns ``(x, y)`` where x are row numbers of the kept points.
+
+    Buckets are walked in order because each pick depends on the previous
+    one, but the triangle areas inside a bucket are computed in one NumPy
+    expression, so the cost is O(n) array work plus O(threshold) steps.
+    """
+    x, y = _valid(np.asarray(y, dtype=np.float64))
+    n = len(y)
+    if threshold >= n or threshold < 3:
+        return x, y
+
+    # Bucket edges over the points between the fixed first and last ones
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    prev = 0
+    for i in range(threshold - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        # Average of the next bucket is the third triangle vertex
+        nlo, nhi = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        if nhi <= nlo:
+            nhi = nlo + 1
+        avg_x = x[nlo:nhi].mean()
+        avg_y = y[nlo:nhi].mean()
+        areas = np.abs(
+            (x[prev] - avg_x) * (y[lo:hi] - y[prev])
+            - (x[prev] - x[lo:hi]) * (avg_y - y[prev])
+        )
+        prev = lo + int(np.argmax(areas))
+        picked[i + 1] = prev
+    return x[picked], y[picked]
+
+
+class BucketStats:
+    """
+    ``bucket_stats`` of an ``n``-value series fed in consecutive pieces with
+    ``add``, so only one piece of the series is in memory at a time.
+    """
+
+    def __init__(self, n, buckets):
+        buckets = max(1, min(buckets, n))
+        self.starts = np.linspace(0, n, buckets, endpoint=False).astype(np.int64)
+        self.counts = np.zeros(buckets, dtype=np.int64)
+        self.sums = np.zeros(buckets)
+        self.mins = np.full(buckets, np.inf)
+        self.maxs = np.full(buckets, -np.inf)
+        self.offset = 0
+
+    def add(self, y):
+        y = np.asarray(y, dtype=np.float64)
+        if not len(y):
+            return
+        # Buckets the piece overlaps, and where each begins within it
+        first = np.searchsorted(self.starts, self.offset, side='right') - 1
+        last = np.searchsorted(self.starts, self.offset + len(y) - 1, side='right') - 1
+        local = np.concatenate(([0], self.starts[first + 1:last + 1] - self.offset))
+        span = slice(first, last + 1)
+        self.offset += len(y)
+
+        valid = ~np.isnan(y)
+        self.counts[span] += np.add.reduceat(valid.astype(np.int64), local)
+        self.sums[span] += np.add.reduceat(np.where(valid, y, 0.0), local)
+        np.minimum(self.mins[span], np.minimum.reduceat(np.where(valid, y, np.inf), local), out=self.mins[span])
+        np.maximum(self.maxs[span], np.maximum.reduceat(np.where(valid, y, -np.inf), local), out=self.maxs[span])
+
+    def result(self):
+        keep = self.counts > 0
+        return {
+            'x': self.starts[keep].tolist(),
+            'min': self.mins[keep].tolist(),
+            'max': self.maxs[keep].tolist(),
+            'mean': (self.sums[keep] / self.counts[keep]).tolist(),
+        }
+
+
+def bucket_stats(y, buckets):
+    """
+    Split the series into ``buckets`` equal row ranges and return the first
+    row number and min/max/mean of each non-empty bucket.
+    """
+    y = np.asarray(y, dtype=np.float64)
+    if len(y) == 0:
+        return {'x': [], 'min': [], 'max': [], 'mean': []}
+    stats = BucketStats(len(y), buckets)
+    stats.add(y)
+    return stats.result()
@@ -0,0 +1,120 @@
+import asyncio
+import logging
+import time
+import weakref
+
+from django.conf import settings
+
+from .caching import adatasets_version, datasets_version
+from .models import EquipmentDataset
+
+logger = logging.getLogger(__name__)
+
+UPDATE_FIELDS = ('id', 'file_name', 'record_count', 'uploaded_at', 'summary')
+
+_watchers = weakref.WeakKeyDictionary()
+
+
+def _update(version, dataset):
+    summary = dataset.pop('summary') if dataset else None
+    return {'version': version, 'dataset': dataset, 'summary': summary}
+
+
+async def latest_update(version):
+    """The push payload for ``version``: the newest dataset and its summary."""
+    return _update(version, await EquipmentDataset.objects.values(*UPDATE_FIELDS).afirst())
+
+
+def poll_updates(since, duration):
+    """
+    Blocking counterpart of ``VersionWatcher`` for WSGI servers, which
+    cannot stream from an event loop: yield the update whenever the version
+    differs from ``since``, and None as a keep-alive every
+    ``PUSH_HEARTBEAT`` seconds, until ``duration`` seconds have passed.
+    """
+    deadline = time.monotonic() + duration
+    heartbeat = time.monotonic() + settings.PUSH_HEARTBEAT
+    while True:
+        version, _ = datasets_version()
+        if version != since:
+            since = version
+            yield _update(version, EquipmentDataset.objects.values(*UPDATE_FIELDS).first())
+        elif time.monotonic() >= heartbeat:
+            heartbeat = time.monotonic() + settings.PUSH_HEARTBEAT
+            yield None
+        if time.monotonic() >= deadline:
+            return
+        time.sleep(settings.PUSH_POLL_INTERVAL)
+
+
+class VersionWatcher:
+    """
+    Wakes waiting clients when the dataset version changes.
+
+    One watcher per event loop reads the version token every
+    ``PUSH_POLL_INTERVAL`` seconds, and only while clients are waiting, then
+    loads the update once for all of them. Idle clients cost no database or
+    cache queries of their own. The version is the token that already
+    drives the response caches, so uploads, appends and retention all
+    notify without extra hooks.
+    """
+
+    def __init__(self):
+        self.update = None
+        self.waiters = 0
+        self._changed = asyncio.Event()
+        self._task = None
+
+    async def wait(self, since, timeout):
+        """
+        Return the current update as soon as its version differs from
+        ``since``, or None after ``timeout`` seconds.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        self.waiters += 1
+        if self._task is None:
+            # The last update seen may be stale; wait for a fresh read
+            self.update = None
+            self._task = loop.create_task(self._run())
+        try:
+            while True:
+                update = self.update
+                if update is not None and update['version'] != since:
+                    return update
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    return None
+                try:
+                    await asyncio.wait_for(self._changed.wait(), remaining)
+                except TimeoutError:
+                    return None
+        finally:
+            self.waiters -= 1
+
+    async def _refresh(self):
+        version, _ = await adatasets_version()
+        if self.update is None or self.update['version'] != version:
+            self.update = await latest_update(version)
+            changed, self._changed = self._changed, asyncio.Event()
+            changed.set()
+
+    async def _run(self):
+        try:
+            while self.waiters:
+                try:
+                    await self._refresh()
+                except Exception:
+                    logger.exception('Reading the dataset version failed')
+                await asyncio.sleep(settings.PUSH_POLL_INTERVAL)
+        finally:
+            self._task = None
+
+
+def get_watcher():
+    """The ``VersionWatcher`` of the running event loop."""
+    loop = asyncio.get_running_loop()
+    watcher = _watchers.get(loop)
+    if watcher is None:
+        watcher = _watchers[loop] = VersionWatcher()
+    return watcher
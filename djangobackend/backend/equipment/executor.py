@@ -0,0 +1,48 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_read_executor():
+    """
+    Process-wide thread pool for the blocking parts of async read views,
+    created on first use.
+
+    Arrow and CSV reads and JSON encoding run here rather than on the event
+    loop. The pool is bounded, so a burst of requests queues for a worker
+    instead of starting a thread each; database access stays on Django's
+    own ``sync_to_async`` threads.
+    """
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.ASYNC_READ_WORKERS,
+                thread_name_prefix='equipment-read',
+            )
+        return _executor
+
+
+async def run_blocking(func, *args, **kwargs):
+    """
+    Run ``func(*args, **kwargs)`` on the read executor and await it, in a
+    copy of the caller's context so request timing spans reach the request.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_read_executor(), functools.partial(context.run, func, *args, **kwargs))
+
+
+async def iterate_blocking(iterable):
+    """Consume a blocking iterator on the read executor, item by item."""
+    iterator = iter(iterable)
+    done = object()
+    while (item := await run_blocking(next, iterator, done)) is not done:
+        yield item
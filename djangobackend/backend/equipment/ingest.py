@@ -0,0 +1,277 @@
+import io
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from core.database import retry_on_locked
+from core.instrumentation import span
+
+from . import storage
+from .compression import CompressedUploadError, open_upload
+from .models import EquipmentDataset
+from .retention import apply_retention, remove_files, retention_policy
+from .sketches import DatasetSketch, sketch_table
+
+REQUIRED_COLUMNS = ['type', 'flowrate', 'pressure', 'temperature']
+
+
+class CSVParseError(ValueError):
+    pass
+
+
+class MissingColumnsError(ValueError):
+    def __init__(self, missing, columns):
+        self.missing = missing
+        self.columns = columns
+        super().__init__(
+            f'Missing required columns: {", ".join(missing)}. '
+            f'Found columns: {", ".join(columns)}'
+        )
+
+
+def missing_required_columns(columns):
+    """Return the required columns with no matching header in ``columns``."""
+    sources = storage.resolve_schema(columns)
+    return [r for r in REQUIRED_COLUMNS if r not in sources]
+
+
+def read_header(file_obj):
+    """
+    Read the header row off ``file_obj``, leaving it positioned at the first
+    data row, and return the column labels as pandas would name them.
+    """
+    line = file_obj.readline()
+    # A quoted header may span lines
+    while line.count(b'"') % 2 and (more := file_obj.readline()):
+        line += more
+    return list(pd.read_csv(io.BytesIO(line), nrows=0, encoding='utf-8').columns)
+
+
+class CSVChunkReader:
+    """
+    Iterates an uploaded CSV as DataFrame chunks typed by the declared
+    schema in ``storage.COLUMNS``.
+
+    The header is read first and matched against the accepted aliases, so
+    the parser is given ``usecols=`` and ``dtype=`` up front: unrelated
+    columns are skipped without being materialized, ``type`` is categorical
+    and chunks carry the canonical column names. ``sources`` maps those
+    names to the original headers. Raises ``MissingColumnsError`` before any
+    data row is parsed if a required column is absent.
+    """
+
+    def __init__(self, file_obj, chunksize=None):
+        if getattr(file_obj, 'seekable', lambda: False)():
+            file_obj.seek(0)
+        columns = read_header(file_obj)
+        missing = missing_required_columns(columns)
+        if missing:
+            raise MissingColumnsError(missing, [str(c) for c in columns])
+        self.sources = storage.resolve_schema(columns)
+        positions = sorted((columns.index(source), name) for name, source in self.sources.items())
+        self.file_obj = file_obj
+        # Rows per chunk; peak memory is bounded by this, not by the file size
+        self.chunksize = chunksize or settings.CSV_CHUNK_ROWS
+        self.usecols = [position for position, _ in positions]
+        self.names = [name for _, name in positions]
+
+    def __iter__(self):
+        reader = pd.read_csv(
+            self.file_obj,
+            header=None,
+            names=self.names,
+            usecols=self.usecols,
+            dtype={name: storage.COLUMNS[name][0] for name in self.names},
+            chunksize=self.chunksize,
+            encoding='utf-8',
+        )
+        with reader:
+            yield from reader
+
+
+def sketch_csv(file_obj, chunksize=None, writer=None, progress=None):
+    """
+    Parse ``file_obj`` chunk by chunk and return its ``DatasetSketch``.
+
+    Each chunk is also passed to ``writer`` (a ``storage.DatasetWriter``) when
+    given, so the upload is persisted in the same pass, and ``progress`` is
+    called with the running row count after every chunk. Raises
+    ``MissingColumnsError`` as soon as the header is known if a required
+    column is absent, before the rest of the file is read.
+    """
+    sketch = DatasetSketch()
+    chunks = CSVChunkReader(file_obj, chunksize)
+    if writer is not None and not writer.sources:
+        writer.sources = chunks.sources
+    iterator = iter(chunks)
+    while True:
+        with span('read_csv'):
+            chunk = next(iterator, None)
+        if chunk is None:
+            break
+        with span('sketch'):
+            sketch.update(chunk)
+        if writer is not None:
+            with span('write'):
+                writer.write(chunk)
+        if progress is not None:
+            progress(sketch.total)
+    return sketch
+
+
+def preview_csv(file_obj, start, limit):
+    """
+    Sketch ``file_obj`` like an upload without storing it, and return
+    ``(sketch, rows)`` where ``rows`` is the DataFrame of rows
+    ``[start, start + limit)`` under the file's own headers.
+    """
+    sketch = DatasetSketch()
+    chunks = CSVChunkReader(file_obj)
+    pieces = []
+    for chunk in chunks:
+        offset = sketch.total
+        sketch.update(chunk)
+        lo, hi = max(start - offset, 0), start + limit - offset
+        if hi > 0 and lo < len(chunk):
+            pieces.append(chunk.iloc[lo:hi])
+    rows = pd.concat(pieces) if pieces else pd.DataFrame(columns=chunks.names)
+    return sketch, rows.rename(columns=chunks.sources)
+
+
+def summarize_csv(file_obj, chunksize=None, writer=None, progress=None):
+    """Like ``sketch_csv`` but return ``(summary, record_count)``."""
+    sketch = sketch_csv(file_obj, chunksize, writer, progress)
+    return sketch.summary(), sketch.total
+
+
+def _write(file_obj, writer, progress=None):
+    """Sketch ``file_obj`` into ``writer``, removing the file on failure."""
+    try:
+        sketch = sketch_csv(file_obj, writer=writer, progress=progress)
+        with span('write'):
+            schema = writer.close()
+    except (MissingColumnsError, CompressedUploadError):
+        writer.abort()
+        raise
+    except Exception as e:
+        writer.abort()
+        raise CSVParseError(str(e)) from e
+    return sketch, schema
+
+
+def write_csv(file_obj, progress=None):
+    """
+    Parse, persist and summarize an uploaded CSV without touching the
+    database, returning the ``EquipmentDataset`` field values to save.
+
+    Needs only MEDIA_ROOT, so it can run in a worker process. Problems with
+    the file itself raise ``MissingColumnsError`` or ``CSVParseError``.
+    """
+    writer = storage.DatasetWriter()
+    sketch, schema = _write(file_obj, writer, progress)
+    stored = schema is not None
+    with span('summary'):
+        return {
+            'record_count': sketch.total,
+            'summary': sketch.summary(),
+            'type_stats': sketch.type_stats(),
+            'histograms': sketch.histograms(),
+            'sketch': sketch.to_bytes(),
+            'data_file': writer.name if stored else None,
+            'schema': schema or [],
+            'batch_offsets': writer.offsets,
+            'data_size': writer.size,
+        }
+
+
+def ingest_csv(file_obj, file_name, progress=None):
+    """
+    Parse, persist and summarize an uploaded CSV and return the new
+    ``EquipmentDataset``. Compressed uploads are decompressed as they are
+    parsed, chosen by the suffix of ``file_name``.
+
+    Problems with the file itself raise ``MissingColumnsError``,
+    ``CompressedUploadError`` or ``CSVParseError``; anything else (storage,
+    database) propagates as is.
+    """
+    with open_upload(file_obj, file_name) as stream:
+        fields = write_csv(stream, progress)
+    with span('db'):
+        dataset = retry_on_locked(EquipmentDataset.objects.create)(file_name=file_name, **fields)
+
+    # Drop datasets outside the retention policy (default: keep last 5)
+    if retention_policy()['RUN_ON_UPLOAD']:
+        with span('retention'):
+            apply_retention()
+    return dataset
+
+
+class AppendError(ValueError):
+    pass
+
+
+def stored_sketch(dataset):
+    """
+    The dataset's sketch, built once from its stored rows for datasets
+    saved before sketches were kept.
+    """
+    if dataset.sketch:
+        return DatasetSketch.from_bytes(dataset.sketch)
+    return sketch_table(storage.open_table(dataset))
+
+
+@retry_on_locked
+def _merge_segment(dataset_id, added, writer, base=None):
+    with transaction.atomic():
+        # Serialize concurrent appends to the same dataset
+        dataset = EquipmentDataset.objects.select_for_update().get(id=dataset_id)
+        # ``base`` is the sketch of a legacy dataset, rebuilt before taking
+        # the lock; an append that got in first has stored one since
+        sketch = (stored_sketch(dataset) if dataset.sketch or base is None else base).merge(added)
+        dataset.batch_offsets = dataset.batch_offsets + [dataset.record_count + o for o in writer.offsets]
+        dataset.segments = dataset.segments + [{'name': writer.name, 'batches': len(writer.offsets)}]
+        dataset.data_size += writer.size
+        dataset.record_count = sketch.total
+        dataset.summary = sketch.summary()
+        dataset.type_stats = sketch.type_stats()
+        dataset.histograms = sketch.histograms()
+        dataset.sketch = sketch.to_bytes()
+        dataset.modified_at = timezone.now()
+        dataset.save()
+    return dataset
+
+
+def append_csv(dataset_id, file_obj, file_name):
+    """
+    Append the rows of an uploaded CSV to dataset ``dataset_id`` and return
+    ``(dataset, appended_rows)``.
+
+    The new rows are written to an Arrow segment next to the dataset's file
+    and sketched on the way; the stored sketch is merged with theirs and the
+    summary and per-type statistics are derived from the result. Existing
+    rows are never re-read, so the cost is O(appended rows). Raises
+    ``EquipmentDataset.DoesNotExist``, ``AppendError`` for datasets without a
+    columnar copy, and the ingest errors for problems with the file.
+    """
+    dataset = EquipmentDataset.objects.get(id=dataset_id)
+    if not dataset.data_file:
+        raise AppendError('Only datasets stored in the columnar format can be appended to')
+
+    writer = storage.DatasetWriter(schema=dataset.schema)
+    with open_upload(file_obj, file_name) as stream:
+        added, schema = _write(stream, writer)
+    if not added.total:
+        return dataset, 0
+
+    try:
+        # O(rows) for datasets stored before sketches were kept, so done
+        # here rather than while holding the row lock
+        base = None if dataset.sketch else stored_sketch(dataset)
+        with span('db'):
+            dataset = _merge_segment(dataset_id, added, writer, base)
+    except Exception:
+        remove_files([writer.name])
+        raise
+    return dataset, added.total
@@ -0,0 +1,159 @@
+import logging
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from core.database import retry_on_locked
+
+from .compression import CompressedUploadError, CountingReader
+from .ingest import CSVParseError, MissingColumnsError, ingest_csv
+from .models import UploadJob
+
+logger = logging.getLogger(__name__)
+
+SPOOL_DIR = 'uploads'
+
+INTERRUPTED = 'Upload was interrupted by a server restart; please upload the file again'
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide worker pool for upload jobs, created on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.UPLOAD_JOB_WORKERS,
+                thread_name_prefix='upload-job',
+            )
+        return _executor
+
+
+def submit_upload(file_obj):
+    """
+    Spool an uploaded file to storage, record a queued ``UploadJob`` and
+    schedule it on the worker pool once the surrounding transaction commits.
+
+    The request's temporary upload is deleted when the response is sent, so
+    the worker reads its own copy.
+    """
+    spool_name = default_storage.save(f'{SPOOL_DIR}/{uuid.uuid4().hex}.csv', file_obj)
+    job = UploadJob.objects.create(
+        file_name=file_obj.name,
+        spool_file=spool_name,
+        total_bytes=file_obj.size or 0,
+    )
+    transaction.on_commit(lambda: dispatch(job.id))
+    return job
+
+
+def dispatch(job_id):
+    if settings.UPLOAD_JOBS_EAGER:
+        run_upload_job(job_id)
+    else:
+        get_executor().submit(run_upload_job, job_id)
+
+
+@retry_on_locked
+def _update(job_id, **fields):
+    # QuerySet.update() skips auto_now, so stamp updated_at explicitly
+    UploadJob.objects.filter(id=job_id).update(updated_at=timezone.now(), **fields)
+
+
+@retry_on_locked
+def _claim(job_id):
+    # Only one run per job, even if the reaper requeued a job that a live
+    # pool still had queued
+    return UploadJob.objects.filter(id=job_id, status=UploadJob.QUEUED).update(
+        status=UploadJob.RUNNING, updated_at=timezone.now(),
+    )
+
+
+def run_upload_job(job_id):
+    """Parse and summarize a spooled upload, recording progress on the job."""
+    eager = settings.UPLOAD_JOBS_EAGER
+    if not eager:
+        close_old_connections()
+    if not _claim(job_id):
+        return
+    job = UploadJob.objects.get(id=job_id)
+    try:
+        with default_storage.open(job.spool_file, 'rb') as raw:
+            reader = CountingReader(raw)
+
+            def progress(rows):
+                _update(job_id, rows_processed=rows, bytes_read=reader.bytes_read)
+
+            dataset = ingest_csv(reader, job.file_name, progress=progress)
+        _update(
+            job_id,
+            status=UploadJob.SUCCEEDED,
+            dataset_id=dataset.id,
+            rows_processed=dataset.record_count,
+            bytes_read=reader.bytes_read,
+        )
+    except (MissingColumnsError, CompressedUploadError, CSVParseError) as e:
+        _update(job_id, status=UploadJob.FAILED, error=str(e))
+    except Exception as e:
+        logger.exception('Upload job %s failed', job_id)
+        _update(job_id, status=UploadJob.FAILED, error=f'Upload failed: {e}')
+    finally:
+        try:
+            default_storage.delete(job.spool_file)
+        except OSError:
+            logger.warning('Could not remove spooled upload %s', job.spool_file)
+        if not eager:
+            # Worker threads hold their own connection; don't leak it
+            connection.close()
+
+
+def reap_stale_jobs(stale_after=None, requeue=False):
+    """
+    Settle jobs left queued or running by a process that went away.
+
+    Jobs live in the memory of the worker pool that accepted them, so a
+    restart strands them. Those not updated for ``stale_after`` seconds
+    (``UPLOAD_JOB_STALE_AFTER``; running jobs update on every chunk) are
+    marked failed and their spool files removed, or with ``requeue`` reset
+    to queued when their spool file still exists. Spool files older than
+    that with no active job are removed too.
+
+    Returns ``(requeued_ids, failed_ids, removed_spool_names)``.
+    """
+    stale_after = settings.UPLOAD_JOB_STALE_AFTER if stale_after is None else stale_after
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=stale_after)
+    active = (UploadJob.QUEUED, UploadJob.RUNNING)
+    requeued, failed, removed = [], [], []
+    for job_id, spool_file in UploadJob.objects.filter(status__in=active, updated_at__lt=cutoff).values_list('id', 'spool_file'):
+        # Re-check staleness in the update so a job that just made progress is left alone
+        still_stale = UploadJob.objects.filter(id=job_id, status__in=active, updated_at__lt=cutoff)
+        if requeue and spool_file and default_storage.exists(spool_file):
+            if still_stale.update(status=UploadJob.QUEUED, rows_processed=0, bytes_read=0, updated_at=now):
+                requeued.append(job_id)
+        elif still_stale.update(status=UploadJob.FAILED, error=INTERRUPTED, updated_at=now):
+            failed.append(job_id)
+
+    in_use = set(UploadJob.objects.filter(status__in=active).values_list('spool_file', flat=True))
+    try:
+        _, names = default_storage.listdir(SPOOL_DIR)
+    except FileNotFoundError:
+        names = []
+    for name in names:
+        path = f'{SPOOL_DIR}/{name}'
+        # Batch uploads spool here too, only for the length of their request
+        if path not in in_use and default_storage.get_modified_time(path) < cutoff:
+            try:
+                default_storage.delete(path)
+                removed.append(path)
+            except OSError:
+                logger.warning('Could not remove spooled upload %s', path)
+    return requeued, failed, removed
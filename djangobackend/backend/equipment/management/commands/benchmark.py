@@ -0,0 +1,88 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from django.test.runner import DiscoverRunner
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from equipment.benchmarks import DEFAULT_ROWS, DEFAULT_TOLERANCE, DEFAULT_TYPES, compare, run_suite
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmark upload, data, summary/history and PDF endpoints on synthetic CSVs, '
+        'in-process against a throwaway test database.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=list(DEFAULT_ROWS),
+                            help='Dataset sizes (e.g. 10000 100000 1000000 10000000)')
+        parser.add_argument('--types', type=int, nargs='+', default=list(DEFAULT_TYPES),
+                            help='Distinct equipment types per dataset')
+        parser.add_argument('--repeat', type=int, default=3, help='Runs per read benchmark (median reported)')
+        parser.add_argument('--csv-dir', help='Where generated CSVs are kept between runs')
+        parser.add_argument('--output', help='Write the JSON results to this file')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='JSON results to compare against')
+        parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                            help='Allowed slowdown against the baseline (0.25 = 25%%)')
+        parser.add_argument('--check', action='store_true', help='Exit with an error on any regression')
+        parser.add_argument('--save-baseline', action='store_true', help='Write the results as the new baseline')
+
+    def handle(self, *args, **options):
+        media_root = tempfile.mkdtemp(prefix='equipment-bench-media-')
+        setup_test_environment()
+        runner = DiscoverRunner(verbosity=0)
+        old_config = runner.setup_databases()
+        try:
+            with override_settings(
+                MEDIA_ROOT=media_root,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+                EQUIPMENT_RETENTION={**settings.EQUIPMENT_RETENTION, 'RUN_ON_UPLOAD': False},
+                UPLOAD_ASYNC_DEFAULT=False,
+            ):
+                report = run_suite(
+                    Client(),
+                    rows=options['rows'],
+                    types=options['types'],
+                    repeat=options['repeat'],
+                    csv_dir=options['csv_dir'],
+                    progress=lambda case: self.stderr.write(f'Benchmarking {case}'),
+                )
+        finally:
+            runner.teardown_databases(old_config)
+            teardown_test_environment()
+            shutil.rmtree(media_root, ignore_errors=True)
+
+        self.stdout.write(f'{"benchmark":<40} {"seconds":>10} {"min":>10}')
+        for result in report['results']:
+            name = f'{result["name"]} {result["rows"]:,}x{result["types"]:,}'
+            self.stdout.write(f'{name:<40} {result["seconds"]:>10.4f} {result["min_seconds"]:>10.4f}')
+
+        for path in filter(None, [options['output'], options['baseline'] if options['save_baseline'] else None]):
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with open(path, 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f'Wrote {path}')
+
+        if options['save_baseline'] or not os.path.exists(options['baseline']):
+            return
+        with open(options['baseline']) as f:
+            baseline = json.load(f)
+        rows = compare(report, baseline, options['tolerance'])
+        if not rows:
+            self.stdout.write(f'No benchmarks in common with {options["baseline"]}')
+            return
+        regressions = [row for row in rows if row[4]]
+        self.stdout.write(f'\nBest times against {options["baseline"]} ({baseline["meta"]["timestamp"]}):')
+        for key, before, after, ratio, regressed in rows:
+            flag = '  REGRESSION' if regressed else ''
+            self.stdout.write(f'{key:<50} {before:>10.4f} -> {after:>10.4f} {ratio:>6.2f}x{flag}')
+        if regressions and options['check']:
+            raise CommandError(f'{len(regressions)} benchmark(s) slower than the baseline by more than '
+                               f'{options["tolerance"]:.0%}')
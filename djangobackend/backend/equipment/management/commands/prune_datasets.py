@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from equipment.retention import apply_retention
+
+
+class Command(BaseCommand):
+    help = 'Delete datasets (and their stored files) outside the retention policy.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-last', type=int, help='Keep only the N most recent datasets')
+        parser.add_argument('--max-age-days', type=float, help='Delete datasets older than this')
+        parser.add_argument('--max-bytes', type=int, help='Keep the newest datasets within this many bytes')
+        parser.add_argument('--dry-run', action='store_true', help='Only report what would be deleted')
+
+    def handle(self, *args, **options):
+        ids, names = apply_retention(
+            keep_last=options['keep_last'],
+            max_age_days=options['max_age_days'],
+            max_bytes=options['max_bytes'],
+            dry_run=options['dry_run'],
+        )
+        verb = 'Would delete' if options['dry_run'] else 'Deleted'
+        self.stdout.write(f'{verb} {len(ids)} dataset(s) and {len(names)} file(s)')
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from equipment.jobs import reap_stale_jobs, run_upload_job
+
+
+class Command(BaseCommand):
+    help = 'Fail or requeue upload jobs stranded by a restart, and remove orphaned spooled uploads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--stale-after', type=int, help='Seconds without progress (default UPLOAD_JOB_STALE_AFTER)')
+        parser.add_argument('--requeue', action='store_true',
+                            help='Run stranded jobs again here instead of failing them, when their upload is still spooled')
+
+    def handle(self, *args, **options):
+        requeued, failed, removed = reap_stale_jobs(options['stale_after'], requeue=options['requeue'])
+        # This process has no worker pool to hand them to, so run them inline
+        for job_id in requeued:
+            run_upload_job(job_id)
+        self.stdout.write(
+            f'Requeued {len(requeued)} job(s), failed {len(failed)} job(s), removed {len(removed)} spooled file(s)'
+        )
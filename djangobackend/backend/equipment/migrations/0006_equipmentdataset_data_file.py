@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0005_alter_equipmentdataset_csv_file'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='data_file',
+            field=models.FileField(blank=True, null=True, upload_to='datasets/'),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='schema',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:10
+
+from django.db import migrations, models
+
+
+def backfill_flags(apps, schema_editor):
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+    for ds in EquipmentDataset.objects.only('id', 'summary').iterator():
+        summary = ds.summary or {}
+        has_flowrate = summary.get('avgFlowrate') is not None
+        has_pressure = summary.get('avgPressure') is not None
+        EquipmentDataset.objects.filter(id=ds.id).update(
+            has_flowrate=has_flowrate,
+            has_pressure=has_pressure,
+            has_numeric=has_flowrate or has_pressure,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0007_equipmentdataset_batch_offsets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='has_flowrate',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='has_numeric',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='has_pressure',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AlterField(
+            model_name='equipmentdataset',
+            name='uploaded_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdataset',
+            index=models.Index(fields=['has_numeric', '-uploaded_at'], name='dataset_numeric_latest'),
+        ),
+        migrations.AddIndex(
+            model_name='equipmentdataset',
+            index=models.Index(fields=['has_flowrate', '-uploaded_at'], name='dataset_flowrate_latest'),
+        ),
+        migrations.RunPython(backfill_flags, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:11
+
+import os
+
+from django.db import migrations, models
+
+
+def backfill_sizes(apps, schema_editor):
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+    from django.conf import settings
+
+    for ds in EquipmentDataset.objects.all():
+        size = 0
+        for f in (ds.data_file, ds.csv_file):
+            try:
+                if f:
+                    size += os.path.getsize(os.path.join(settings.MEDIA_ROOT, f.name))
+            except OSError:
+                pass
+        EquipmentDataset.objects.filter(id=ds.id).update(data_size=size)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0008_equipmentdataset_numeric_flags'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='data_size',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_sizes, migrations.RunPython.noop),
+    ]
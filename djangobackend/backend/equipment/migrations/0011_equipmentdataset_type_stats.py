@@ -0,0 +1,97 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+import os
+
+from django.db import migrations, models
+
+# Frozen copies of the schema and statistics as of this migration, so later
+# changes to the app modules do not change what it computes
+ALIASES = {
+    'type': ('type',),
+    'flowrate': ('flowrate', 'flow rate', 'flow_rate'),
+    'pressure': ('pressure',),
+    'temperature': ('temperature',),
+}
+NUMERIC_COLUMNS = [('Flowrate', 'flowrate'), ('Pressure', 'pressure'), ('Temperature', 'temperature')]
+TYPE_STATS = [('mean', 'avg'), ('min', 'min'), ('max', 'max'), ('tdigest', 'p95')]
+
+
+def read_table(ds):
+    """The dataset's rows as an Arrow table with canonical column names."""
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from django.conf import settings
+
+    if ds.data_file:
+        path = os.path.join(settings.MEDIA_ROOT, ds.data_file.name)
+        return pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if not ds.csv_file:
+        return None
+    df = pd.read_csv(os.path.join(settings.MEDIA_ROOT, ds.csv_file.name))
+    lookup = {}
+    for c in df.columns:
+        lookup.setdefault(str(c).strip().lower(), c)
+    columns = {}
+    for name, aliases in ALIASES.items():
+        source = next((lookup[alias] for alias in aliases if alias in lookup), None)
+        if source is None:
+            continue
+        if name == 'type':
+            columns[name] = pa.array(df[source].astype('string'), type=pa.string(), from_pandas=True)
+        else:
+            values = pd.to_numeric(df[source], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+            columns[name] = pa.array(values, type=pa.float64(), from_pandas=True)
+    return pa.table(columns)
+
+
+def type_statistics(table):
+    """Count and avg/min/max/p95 of every numeric column per type, largest first."""
+    import pyarrow.compute as pc
+
+    if table is None or 'type' not in table.column_names:
+        return []
+    table = table.filter(pc.is_valid(table.column('type')))
+    present = [(key, name) for key, name in NUMERIC_COLUMNS if name in table.column_names]
+    p95 = pc.TDigestOptions(q=0.95)
+    aggregations = [('type', 'count')]
+    for _, name in present:
+        aggregations += [(name, agg, p95) if agg == 'tdigest' else (name, agg) for agg, _ in TYPE_STATS]
+
+    groups = []
+    for row in table.group_by('type').aggregate(aggregations).to_pylist():
+        group = {'type': row['type'], 'count': row['type_count']}
+        for key, name in present:
+            for agg, prefix in TYPE_STATS:
+                value = row[f'{name}_{agg}']
+                group[f'{prefix}{key}'] = (value[0] if value else None) if agg == 'tdigest' else value
+        groups.append(group)
+    groups.sort(key=lambda group: group['count'], reverse=True)
+    return groups
+
+
+def backfill_type_stats(apps, schema_editor):
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+
+    for ds in EquipmentDataset.objects.all():
+        try:
+            table = read_table(ds)
+        except (OSError, ValueError):
+            continue
+        EquipmentDataset.objects.filter(id=ds.id).update(type_stats=type_statistics(table))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0010_uploadjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='type_stats',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.RunPython(backfill_type_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:24
+
+from django.db import migrations, models
+
+
+def backfill_metrics(apps, schema_editor):
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+    keys = [
+        (f'{stat}{key}', f'{stat}_{key.lower()}')
+        for key in ('Flowrate', 'Pressure', 'Temperature')
+        for stat in ('avg', 'min', 'max')
+    ]
+    for ds in EquipmentDataset.objects.only('id', 'summary').iterator():
+        summary = ds.summary or {}
+        EquipmentDataset.objects.filter(id=ds.id).update(
+            **{field: summary.get(key) for key, field in keys}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0011_equipmentdataset_type_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='avg_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='avg_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='avg_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='max_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='max_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='max_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='min_flowrate',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='min_pressure',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='min_temperature',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_metrics, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,110 @@
+# Generated by Django 5.2.18 on 2026-10-18 03:34
+
+import math
+import os
+
+from django.db import migrations, models
+
+# Frozen copies of the schema and statistics as of this migration, so later
+# changes to the app modules do not change what it computes
+ALIASES = {
+    'flowrate': ('flowrate', 'flow rate', 'flow_rate'),
+    'pressure': ('pressure',),
+    'temperature': ('temperature',),
+}
+NUMERIC_COLUMNS = [('Flowrate', 'flowrate'), ('Pressure', 'pressure'), ('Temperature', 'temperature')]
+QUANTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+HIST_BINS = 64
+
+
+def read_columns(ds):
+    """``{column: float64 array}`` of the dataset's numeric columns."""
+    import numpy as np
+    import pandas as pd
+    import pyarrow as pa
+    from django.conf import settings
+
+    if ds.data_file:
+        names = [ds.data_file.name] + [segment['name'] for segment in ds.segments or []]
+        tables = [
+            pa.ipc.open_file(pa.memory_map(os.path.join(settings.MEDIA_ROOT, name), 'r')).read_all()
+            for name in names
+        ]
+        table = pa.concat_tables(tables)
+        return {
+            name: table.column(name).to_numpy().astype(np.float64)
+            for name in ALIASES if name in table.column_names
+        }
+    if not ds.csv_file:
+        return {}
+    df = pd.read_csv(os.path.join(settings.MEDIA_ROOT, ds.csv_file.name))
+    lookup = {}
+    for c in df.columns:
+        lookup.setdefault(str(c).strip().lower(), c)
+    columns = {}
+    for name, aliases in ALIASES.items():
+        source = next((lookup[alias] for alias in aliases if alias in lookup), None)
+        if source is not None:
+            columns[name] = pd.to_numeric(df[source], errors='coerce').to_numpy(dtype=np.float64, na_value=np.nan)
+    return columns
+
+
+def histogram(values):
+    """``{'edges', 'counts'}`` over at most HIST_BINS bins of a power-of-two width."""
+    import numpy as np
+
+    lo, hi = float(values.min()), float(values.max())
+    span = hi - lo
+    exp = math.ceil(math.log2(span / HIST_BINS)) if span > 0 else -1074
+    exp = max(exp, math.frexp(max(abs(lo), abs(hi)))[1] - 52)
+    while math.floor(hi / 2.0 ** exp) - math.floor(lo / 2.0 ** exp) >= HIST_BINS:
+        exp += 1
+    width = 2.0 ** exp
+    start = math.floor(lo / width)
+    counts = np.bincount((np.floor(values / width) - start).astype(np.int64), minlength=HIST_BINS)
+    filled = np.flatnonzero(counts)
+    first, last = filled[0], filled[-1] + 1
+    edges = (start + np.arange(first, last + 1)) * width
+    return {'edges': edges.tolist(), 'counts': counts[first:last].tolist()}
+
+
+def backfill_histograms(apps, schema_editor):
+    # Sketches stored before histograms existed cannot be extended, so they
+    # are dropped (the next append rebuilds one from the rows); the summary
+    # gains quantiles and the histograms are computed from the stored rows
+    import numpy as np
+
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+
+    for ds in EquipmentDataset.objects.all():
+        try:
+            columns = read_columns(ds)
+        except (OSError, ValueError):
+            continue
+        summary = dict(ds.summary or {})
+        histograms = {}
+        for key, name in NUMERIC_COLUMNS:
+            values = columns.get(name)
+            values = values[np.isfinite(values)] if values is not None else np.empty(0)
+            qs = np.quantile(values, [q for _, q in QUANTILES]).tolist() if len(values) else [None] * len(QUANTILES)
+            for (prefix, _), value in zip(QUANTILES, qs):
+                summary[f'{prefix}{key}'] = value
+            if len(values):
+                histograms[name] = histogram(values)
+        EquipmentDataset.objects.filter(id=ds.id).update(summary=summary, histograms=histograms, sketch=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0013_equipmentdataset_sketch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='histograms',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.RunPython(backfill_histograms, migrations.RunPython.noop),
+    ]
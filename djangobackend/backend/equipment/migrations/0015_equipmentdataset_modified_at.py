@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 04:22
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import F
+
+
+def backfill_modified_at(apps, schema_editor):
+    # Existing datasets were last written when they were uploaded, or when
+    # appended to, which was not recorded
+    EquipmentDataset = apps.get_model('equipment', 'EquipmentDataset')
+    EquipmentDataset.objects.update(modified_at=F('uploaded_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('equipment', '0014_equipmentdataset_histograms'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='equipmentdataset',
+            name='modified_at',
+            field=models.DateTimeField(db_index=True, default=django.utils.timezone.now),
+        ),
+        migrations.RunPython(backfill_modified_at, migrations.RunPython.noop),
+    ]
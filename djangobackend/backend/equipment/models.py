@@ -1,14 +1,111 @@
+import uuid
+
 from django.db import models
+from django.utils import timezone
+
+# Summary key -> denormalized column, so trends across many datasets read
+# plain columns instead of decoding every summary
+METRIC_FIELDS = {
+    f'{stat}{key}': f'{stat}_{key.lower()}'
+    for key in ('Flowrate', 'Pressure', 'Temperature')
+    for stat in ('avg', 'min', 'max')
+}
+
 
 class EquipmentDataset(models.Model):
     file_name = models.CharField(max_length=255)
-    uploaded_at = models.DateTimeField(auto_now_add=True)
+    uploaded_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    # Last write: the upload, or the latest append; retention ranks by this
+    modified_at = models.DateTimeField(default=timezone.now, db_index=True)
     record_count = models.IntegerField()
     summary = models.JSONField()
+    # Per-type count and avg/min/max/p95 per numeric column, computed at ingest
+    type_stats = models.JSONField(default=list, blank=True)
+    # Fixed-bin histogram per numeric column: {column: {'edges', 'counts'}}
+    histograms = models.JSONField(default=dict, blank=True)
+    # Mergeable statistics (sketches.DatasetSketch) that appends update
+    sketch = models.BinaryField(null=True, blank=True, editable=False)
     csv_file = models.FileField(upload_to='datasets/', null=True, blank=True)
+    # Typed Arrow IPC copy of the upload, memory-mapped on read
+    data_file = models.FileField(upload_to='datasets/', null=True, blank=True)
+    # Stored columns: [{'name': ..., 'type': ..., 'source': <CSV header>}]
+    schema = models.JSONField(default=list, blank=True)
+    # Arrow files of appended rows: [{'name': ..., 'batches': <record batches>}]
+    segments = models.JSONField(default=list, blank=True)
+    # First row number of each record batch in data_file and then in each
+    # segment, used for paging
+    batch_offsets = models.JSONField(default=list, blank=True)
+    # Bytes used by the stored files, for the retention size quota
+    data_size = models.BigIntegerField(default=0)
+    # Denormalized from summary so "latest usable dataset" is an index lookup
+    has_flowrate = models.BooleanField(default=False)
+    has_pressure = models.BooleanField(default=False)
+    has_numeric = models.BooleanField(default=False)
+    avg_flowrate = models.FloatField(null=True, blank=True)
+    min_flowrate = models.FloatField(null=True, blank=True)
+    max_flowrate = models.FloatField(null=True, blank=True)
+    avg_pressure = models.FloatField(null=True, blank=True)
+    min_pressure = models.FloatField(null=True, blank=True)
+    max_pressure = models.FloatField(null=True, blank=True)
+    avg_temperature = models.FloatField(null=True, blank=True)
+    min_temperature = models.FloatField(null=True, blank=True)
+    max_temperature = models.FloatField(null=True, blank=True)
 
     class Meta:
         ordering = ['-uploaded_at']
+        indexes = [
+            models.Index(fields=['has_numeric', '-uploaded_at'], name='dataset_numeric_latest'),
+            models.Index(fields=['has_flowrate', '-uploaded_at'], name='dataset_flowrate_latest'),
+        ]
 
     def __str__(self):
         return self.file_name
+
+    def refresh_denormalized(self):
+        """Recompute the has_* flags and metric columns from ``summary``."""
+        summary = self.summary or {}
+        self.has_flowrate = summary.get('avgFlowrate') is not None
+        self.has_pressure = summary.get('avgPressure') is not None
+        self.has_numeric = self.has_flowrate or self.has_pressure
+        for key, field in METRIC_FIELDS.items():
+            setattr(self, field, summary.get(key))
+
+    def save(self, *args, **kwargs):
+        self.refresh_denormalized()
+        super().save(*args, **kwargs)
+
+
+class UploadJob(models.Model):
+    """Background processing state of an upload accepted with 202."""
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    file_name = models.CharField(max_length=255)
+    # Copy of the request body the worker parses; removed when the job ends
+    spool_file = models.CharField(max_length=255, blank=True)
+    status = models.CharField(max_length=16, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    total_bytes = models.BigIntegerField(default=0)
+    bytes_read = models.BigIntegerField(default=0)
+    rows_processed = models.BigIntegerField(default=0)
+    # Plain id rather than a foreign key: retention bulk-deletes datasets
+    # without cascading, and the job only reports what it produced
+    dataset_id = models.BigIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.file_name} ({self.status})'
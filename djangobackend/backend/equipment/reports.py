@@ -0,0 +1,217 @@
+import glob
+import hashlib
+import os
+import uuid
+
+import orjson
+from reportlab.graphics import renderPDF
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+from core.instrumentation import span
+
+from . import storage
+from .downsample import BucketStats
+from .summary import NUMERIC_COLUMNS
+
+REPORT_DIR = 'reports'
+
+PAGE_WIDTH, PAGE_HEIGHT = A4
+MARGIN = 50
+LINE = 16
+# Points per line chart; the series is bucketed down to this before drawing
+CHART_POINTS = 400
+# Bars in the type distribution chart; the rest are listed in the tables
+CHART_TYPES = 20
+
+
+def report_name(dataset):
+    """Storage name of the rendered report for the dataset's current summary."""
+    digest = hashlib.sha1(
+        orjson.dumps([dataset.record_count, dataset.summary], option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    ).hexdigest()[:16]
+    return f'{REPORT_DIR}/{dataset.id}-{digest}.pdf'
+
+
+def get_report(dataset):
+    """
+    Return the path of the dataset's PDF report, rendering it only if no
+    report exists for this dataset id and summary hash yet.
+    """
+    path = storage.dataset_path(report_name(dataset))
+    if not os.path.exists(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Render under a unique name so concurrent requests never serve a
+        # half-written file
+        tmp_path = f'{path}.{uuid.uuid4().hex}.part'
+        try:
+            with span('render_pdf'):
+                render_report(dataset, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return path
+
+
+def remove_reports(dataset_ids):
+    for dataset_id in dataset_ids:
+        for path in glob.glob(storage.dataset_path(f'{REPORT_DIR}/{dataset_id}-*.pdf')):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+class ReportCanvas:
+    """Thin cursor over a reportlab canvas that starts new pages as needed."""
+
+    def __init__(self, path, title):
+        self.canvas = canvas.Canvas(path, pagesize=A4, pageCompression=1)
+        self.canvas.setTitle(title)
+        self.title = title
+        self.page = 0
+        self.new_page()
+
+    def new_page(self):
+        if self.page:
+            self.canvas.showPage()
+        self.page += 1
+        self.y = PAGE_HEIGHT - MARGIN
+        self.canvas.setFont('Helvetica', 8)
+        self.canvas.drawRightString(PAGE_WIDTH - MARGIN, MARGIN / 2, f'{self.title} - page {self.page}')
+
+    def ensure(self, height):
+        if self.y - height < MARGIN:
+            self.new_page()
+
+    def heading(self, text, size=14):
+        self.ensure(size + LINE)
+        self.canvas.setFont('Helvetica-Bold', size)
+        self.canvas.drawString(MARGIN, self.y, text)
+        self.y -= size + 8
+
+    def row(self, cells, widths, bold=False):
+        self.ensure(LINE)
+        self.canvas.setFont('Helvetica-Bold' if bold else 'Helvetica', 9)
+        x = MARGIN
+        for cell, width in zip(cells, widths):
+            self.canvas.drawString(x, self.y, str(cell)[:int(width / 5)])
+            x += width
+        self.y -= LINE
+
+    def drawing(self, drawing):
+        self.ensure(drawing.height + LINE)
+        renderPDF.draw(drawing, self.canvas, MARGIN, self.y - drawing.height)
+        self.y -= drawing.height + LINE
+
+    def save(self):
+        self.canvas.save()
+
+
+def _fmt(value):
+    return '-' if value is None else f'{value:,.2f}'
+
+
+def _type_chart(distribution):
+    items = list(distribution.items())[:CHART_TYPES]
+    drawing = Drawing(PAGE_WIDTH - 2 * MARGIN, 200)
+    chart = VerticalBarChart()
+    chart.x, chart.y = 30, 40
+    chart.width, chart.height = drawing.width - 40, 150
+    chart.data = [[count for _, count in items]]
+    chart.categoryAxis.categoryNames = [str(name)[:12] for name, _ in items]
+    chart.categoryAxis.labels.angle = 30
+    chart.categoryAxis.labels.boxAnchor = 'ne'
+    chart.valueAxis.valueMin = 0
+    chart.bars[0].fillColor = colors.HexColor('#3b82f6')
+    drawing.add(chart)
+    return drawing
+
+
+def _series_chart(stats):
+    drawing = Drawing(PAGE_WIDTH - 2 * MARGIN, 160)
+    if not stats['x']:
+        return drawing
+    plot = LinePlot()
+    plot.x, plot.y = 40, 20
+    plot.width, plot.height = drawing.width - 50, 130
+    plot.data = [
+        list(zip(stats['x'], stats['min'])),
+        list(zip(stats['x'], stats['mean'])),
+        list(zip(stats['x'], stats['max'])),
+    ]
+    plot.lines[0].strokeColor = colors.lightblue
+    plot.lines[1].strokeColor = colors.HexColor('#1d4ed8')
+    plot.lines[2].strokeColor = colors.lightblue
+    drawing.add(plot)
+    return drawing
+
+
+def render_report(dataset, path):
+    """
+    Draw the multi-page report for ``dataset`` into ``path``.
+
+    Everything drawn comes from the stored summary and per-type statistics
+    and from series bucketed one record batch at a time, so memory depends
+    on the number of equipment types, the chart points and the batch size,
+    not on the number of rows.
+    """
+    summary = dataset.summary or {}
+    report = ReportCanvas(path, f'Equipment Data Report: {dataset.file_name}')
+    c = report.canvas
+
+    report.heading(report.title, size=16)
+    c.setFont('Helvetica', 10)
+    c.drawString(MARGIN, report.y, f'Uploaded {dataset.uploaded_at:%Y-%m-%d %H:%M} UTC - {dataset.record_count:,} records')
+    report.y -= 2 * LINE
+
+    report.heading('Summary')
+    widths = [120, 110, 110, 110]
+    report.row(['Parameter', 'Average', 'Minimum', 'Maximum'], widths, bold=True)
+    for key, _ in NUMERIC_COLUMNS:
+        report.row([
+            key,
+            _fmt(summary.get(f'avg{key}')),
+            _fmt(summary.get(f'min{key}')),
+            _fmt(summary.get(f'max{key}')),
+        ], widths)
+    report.y -= LINE
+
+    distribution = summary.get('typeDistribution') or {}
+    if distribution:
+        report.heading('Equipment type distribution')
+        report.drawing(_type_chart(distribution))
+
+    series = {}
+    for batch in storage.iter_batches(dataset, [name for _, name in NUMERIC_COLUMNS]):
+        for name in batch.schema.names:
+            if name not in series:
+                series[name] = BucketStats(dataset.record_count, CHART_POINTS)
+            series[name].add(batch.column(name).to_numpy(zero_copy_only=False))
+    for key, name in NUMERIC_COLUMNS:
+        if name in series:
+            report.heading(f'{key} across records (bucket min / mean / max)', size=12)
+            report.drawing(_series_chart(series[name].result()))
+
+    groups = dataset.type_stats
+    if groups:
+        report.new_page()
+        report.heading('Per-type statistics')
+        widths = [125, 55] + [105] * 3
+        report.row(['Type', 'Count'] + [f'{key} avg (min-max)' for key, _ in NUMERIC_COLUMNS], widths, bold=True)
+        for group in groups:
+            cells = [group['type'], f"{group['count']:,}"]
+            for key, _ in NUMERIC_COLUMNS:
+                if f'avg{key}' in group:
+                    cells.append(
+                        f"{_fmt(group[f'avg{key}'])} ({_fmt(group[f'min{key}'])}-{_fmt(group[f'max{key}'])})"
+                    )
+                else:
+                    cells.append('-')
+            report.row(cells, widths)
+    report.save()
@@ -0,0 +1,102 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connections, router, transaction
+from django.db.models import F, Sum, Window
+from django.utils import timezone
+
+from core.database import retry_on_locked
+
+from .caching import bump_version
+from .models import EquipmentDataset
+from .reports import remove_reports
+
+logger = logging.getLogger(__name__)
+
+# Ids per DELETE statement; stays well below SQLite's bound-parameter limit
+DELETE_BATCH = 500
+
+
+def retention_policy():
+    """Return the configured ``EQUIPMENT_RETENTION`` policy with defaults."""
+    policy = {'KEEP_LAST': 5, 'MAX_AGE_DAYS': None, 'MAX_BYTES': None, 'RUN_ON_UPLOAD': True}
+    policy.update(getattr(settings, 'EQUIPMENT_RETENTION', {}))
+    return policy
+
+
+def _expired(keep_last, max_age_days, max_bytes, now, exempt=()):
+    """
+    Return ``{id: (file names...)}`` for datasets outside the policy, never
+    including the ids in ``exempt``. Datasets are ranked and aged by their
+    last write, so one that is still being appended to counts as new.
+    """
+    newest_first = EquipmentDataset.objects.order_by('-modified_at', '-id')
+    fields = ('id', 'data_file', 'csv_file', 'segments')
+    candidates = []
+    if keep_last is not None:
+        candidates.append(newest_first.values_list(*fields)[keep_last:])
+    if max_age_days is not None:
+        cutoff = now - timedelta(days=max_age_days)
+        candidates.append(newest_first.filter(modified_at__lt=cutoff).values_list(*fields))
+    if max_bytes is not None:
+        # Running total from the newest dataset; everything past the quota goes
+        running = newest_first.annotate(
+            used=Window(Sum('data_size'), order_by=[F('modified_at').desc(), F('id').desc()]),
+        )
+        candidates.append(running.filter(used__gt=max_bytes).values_list(*fields))
+    return {
+        row[0]: (row[1], row[2], *(segment['name'] for segment in row[3] or []))
+        for qs in candidates for row in qs
+        if row[0] not in exempt
+    }
+
+
+def remove_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except OSError:
+            logger.warning('Could not remove dataset file %s', name)
+
+
+@retry_on_locked
+def apply_retention(keep_last=None, max_age_days=None, max_bytes=None, dry_run=False, exempt=()):
+    """
+    Delete datasets outside the retention policy and their stored files.
+
+    Arguments left as None fall back to ``EQUIPMENT_RETENTION``. Datasets
+    in ``exempt`` are kept and still count towards the policy, so only
+    older datasets make room for them. Rows are
+    removed with bulk ``DELETE ... WHERE id IN (...)`` statements inside one
+    transaction; files are removed only once that transaction commits.
+    Returns ``(deleted_ids, removed_file_names)``.
+    """
+    policy = retention_policy()
+    keep_last = policy['KEEP_LAST'] if keep_last is None else keep_last
+    max_age_days = policy['MAX_AGE_DAYS'] if max_age_days is None else max_age_days
+    max_bytes = policy['MAX_BYTES'] if max_bytes is None else max_bytes
+
+    using = router.db_for_write(EquipmentDataset)
+    with transaction.atomic(using=using):
+        expired = _expired(keep_last, max_age_days, max_bytes, timezone.now(), frozenset(exempt))
+        ids = sorted(expired)
+        names = [name for files in expired.values() for name in files if name]
+        if dry_run or not ids:
+            return ids, names
+        quote = connections[using].ops.quote_name
+        table, pk = quote(EquipmentDataset._meta.db_table), quote(EquipmentDataset._meta.pk.column)
+        with connections[using].cursor() as cursor:
+            for i in range(0, len(ids), DELETE_BATCH):
+                # Plain SQL skips the collector and per-object signals; there
+                # is nothing to cascade and the version is bumped once below
+                batch = ids[i:i + DELETE_BATCH]
+                cursor.execute(
+                    f'DELETE FROM {table} WHERE {pk} IN ({", ".join(["%s"] * len(batch))})',
+                    batch,
+                )
+        transaction.on_commit(lambda: remove_files(names), using=using)
+        transaction.on_commit(lambda: remove_reports(ids), using=using)
+        transaction.on_commit(bump_version, using=using)
+    return ids, names
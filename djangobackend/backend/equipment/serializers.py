@@ -1,7 +1,93 @@
+import orjson
+import pyarrow.compute as pc
+from django.core.files.storage import default_storage
+from django.db import models
 from rest_framework import serializers
 from .models import EquipmentDataset
 
+# Row JSON key -> stored column; resolved once per dataset, never per row
+RECORD_FIELDS = [
+    ('equipmentName', 'equipment_name'),
+    ('type', 'type'),
+    ('flowrate', 'flowrate'),
+    ('pressure', 'pressure'),
+    ('temperature', 'temperature'),
+]
+
+
+# Fields a dataset list entry can carry, the ones the dashboards read; ?fields=
+# picks a subset of these. The storage bookkeeping (schema, batch offsets,
+# data file, flags), per-type statistics, histograms and metric columns stay
+# internal or are served by TypeStatsView, DistributionView and TrendsView, so
+# entries do not grow with the dataset
+LIST_FIELDS = ['id', 'file_name', 'uploaded_at', 'record_count', 'summary', 'csv_file']
+
+
 class EquipmentDatasetSerializer(serializers.ModelSerializer):
     class Meta:
         model = EquipmentDataset
-        fields = '__all__'
+        fields = LIST_FIELDS
+
+
+def dataset_list_values(queryset, fields=None):
+    """
+    Represent datasets like ``EquipmentDatasetSerializer`` does, straight
+    from one ``.values()`` query that selects only ``fields``.
+
+    Read-only lists skip model instances and per-field serializer calls;
+    file fields become storage URLs, as the serializer would render them.
+    """
+    fields = fields or LIST_FIELDS
+    return _render_file_fields(list(queryset.values(*fields)), fields)
+
+
+async def adataset_list_values(queryset, fields=None):
+    """``dataset_list_values`` for async views, with the async ORM."""
+    fields = fields or LIST_FIELDS
+    return _render_file_fields([row async for row in queryset.values(*fields)], fields)
+
+
+def _render_file_fields(rows, fields):
+    file_fields = [
+        f for f in fields if isinstance(EquipmentDataset._meta.get_field(f), models.FileField)
+    ]
+    for row in rows:
+        for name in file_fields:
+            row[name] = default_storage.url(row[name]) if row[name] else None
+    return rows
+
+
+def _column_values(batch, name):
+    """Return one stored column of ``batch`` as a Python list, column-wise."""
+    index = batch.schema.get_field_index(name)
+    if index < 0:
+        return [''] * batch.num_rows if name in ('equipment_name', 'type') else [None] * batch.num_rows
+    column = batch.column(index)
+    if name in ('equipment_name', 'type'):
+        return pc.fill_null(column, '').to_pylist()
+    # Nulls become NaN here, which orjson writes as null
+    return column.to_numpy(zero_copy_only=False).tolist()
+
+
+def iter_records_json(table, start=0):
+    """
+    Serialize an Arrow table of equipment rows as a JSON array, one record
+    batch at a time, so large datasets are streamed rather than built as a
+    single response body.
+    """
+    yield b'['
+    row_id = start
+    first = True
+    for batch in table.to_batches():
+        if not batch.num_rows:
+            continue
+        names, types, flow, pressure, temp = (_column_values(batch, col) for _, col in RECORD_FIELDS)
+        records = [
+            {'id': i, 'equipmentName': n, 'type': t, 'flowrate': f, 'pressure': p, 'temperature': tp}
+            for i, n, t, f, p, tp in zip(range(row_id, row_id + batch.num_rows), names, types, flow, pressure, temp)
+        ]
+        body = orjson.dumps(records)[1:-1]
+        yield body if first else b',' + body
+        first = False
+        row_id += batch.num_rows
+    yield b']'
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .caching import bump_version
+from .models import EquipmentDataset
+
+
+@receiver(post_save, sender=EquipmentDataset)
+@receiver(post_delete, sender=EquipmentDataset)
+def invalidate_dataset_responses(sender, using, **kwargs):
+    # Bump once the change is visible: bumping inside the transaction would
+    # let a concurrent read cache the pre-commit data under the new version
+    transaction.on_commit(bump_version, using=using)
@@ -0,0 +1,401 @@
+import io
+import math
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from .summary import NUMERIC_COLUMNS, build_summary
+
+# t-digest compression, about twice the centroids kept per column: the
+# dataset-wide digests serve p50-p99 to within ~0.3% on skewed data, the
+# per-type ones stay small with many types (~1% at p95)
+DIGEST_DELTA = 300
+TYPE_DIGEST_DELTA = 100
+
+# Quantiles kept in the summary as ``<stat><Column>`` keys
+QUANTILES = (('p50', 0.5), ('p95', 0.95), ('p99', 0.99))
+
+# Fixed-width histogram bins per numeric column. The bin width is a power of
+# two and edges are multiples of it, so two histograms line up once the
+# narrower one is coarsened and merge exactly
+HIST_BINS = 64
+
+# Group of rows without a type; kept in the digests so dataset-wide
+# quantiles include them, but never reported as a type of its own
+NO_TYPE = -1
+
+
+def compress(groups, means, weights, delta):
+    """
+    Merge weighted centroids into t-digest clusters, separately per group.
+
+    Centroids are sorted by ``(group, mean)`` and every centroid joins the
+    cluster of its k1-scale bucket, ``floor(delta / 2pi * asin(2q - 1))``,
+    where ``q`` is its quantile within the group. Tails keep small clusters
+    and the middle large ones, so quantile error is smallest at the
+    extremes. All groups are compressed in one vectorized pass. Returns
+    ``(groups, means, weights)``.
+    """
+    n = len(means)
+    if n == 0:
+        return groups, means, weights
+    # Sort by mean, then stably by group (much faster than np.lexsort)
+    order = np.argsort(means)
+    if (groups != groups[0]).any():
+        order = order[np.argsort(groups[order], kind='stable')]
+    groups, means, weights = groups[order], means[order], weights[order]
+
+    group_start = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]])
+    group_of = np.repeat(np.arange(len(group_start)), np.diff(np.r_[group_start, n]))
+    before = np.cumsum(weights) - weights
+    before -= before[group_start][group_of]
+    totals = np.add.reduceat(weights, group_start)
+    q = (before + weights / 2) / totals[group_of]
+    bucket = np.floor(delta / (2 * np.pi) * np.arcsin(np.clip(2 * q - 1, -1, 1)))
+
+    starts = np.flatnonzero(np.r_[True, (group_of[1:] != group_of[:-1]) | (bucket[1:] != bucket[:-1])])
+    merged_weights = np.add.reduceat(weights, starts)
+    merged_means = np.add.reduceat(means * weights, starts) / merged_weights
+    return groups[starts], merged_means, merged_weights
+
+
+def digest_quantiles(means, weights, lo, hi, qs):
+    """Interpolate quantiles ``qs`` from one group's sorted centroids."""
+    if not len(means):
+        return [None] * len(qs)
+    total = weights.sum()
+    mids = np.cumsum(weights) - weights / 2
+    xs = np.r_[0.0, mids, total]
+    ys = np.r_[lo, means, hi]
+    return [float(v) for v in np.interp(np.asarray(qs) * total, xs, ys)]
+
+
+def fit_exponent(lo, hi, at_least=None):
+    """
+    Smallest ``e`` (not below ``at_least``) such that bins of width ``2**e``
+    cover ``[lo, hi]`` in at most ``HIST_BINS`` bins. Bin indexes are kept
+    below 2**52 so they stay exact as float64.
+    """
+    span = hi - lo
+    exp = math.ceil(math.log2(span / HIST_BINS)) if span > 0 else -1074
+    exp = max(exp, math.frexp(max(abs(lo), abs(hi)))[1] - 52)
+    if at_least is not None:
+        exp = max(exp, at_least)
+    while math.floor(hi / 2.0 ** exp) - math.floor(lo / 2.0 ** exp) >= HIST_BINS:
+        exp += 1
+    return exp
+
+
+def histogram_range(exp, start, counts):
+    """Lower edges of the first and last non-empty bins."""
+    filled = np.flatnonzero(counts)
+    width = 2.0 ** exp
+    return (start + filled[0]) * width, (start + filled[-1]) * width
+
+
+def rebin(exp, start, counts, new_exp, new_start):
+    """Coarsen bins of width ``2**exp`` to width ``2**new_exp``."""
+    filled = np.flatnonzero(counts)
+    target = (np.floor((start + filled) * 2.0 ** (exp - new_exp)) - new_start).astype(np.int64)
+    result = np.zeros(HIST_BINS, dtype=np.int64)
+    np.add.at(result, target, counts[filled])
+    return result
+
+
+def build_histogram(values):
+    """``(exp, start, counts)`` of finite ``values`` at the narrowest width."""
+    lo, hi = float(values.min()), float(values.max())
+    exp = fit_exponent(lo, hi)
+    width = 2.0 ** exp
+    start = math.floor(lo / width)
+    index = (np.floor(values / width) - start).astype(np.int64)
+    return exp, start, np.bincount(index, minlength=HIST_BINS).astype(np.int64)
+
+
+class DatasetSketch:
+    """
+    Mergeable statistics of a dataset: row count, per-column count, sum,
+    sum of squares, min and max, a fixed-bin histogram and a t-digest per
+    column, rows per type, and the same statistics and digests per type.
+
+    Sketches of two row sets merge into the sketch of their union, so an
+    append only has to sketch the new rows. The summary (including
+    quantiles), the per-type statistics and the histograms are all derived
+    from the sketch.
+    """
+
+    WIDTH = len(NUMERIC_COLUMNS)
+
+    def __init__(self):
+        width = self.WIDTH
+        self.total = 0
+        self.present = np.zeros(width, dtype=bool)
+        self.count = np.zeros(width, dtype=np.int64)
+        self.sum = np.zeros(width)
+        self.sumsq = np.zeros(width)
+        self.min = np.full(width, np.inf)
+        self.max = np.full(width, -np.inf)
+        # Per column: bin width exponent, index of the first bin, bin counts
+        self.hist_exp = np.zeros(width, dtype=np.int64)
+        self.hist_start = np.zeros(width, dtype=np.int64)
+        self.hist_counts = np.zeros((width, HIST_BINS), dtype=np.int64)
+        self.types = []
+        self._type_index = {}
+        self.type_rows = np.zeros(0, dtype=np.int64)
+        self.type_count = np.zeros((0, width), dtype=np.int64)
+        self.type_sum = np.zeros((0, width))
+        self.type_min = np.zeros((0, width))
+        self.type_max = np.zeros((0, width))
+        # Per column: centroid (group, mean, weight) arrays, for the whole
+        # dataset (group 0) and per type (group = type index), sorted by group
+        self.digests = [self._empty_digest() for _ in range(width)]
+        self.type_digests = [self._empty_digest() for _ in range(width)]
+
+    @staticmethod
+    def _empty_digest():
+        return np.zeros(0, dtype=np.int64), np.zeros(0), np.zeros(0)
+
+    def _add_types(self, names):
+        """Return the type index of every name, registering new ones."""
+        new = [name for name in names if name not in self._type_index]
+        if new:
+            for name in new:
+                self._type_index[name] = len(self.types)
+                self.types.append(name)
+            grow = len(new)
+            width = self.WIDTH
+            self.type_rows = np.r_[self.type_rows, np.zeros(grow, dtype=np.int64)]
+            self.type_count = np.vstack([self.type_count, np.zeros((grow, width), dtype=np.int64)])
+            self.type_sum = np.vstack([self.type_sum, np.zeros((grow, width))])
+            self.type_min = np.vstack([self.type_min, np.full((grow, width), np.inf)])
+            self.type_max = np.vstack([self.type_max, np.full((grow, width), -np.inf)])
+        return np.array([self._type_index[name] for name in names], dtype=np.int64)
+
+    def _type_codes(self, chunk):
+        if 'type' not in chunk.columns:
+            return np.full(len(chunk), NO_TYPE, dtype=np.int64)
+        types = chunk['type']
+        if not isinstance(types.dtype, pd.CategoricalDtype):
+            types = types.astype('category')
+        index = self._add_types([str(c) for c in types.cat.categories])
+        codes = types.cat.codes.to_numpy(dtype=np.int64)
+        return np.where(codes >= 0, index[codes] if len(index) else NO_TYPE, NO_TYPE)
+
+    def update(self, chunk):
+        """Add the rows of a parsed chunk with canonical column names."""
+        self.total += len(chunk)
+        codes = self._type_codes(chunk)
+        typed = codes >= 0
+        self.type_rows += np.bincount(codes[typed], minlength=len(self.types))
+        for i, (_, name) in enumerate(NUMERIC_COLUMNS):
+            if name not in chunk.columns:
+                continue
+            self.present[i] = True
+            values = chunk[name].to_numpy(dtype=np.float64, na_value=np.nan)
+            valid = ~np.isnan(values)
+            values, groups = values[valid], codes[valid]
+            if not len(values):
+                continue
+            self.count[i] += len(values)
+            self.sum[i] += values.sum()
+            self.sumsq[i] += np.dot(values, values)
+            self.min[i] = min(self.min[i], values.min())
+            self.max[i] = max(self.max[i], values.max())
+
+            finite = values[np.isfinite(values)]
+            if len(finite):
+                self._fold_histogram(i, *build_histogram(finite))
+
+            has_type = groups >= 0
+            g, v = groups[has_type], values[has_type]
+            self.type_count[:, i] += np.bincount(g, minlength=len(self.types))
+            self.type_sum[:, i] += np.bincount(g, weights=v, minlength=len(self.types))
+            np.minimum.at(self.type_min[:, i], g, v)
+            np.maximum.at(self.type_max[:, i], g, v)
+
+            ones = np.ones(len(values))
+            self.digests[i] = self._absorb(self.digests[i], np.zeros(len(values), dtype=np.int64), values, ones, DIGEST_DELTA)
+            self.type_digests[i] = self._absorb(self.type_digests[i], groups, values, ones, TYPE_DIGEST_DELTA)
+
+    def _fold_histogram(self, i, exp, start, counts):
+        """Add bins ``(exp, start, counts)`` to column ``i``'s histogram."""
+        if not counts.any():
+            return
+        if not self.hist_counts[i].any():
+            self.hist_exp[i], self.hist_start[i], self.hist_counts[i] = exp, start, counts
+            return
+        own = (int(self.hist_exp[i]), int(self.hist_start[i]), self.hist_counts[i])
+        lo1, hi1 = histogram_range(*own)
+        lo2, hi2 = histogram_range(exp, start, counts)
+        lo, hi = min(lo1, lo2), max(hi1, hi2)
+        new_exp = fit_exponent(lo, hi, max(own[0], exp))
+        new_start = math.floor(lo / 2.0 ** new_exp)
+        self.hist_counts[i] = (
+            rebin(*own, new_exp, new_start) + rebin(exp, start, counts, new_exp, new_start)
+        )
+        self.hist_exp[i], self.hist_start[i] = new_exp, new_start
+
+    @staticmethod
+    def _absorb(digest, groups, means, weights, delta):
+        old_groups, old_means, old_weights = digest
+        return compress(np.r_[old_groups, groups], np.r_[old_means, means], np.r_[old_weights, weights], delta)
+
+    def merge(self, other):
+        """Fold ``other`` (a sketch of different rows) into this sketch."""
+        self.total += other.total
+        self.present |= other.present
+        self.count += other.count
+        self.sum += other.sum
+        self.sumsq += other.sumsq
+        np.fmin(self.min, other.min, out=self.min)
+        np.fmax(self.max, other.max, out=self.max)
+        for i in range(self.WIDTH):
+            self._fold_histogram(i, int(other.hist_exp[i]), int(other.hist_start[i]), other.hist_counts[i])
+
+        index = self._add_types(other.types)
+        self.type_rows[index] += other.type_rows
+        self.type_count[index] += other.type_count
+        self.type_sum[index] += other.type_sum
+        self.type_min[index] = np.fmin(self.type_min[index], other.type_min)
+        self.type_max[index] = np.fmax(self.type_max[index], other.type_max)
+
+        for i in range(self.WIDTH):
+            self.digests[i] = self._absorb(self.digests[i], *other.digests[i], DIGEST_DELTA)
+            groups, means, weights = other.type_digests[i]
+            remapped = np.where(groups >= 0, index[np.maximum(groups, 0)] if len(index) else NO_TYPE, NO_TYPE)
+            self.type_digests[i] = self._absorb(self.type_digests[i], remapped, means, weights, TYPE_DIGEST_DELTA)
+        return self
+
+    def stats(self):
+        """Per-column arrays in the shape ``build_summary`` expects."""
+        stats = {'count': self.count, 'sum': self.sum, 'min': self.min, 'max': self.max}
+        quantiles = [
+            self.quantiles(i, [q for _, q in QUANTILES]) for i in range(self.WIDTH)
+        ]
+        for j, (name, _) in enumerate(QUANTILES):
+            stats[name] = np.array([np.nan if qs[j] is None else qs[j] for qs in quantiles])
+        return stats
+
+    def summary(self):
+        order = sorted(range(len(self.types)), key=lambda t: self.type_rows[t], reverse=True)
+        types = {self.types[t]: int(self.type_rows[t]) for t in order if self.type_rows[t]}
+        return build_summary(self.total, self.stats(), types, extra=[name for name, _ in QUANTILES])
+
+    def histograms(self):
+        """
+        ``{column: {'edges': [...], 'counts': [...]}}`` for every numeric
+        column with finite values, trimmed to the non-empty bins.
+        """
+        result = {}
+        for i, (_, name) in enumerate(NUMERIC_COLUMNS):
+            counts = self.hist_counts[i]
+            filled = np.flatnonzero(counts)
+            if not len(filled):
+                continue
+            first, last = filled[0], filled[-1] + 1
+            width = 2.0 ** int(self.hist_exp[i])
+            edges = (int(self.hist_start[i]) + np.arange(first, last + 1)) * width
+            result[name] = {'edges': edges.tolist(), 'counts': counts[first:last].tolist()}
+        return result
+
+    def quantiles(self, column, qs):
+        """Dataset-wide quantiles ``qs`` of numeric column ``column`` (an index)."""
+        if not self.count[column]:
+            return [None] * len(qs)
+        _, means, weights = self.digests[column]
+        return digest_quantiles(means, weights, self.min[column], self.max[column], qs)
+
+    def type_stats(self):
+        """Per-type count and avg/min/max/p95, as stored in ``type_stats``."""
+        digests = []
+        for groups, means, weights in self.type_digests:
+            starts = np.flatnonzero(np.r_[True, groups[1:] != groups[:-1]]) if len(groups) else np.zeros(0, dtype=np.int64)
+            bounds = dict(zip(groups[starts].tolist(), zip(starts.tolist(), np.r_[starts[1:], len(groups)].tolist())))
+            digests.append((means, weights, bounds))
+
+        result = []
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', RuntimeWarning)
+            avg = self.type_sum / self.type_count
+        for t in sorted(range(len(self.types)), key=lambda t: self.type_rows[t], reverse=True):
+            if not self.type_rows[t]:
+                continue
+            group = {'type': self.types[t], 'count': int(self.type_rows[t])}
+            for i, (key, _) in enumerate(NUMERIC_COLUMNS):
+                if not self.present[i]:
+                    continue
+                if self.type_count[t, i]:
+                    means, weights, bounds = digests[i]
+                    lo, hi = bounds[t]
+                    p95 = digest_quantiles(means[lo:hi], weights[lo:hi], self.type_min[t, i], self.type_max[t, i], [0.95])[0]
+                    group.update({
+                        f'avg{key}': float(avg[t, i]),
+                        f'min{key}': float(self.type_min[t, i]),
+                        f'max{key}': float(self.type_max[t, i]),
+                        f'p95{key}': p95,
+                    })
+                else:
+                    group.update({f'avg{key}': None, f'min{key}': None, f'max{key}': None, f'p95{key}': None})
+            result.append(group)
+        return result
+
+    def to_bytes(self):
+        """Compact binary form (a compressed NumPy archive, no pickles)."""
+        arrays = {
+            'total': np.int64(self.total),
+            'present': self.present,
+            'count': self.count,
+            'sum': self.sum,
+            'sumsq': self.sumsq,
+            'min': self.min,
+            'max': self.max,
+            'hist_exp': self.hist_exp,
+            'hist_start': self.hist_start,
+            'hist_counts': self.hist_counts,
+            'types': np.array(self.types, dtype=str),
+            'type_rows': self.type_rows,
+            'type_count': self.type_count,
+            'type_sum': self.type_sum,
+            'type_min': self.type_min,
+            'type_max': self.type_max,
+        }
+        for i in range(self.WIDTH):
+            _, arrays[f'digest{i}_mean'], arrays[f'digest{i}_weight'] = self.digests[i]
+            (arrays[f'type_digest{i}_group'], arrays[f'type_digest{i}_mean'],
+             arrays[f'type_digest{i}_weight']) = self.type_digests[i]
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, **arrays)
+        return buffer.getvalue()
+
+    @classmethod
+    def from_bytes(cls, data):
+        sketch = cls()
+        with np.load(io.BytesIO(bytes(data)), allow_pickle=False) as arrays:
+            sketch.total = int(arrays['total'])
+            for name in ('present', 'count', 'sum', 'sumsq', 'min', 'max',
+                         'hist_exp', 'hist_start', 'hist_counts', 'type_rows', 'type_count', 'type_sum', 'type_min', 'type_max'):
+                setattr(sketch, name, arrays[name])
+            sketch.types = arrays['types'].tolist()
+            for i in range(cls.WIDTH):
+                means = arrays[f'digest{i}_mean']
+                sketch.digests[i] = (np.zeros(len(means), dtype=np.int64), means, arrays[f'digest{i}_weight'])
+                sketch.type_digests[i] = (
+                    arrays[f'type_digest{i}_group'], arrays[f'type_digest{i}_mean'], arrays[f'type_digest{i}_weight'],
+                )
+        # Arrays saved with no types load with the wrong trailing shape
+        sketch.type_count = sketch.type_count.reshape(-1, cls.WIDTH)
+        for name in ('type_sum', 'type_min', 'type_max'):
+            setattr(sketch, name, getattr(sketch, name).reshape(-1, cls.WIDTH))
+        sketch._type_index = {name: t for t, name in enumerate(sketch.types)}
+        return sketch
+
+
+def sketch_table(table):
+    """Sketch a stored Arrow table batch by batch."""
+    sketch = DatasetSketch()
+    if table is not None:
+        categories = ['type'] if 'type' in table.column_names else None
+        for batch in table.to_batches():
+            sketch.update(batch.to_pandas(categories=categories))
+    return sketch
@@ -0,0 +1,231 @@
+import os
+import uuid
+from bisect import bisect_right
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from django.conf import settings
+
+from .summary import resolve_columns
+
+DATASET_DIR = 'datasets'
+
+# The declared equipment schema. Canonical column -> (pandas dtype used while
+# parsing, arrow type when stored, accepted CSV headers, lower-cased). Aliases
+# are resolved once from the header, so only these columns are parsed and
+# readers never search headers again.
+COLUMNS = {
+    'equipment_name': ('str', pa.string(), ('equipment_name', 'equipment name', 'equipment', 'name')),
+    'type': ('category', pa.string(), ('type',)),
+    'flowrate': ('float64', pa.float64(), ('flowrate', 'flow rate', 'flow_rate')),
+    'pressure': ('float64', pa.float64(), ('pressure',)),
+    'temperature': ('float64', pa.float64(), ('temperature',)),
+}
+
+NUMERIC = ('flowrate', 'pressure', 'temperature')
+
+
+def dataset_path(name):
+    return os.path.join(settings.MEDIA_ROOT, name)
+
+
+def resolve_schema(columns):
+    """Map canonical column names to the matching CSV headers in ``columns``."""
+    lookup = resolve_columns(columns)
+    sources = {}
+    for name, (_, _, aliases) in COLUMNS.items():
+        for alias in aliases:
+            if alias in lookup:
+                sources[name] = lookup[alias]
+                break
+    return sources
+
+
+def _to_arrow(series, arrow_type):
+    if pa.types.is_floating(arrow_type):
+        if not pd.api.types.is_numeric_dtype(series):
+            series = pd.to_numeric(series, errors='coerce')
+        return pa.array(series.to_numpy(dtype=np.float64, na_value=np.nan), type=arrow_type, from_pandas=True)
+    return pa.array(series.astype('string'), type=arrow_type, from_pandas=True)
+
+
+class DatasetWriter:
+    """
+    Streams parsed CSV chunks into a typed Arrow IPC file under MEDIA_ROOT.
+
+    Chunks must already use the canonical column names of ``COLUMNS``;
+    ``sources`` maps them to the CSV headers recorded in the schema. Each
+    chunk becomes one record batch, so writing never holds more than a chunk
+    in memory. The file is written under a temporary name and only moved
+    into place by ``close()``.
+
+    Appended segments pass the dataset's stored ``schema`` so every file of
+    a dataset has the same columns: missing ones are written as nulls and
+    extra ones dropped.
+    """
+
+    def __init__(self, sources=None, schema=None):
+        self.name = f'{DATASET_DIR}/{uuid.uuid4().hex}.arrow'
+        self.path = dataset_path(self.name)
+        self.tmp_path = self.path + '.part'
+        self.sources = sources or {}
+        self.schema = None
+        if schema:
+            self.schema = pa.schema([(c['name'], COLUMNS[c['name']][1]) for c in schema])
+            self.sources = {c['name']: c['source'] for c in schema}
+        # First row number of every record batch, the dataset's offset index
+        self.offsets = []
+        self.size = 0
+        self._rows = 0
+        self._sink = None
+        self._writer = None
+
+    def write(self, chunk):
+        if self._writer is None:
+            if self.schema is None:
+                self.schema = pa.schema([
+                    (name, COLUMNS[name][1]) for name in COLUMNS if name in chunk.columns
+                ])
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._sink = pa.OSFile(self.tmp_path, 'wb')
+            self._writer = pa.ipc.new_file(self._sink, self.schema)
+        arrays = [
+            _to_arrow(chunk[f.name], f.type) if f.name in chunk.columns else pa.nulls(len(chunk), f.type)
+            for f in self.schema
+        ]
+        self._writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=self.schema))
+        self.offsets.append(self._rows)
+        self._rows += len(chunk)
+
+    def close(self):
+        """Finish the file and return the schema description to store."""
+        if self._writer is None:
+            return None
+        self._writer.close()
+        self._sink.close()
+        os.replace(self.tmp_path, self.path)
+        self.size = os.path.getsize(self.path)
+        return [
+            {'name': f.name, 'type': str(f.type), 'source': str(self.sources.get(f.name, f.name))}
+            for f in self.schema
+        ]
+
+    def abort(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._sink.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+def data_files(dataset):
+    """Names of the dataset's Arrow files: the upload, then appended segments."""
+    if not dataset.data_file:
+        return []
+    # Historical models in older migrations have no segments field
+    segments = getattr(dataset, 'segments', None) or []
+    return [dataset.data_file.name] + [segment['name'] for segment in segments]
+
+
+def read_file(name):
+    """Memory-map the stored Arrow file ``name`` as a table."""
+    return pa.ipc.open_file(pa.memory_map(dataset_path(name), 'r')).read_all()
+
+
+def open_table(dataset, columns=None):
+    """
+    Return the dataset as an Arrow table memory-mapped from disk.
+
+    Column buffers point straight into the mapped file, so selecting a few
+    columns for a chart does not parse or copy the rest. Datasets stored
+    before the columnar format are read from their CSV file instead.
+    """
+    if dataset.data_file:
+        tables = [read_file(name) for name in data_files(dataset)]
+        table = tables[0] if len(tables) == 1 else pa.concat_tables(tables)
+    elif dataset.csv_file:
+        df = pd.read_csv(dataset_path(dataset.csv_file.name))
+        sources = resolve_schema(df.columns)
+        table = pa.table({
+            name: _to_arrow(df[sources[name]], COLUMNS[name][1]) for name in COLUMNS if name in sources
+        })
+    else:
+        return None
+    if columns is not None:
+        table = table.select([c for c in columns if c in table.column_names])
+    return table
+
+
+def iter_batches(dataset, columns):
+    """
+    Yield the dataset's ``columns`` (those it has) as Arrow record batches,
+    in row order.
+
+    Batches of the stored files are memory-mapped one at a time, and CSVs
+    stored before the columnar format are parsed in chunks of only those
+    columns, so a full pass holds one batch in memory.
+    """
+    if dataset.data_file:
+        for name in data_files(dataset):
+            reader = pa.ipc.open_file(pa.memory_map(dataset_path(name), 'r'))
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield batch.select([c for c in columns if c in batch.schema.names])
+    elif dataset.csv_file:
+        path = dataset_path(dataset.csv_file.name)
+        sources = resolve_schema(pd.read_csv(path, nrows=0).columns)
+        names = [c for c in columns if c in sources]
+        if not names:
+            return
+        with pd.read_csv(path, usecols=[sources[c] for c in names], chunksize=settings.CSV_CHUNK_ROWS) as reader:
+            for chunk in reader:
+                yield pa.RecordBatch.from_arrays(
+                    [_to_arrow(chunk[sources[c]], COLUMNS[c][1]) for c in names], names=names,
+                )
+
+
+def read_rows(dataset, start, limit):
+    """
+    Return rows ``[start, start + limit)`` of the dataset as an Arrow table.
+
+    With the stored batch offset index only the record batches covering the
+    page are touched, so the cost is O(page) regardless of dataset size.
+    The index spans appended segments too, numbering their batches after
+    those of the files before them.
+    """
+    offsets = dataset.batch_offsets
+    if not (dataset.data_file and offsets):
+        table = open_table(dataset)
+        return None if table is None else table.slice(start, limit)
+
+    # (file name, index of its first batch) for the upload and each segment
+    appended = sum(segment['batches'] for segment in dataset.segments)
+    files = [(dataset.data_file.name, 0)]
+    first = len(offsets) - appended
+    for segment in dataset.segments:
+        files.append((segment['name'], first))
+        first += segment['batches']
+    firsts = [f for _, f in files]
+
+    readers = {}
+
+    def reader(name):
+        if name not in readers:
+            readers[name] = pa.ipc.open_file(pa.memory_map(dataset_path(name), 'r'))
+        return readers[name]
+
+    index = max(bisect_right(offsets, start) - 1, 0)
+    batches = []
+    position = start
+    remaining = limit
+    while remaining > 0 and index < len(offsets):
+        name, first = files[bisect_right(firsts, index) - 1]
+        batch = reader(name).get_batch(index - first)
+        piece = batch.slice(position - offsets[index], remaining)
+        if piece.num_rows:
+            batches.append(piece)
+            position += piece.num_rows
+            remaining -= piece.num_rows
+        index += 1
+    return pa.Table.from_batches(batches, schema=reader(dataset.data_file.name).schema)
@@ -0,0 +1,125 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+# Summary key suffix -> lower-cased CSV column name, in the order the summary
+# JSON has always emitted them
+NUMERIC_COLUMNS = [
+    ('Flowrate', 'flowrate'),
+    ('Pressure', 'pressure'),
+    ('Temperature', 'temperature'),
+]
+
+
+# Column-wise reducers over an (n_rows, n_columns) float64 block. Every
+# reducer gets the block, its validity mask and the non-null counts, so adding
+# a statistic does not need another pass to find missing values.
+REDUCERS = {
+    'count': lambda block, valid, count: count,
+    'nulls': lambda block, valid, count: block.shape[0] - count,
+    'sum': lambda block, valid, count: np.add.reduce(block, axis=0, where=valid),
+    'min': lambda block, valid, count: np.fmin.reduce(block, axis=0),
+    'max': lambda block, valid, count: np.fmax.reduce(block, axis=0),
+    'std': lambda block, valid, count: np.nanstd(block, axis=0, ddof=1),
+    'p50': lambda block, valid, count: np.nanpercentile(block, 50, axis=0),
+    'p95': lambda block, valid, count: np.nanpercentile(block, 95, axis=0),
+    'p99': lambda block, valid, count: np.nanpercentile(block, 99, axis=0),
+}
+
+BASE_STATS = ('count', 'sum', 'min', 'max')
+
+
+def resolve_columns(columns):
+    """Map lower-cased, stripped column names to the actual DataFrame labels."""
+    lookup = {}
+    for c in columns:
+        lookup.setdefault(str(c).strip().lower(), c)
+    return lookup
+
+
+def numeric_block(df, lookup=None):
+    """
+    Return the flowrate/pressure/temperature columns present in ``df`` as one
+    float64 block, plus their positions in ``NUMERIC_COLUMNS``.
+
+    Non-numeric cells are coerced to NaN. When the columns are already a
+    consolidated float64 block pandas hands it back without copying.
+    """
+    lookup = lookup if lookup is not None else resolve_columns(df.columns)
+    present = [i for i, (_, name) in enumerate(NUMERIC_COLUMNS) if name in lookup]
+    sub = df[[lookup[NUMERIC_COLUMNS[i][1]] for i in present]]
+    if not all(pd.api.types.is_numeric_dtype(t) for t in sub.dtypes):
+        sub = sub.apply(pd.to_numeric, errors='coerce')
+    return sub.to_numpy(dtype=np.float64, na_value=np.nan), present
+
+
+def column_stats(block, present, stats=BASE_STATS):
+    """
+    Compute ``stats`` for every column of ``block`` in one sweep.
+
+    Results are arrays over all of ``NUMERIC_COLUMNS``; columns that are not
+    ``present`` get a count of zero.
+    """
+    valid = ~np.isnan(block)
+    count = np.count_nonzero(valid, axis=0)
+    width = len(NUMERIC_COLUMNS)
+    result = {}
+    with warnings.catch_warnings():
+        # All-NaN columns are expected; build_summary reports them as None
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for name in stats:
+            if name in ('count', 'nulls'):
+                values = np.zeros(width, dtype=np.int64)
+            elif name == 'sum':
+                values = np.zeros(width)
+            else:
+                values = np.full(width, np.nan)
+            if present and len(block):
+                values[present] = REDUCERS[name](block, valid, count)
+            result[name] = values
+    return result
+
+
+def type_distribution(df, lookup=None):
+    lookup = lookup if lookup is not None else resolve_columns(df.columns)
+    col = lookup.get('type')
+    if col is None:
+        return {}
+    # JSON object keys are strings; convert now so the in-memory summary
+    # matches what is read back from the database
+    return {str(k): int(v) for k, v in df[col].value_counts().items()}
+
+
+def build_summary(total, stats, types, extra=()):
+    """Assemble the summary JSON from per-column statistics arrays."""
+    count = stats['count']
+    summary = {'totalCount': int(total)}
+    for i, (key, _) in enumerate(NUMERIC_COLUMNS):
+        summary[f'avg{key}'] = float(stats['sum'][i] / count[i]) if count[i] else None
+    summary['typeDistribution'] = types
+    for i, (key, _) in enumerate(NUMERIC_COLUMNS):
+        summary[f'min{key}'] = float(stats['min'][i]) if count[i] else None
+        summary[f'max{key}'] = float(stats['max'][i]) if count[i] else None
+    for name in extra:
+        for i, (key, _) in enumerate(NUMERIC_COLUMNS):
+            value = stats[name][i]
+            if name in ('count', 'nulls'):
+                summary[f'{name}{key}'] = int(value)
+            else:
+                summary[f'{name}{key}'] = float(value) if count[i] and not np.isnan(value) else None
+    return summary
+
+
+def summarize(df, extra=()):
+    """
+    Summarize an equipment DataFrame.
+
+    ``extra`` names additional reducers from ``REDUCERS`` (e.g. ``'std'``,
+    ``'p95'``, ``'nulls'``) to include as ``<stat><Column>`` keys; they are
+    computed from the same block as the base statistics.
+    """
+    lookup = resolve_columns(df.columns)
+    block, present = numeric_block(df, lookup)
+    stats = column_stats(block, present, BASE_STATS + tuple(s for s in extra if s not in BASE_STATS))
+    return build_summary(len(df), stats, type_distribution(df, lookup), extra)
@@ -1,16 +1,56 @@
-from django.test import TestCase
+import base64
+import contextlib
+import json
+import os
+import shutil
+import tempfile
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.test import TestCase, override_settings
 from rest_framework.test import APITestCase
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.contrib.auth import get_user_model
+from django.contrib.auth import authenticate, get_user_model
 from rest_framework.test import APIClient
 
+TEST_MEDIA_ROOT = tempfile.mkdtemp()
+TEST_SETTINGS = {
+    'MEDIA_ROOT': TEST_MEDIA_ROOT,
+    # Keep tests away from the shared file-based cache of a dev server
+    'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    'UPLOAD_JOBS_EAGER': True,
+    # Metrics of test requests stay out of a dev server's shared snapshots
+    'METRICS_DIR': os.path.join(TEST_MEDIA_ROOT, 'metrics'),
+}
+
+
+def tearDownModule():
+    shutil.rmtree(TEST_MEDIA_ROOT, ignore_errors=True)
 
+
+@override_settings(**TEST_SETTINGS)
 class EquipmentAPITests(APITestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
     def test_history_returns_200(self):
         """History endpoint should be reachable and return 200."""
         resp = self.client.get('/api/history/')
         self.assertEqual(resp.status_code, 200)
 
+    def test_sample_summary_matches_uploads(self):
+        """The sample is sketched like an upload, percentiles included."""
+        resp = self.client.get('/api/load-sample/', {'cursor': 1, 'limit': 2})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        for key in ('avgFlowrate', 'p50Flowrate', 'p95Pressure', 'p99Temperature', 'typeDistribution'):
+            self.assertIn(key, body['summary'])
+        self.assertEqual(len(body['data']), 2)
+        self.assertEqual(
+            set(body['data'][0]), {'Equipment Name', 'Type', 'Flowrate', 'Pressure', 'Temperature'},
+        )
+        self.assertEqual(body['next_cursor'], '3')
+
     def test_upload_accepts_csv(self):
         """Upload endpoint should accept a small CSV file and respond 200/201.
 
@@ -39,3 +79,969 @@ class EquipmentAPITests(APITestCase):
         except Exception:
             print('TEST_RESP_CONTENT:', resp.content[:200])
         self.assertIn(resp.status_code, (200, 201))
+
+    def test_latest_numeric_dataset_is_one_query(self):
+        """The summary fallback skips datasets without flowrate via the indexed flag."""
+        from equipment.models import EquipmentDataset
+
+        EquipmentDataset.objects.create(file_name='ok.csv', record_count=1, summary={'avgFlowrate': 3.0})
+        empty = EquipmentDataset.objects.create(file_name='text.csv', record_count=1, summary={'avgFlowrate': None})
+        self.assertFalse(empty.has_numeric)
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/summary/')
+        self.assertEqual(resp.json(), {'avgFlowrate': 3.0})
+
+    def test_history_values_match_serializer_and_select_fields(self):
+        """History skips the ModelSerializer but renders the same entries."""
+        from equipment.models import EquipmentDataset
+        from equipment.serializers import EquipmentDatasetSerializer
+
+        f = SimpleUploadedFile('a.csv', b"Type,Flowrate,Pressure,Temperature\nA,1,2,3\n", content_type='text/csv')
+        self.client.post('/api/upload/', {'file': f}, format='multipart')
+        EquipmentDataset.objects.create(file_name='b.csv', record_count=0, summary={}, csv_file='datasets/b.csv')
+
+        expected = EquipmentDatasetSerializer(EquipmentDataset.objects.all(), many=True).data
+        resp = self.client.get('/api/history/')
+        self.assertEqual(resp.json(), json.loads(json.dumps(expected, default=str).replace('+00:00', 'Z')))
+        # Storage bookkeeping that grows with the rows is not listed
+        self.assertEqual(set(resp.json()[1]), {'id', 'file_name', 'uploaded_at', 'record_count', 'summary', 'csv_file'})
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/history/', {'fields': 'id,file_name,record_count'})
+        self.assertEqual(resp.json()[1], {'id': expected[1]['id'], 'file_name': 'a.csv', 'record_count': 1})
+        self.assertEqual(self.client.get('/api/history/', {'fields': 'id,password'}).status_code, 400)
+
+    def test_trends_read_denormalized_metrics_in_time_order(self):
+        """Trends come from the metric columns with one query, oldest first."""
+        from equipment.models import EquipmentDataset
+
+        for i in range(4):
+            EquipmentDataset.objects.create(
+                file_name=f'{i}.csv', record_count=i + 1,
+                summary={'avgPressure': float(i), 'maxFlowrate': 10.0 * i},
+            )
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/trends/', {'metrics': 'avgPressure,maxFlowrate', 'limit': 3})
+        body = resp.json()
+        self.assertEqual(body['count'], 3)
+        self.assertEqual(body['record_count'], [2, 3, 4])
+        self.assertEqual(body['series'], {'avgPressure': [1.0, 2.0, 3.0], 'maxFlowrate': [10.0, 20.0, 30.0]})
+
+        self.assertEqual(self.client.get('/api/trends/', {'since': '2999-01-01'}).json()['count'], 0)
+        self.assertEqual(self.client.get('/api/trends/', {'metrics': 'summary'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/trends/', {'since': 'yesterday'}).status_code, 400)
+
+    def test_dataset_version_changes_when_the_write_commits(self):
+        """Readers inside the write's transaction window still see the old version."""
+        from django.db import transaction
+        from equipment.caching import datasets_version
+        from equipment.models import EquipmentDataset
+
+        before, _ = datasets_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                EquipmentDataset.objects.create(file_name='a.csv', record_count=0, summary={})
+                self.assertEqual(datasets_version()[0], before)
+        self.assertNotEqual(datasets_version()[0], before)
+
+    def test_summary_and_history_revalidate_with_etag(self):
+        """Polling with If-None-Match gets 304 until a dataset is added."""
+        from unittest import mock
+
+        f = SimpleUploadedFile('a.csv', b"Type,Flowrate,Pressure,Temperature\nA,1,2,3\n", content_type='text/csv')
+        self.client.post('/api/upload/', {'file': f}, format='multipart')
+
+        for url in ('/api/summary/', '/api/history/'):
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertIn('Last-Modified', first)
+            with mock.patch('equipment.views.EquipmentDataset.objects') as objects:
+                again = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(again.status_code, 304)
+            objects.all.assert_not_called()
+
+        f = SimpleUploadedFile('b.csv', b"Type,Flowrate,Pressure,Temperature\nB,5,6,7\n", content_type='text/csv')
+        # The version is bumped when the upload commits
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/upload/', {'file': f}, format='multipart')
+        resp = self.client.get('/api/summary/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['avgFlowrate'], 5.0)
+
+
+@override_settings(**TEST_SETTINGS)
+class ChunkedIngestTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    CSV = (
+        b"Equipment Name,Type,Flowrate,Pressure,Temperature\n"
+        b"Pump A,Pump,150.5,25.3,75.2\n"
+        b"Valve B,Valve,200.0,30.1,80.5\n"
+        b"Tank C,Tank,0.0,15.2,65.8\n"
+        b"Pump D,Pump,175.8,,78.9\n"
+        b"Valve E,Valve,90.0,22.0,70.1\n"
+    )
+
+    @contextlib.asynccontextmanager
+    async def acommit_callbacks(self):
+        # captureOnCommitCallbacks for async tests: callbacks are queued on
+        # the connection of the thread the sync views run on
+        capture = self.captureOnCommitCallbacks(execute=True)
+        await sync_to_async(capture.__enter__)()
+        try:
+            yield
+        finally:
+            await sync_to_async(capture.__exit__)(None, None, None)
+
+    @staticmethod
+    async def collect(response):
+        # Under ASGI, DataView streams from an async iterator
+        return b''.join([chunk async for chunk in response.streaming_content])
+
+    def test_chunked_summary_matches_full_parse(self):
+        """Summaries built chunk by chunk should match a whole-frame parse."""
+        import io
+        import pandas as pd
+        from equipment.ingest import summarize_csv
+        from equipment.summary import summarize
+
+        expected = summarize(pd.read_csv(io.BytesIO(self.CSV)), extra=('p50', 'p95', 'p99'))
+        summary, count = summarize_csv(io.BytesIO(self.CSV), chunksize=2)
+        self.assertEqual(count, 5)
+        self.assertEqual(summary.keys(), expected.keys())
+        self.assertEqual(summary['typeDistribution'], expected['typeDistribution'])
+        for key, value in expected.items():
+            if isinstance(value, float) and not key.startswith('p'):
+                self.assertAlmostEqual(summary[key], value)
+        # Quantiles are t-digest estimates, interpolated between the samples
+        self.assertLessEqual(summary['minPressure'], summary['p50Pressure'])
+        self.assertLessEqual(summary['p95Pressure'], summary['p99Pressure'])
+        self.assertLessEqual(summary['p99Pressure'], summary['maxPressure'])
+
+    def test_upload_rejects_missing_columns(self):
+        f = SimpleUploadedFile('bad.csv', b"Type,Flowrate\nPump,1\n", content_type='text/csv')
+        resp = self.client.post('/api/upload/', {'file': f})
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('pressure', resp.json()['error'])
+
+    def test_summary_engine_extra_stats(self):
+        """Optional statistics come from the same block as the base summary."""
+        import io
+        import pandas as pd
+        from equipment.summary import summarize
+
+        df = pd.read_csv(io.BytesIO(self.CSV))
+        summary = summarize(df, extra=('std', 'nulls'))
+        self.assertAlmostEqual(summary['stdFlowrate'], df['Flowrate'].std())
+        self.assertEqual(summary['nullsPressure'], 1)
+        self.assertEqual(summary['avgPressure'], df['Pressure'].mean())
+
+    def test_upload_persists_columnar_copy(self):
+        """Uploads are stored once as Arrow and served back by DataView."""
+        from equipment import storage
+        from equipment.models import EquipmentDataset
+
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        resp = self.client.post('/api/upload/', {'file': f})
+        self.assertEqual(resp.status_code, 200)
+
+        dataset = EquipmentDataset.objects.get(id=resp.json()['id'])
+        self.assertEqual(
+            [c['name'] for c in dataset.schema],
+            ['equipment_name', 'type', 'flowrate', 'pressure', 'temperature'],
+        )
+        table = storage.open_table(dataset, columns=['pressure'])
+        self.assertEqual(table.column_names, ['pressure'])
+        self.assertEqual(table.column('pressure').null_count, 1)
+
+        # WSGI streams the rows from a plain iterator rather than buffering
+        # an async one
+        resp = self.client.get('/api/data/', {'id': dataset.id})
+        self.assertFalse(resp.is_async)
+        records = json.loads(b''.join(resp.streaming_content))
+        resp = async_to_sync(self.async_client.get)('/api/data/', {'id': dataset.id})
+        self.assertTrue(resp.is_async)
+        self.assertEqual(json.loads(async_to_sync(self.collect)(resp)), records)
+        self.assertEqual(len(records), 5)
+        self.assertEqual(records[0], {
+            'id': 0, 'equipmentName': 'Pump A', 'type': 'Pump',
+            'flowrate': 150.5, 'pressure': 25.3, 'temperature': 75.2,
+        })
+        self.assertEqual(records[3]['equipmentName'], 'Pump D')
+        self.assertIsNone(records[3]['pressure'])
+
+    def test_async_upload_reports_job_progress(self):
+        """?async=1 returns 202 and the job endpoint reports the outcome."""
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post('/api/upload/?async=1', {'file': f})
+        self.assertEqual(resp.status_code, 202)
+        self.assertEqual(resp['Location'], resp.json()['status_url'])
+
+        job = self.client.get(resp['Location']).json()
+        self.assertEqual(job['status'], 'succeeded', job)
+        self.assertEqual(job['rows_processed'], 5)
+        self.assertEqual(job['bytes_read'], len(self.CSV))
+        summary = self.client.get('/api/summary/', {'id': job['dataset_id']}).json()
+        self.assertEqual(summary['totalCount'], 5)
+
+        f = SimpleUploadedFile('bad.csv', b"Type\nPump\n", content_type='text/csv')
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post('/api/upload/', {'file': f}, HTTP_PREFER='respond-async')
+        job = self.client.get(resp['Location']).json()
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn('Missing required columns', job['error'])
+
+    def test_jobs_stranded_by_a_restart_are_reaped(self):
+        """Stale queued/running jobs are failed or requeued and orphaned spool files removed."""
+        import datetime
+        import io
+        import os
+        from django.core.files.base import ContentFile
+        from django.core.files.storage import default_storage
+        from django.core.management import call_command
+        from django.utils import timezone
+        from equipment import storage
+        from equipment.jobs import INTERRUPTED, SPOOL_DIR, reap_stale_jobs
+        from equipment.models import UploadJob
+
+        spooled = default_storage.save(f'{SPOOL_DIR}/kept.csv', ContentFile(self.CSV))
+        lost = default_storage.save(f'{SPOOL_DIR}/lost.csv', ContentFile(self.CSV))
+        orphan = default_storage.save(f'{SPOOL_DIR}/orphan.csv', ContentFile(b'x'))
+        hour_ago = timezone.now() - datetime.timedelta(hours=1)
+        for name in (lost, orphan):
+            os.utime(storage.dataset_path(name), (hour_ago.timestamp(), hour_ago.timestamp()))
+        queued = UploadJob.objects.create(file_name='plant.csv', spool_file=spooled)
+        running = UploadJob.objects.create(file_name='lost.csv', spool_file=lost, status=UploadJob.RUNNING)
+        fresh = UploadJob.objects.create(file_name='fresh.csv', spool_file=spooled)
+        UploadJob.objects.filter(id__in=[queued.id, running.id]).update(updated_at=hour_ago)
+
+        # Without --requeue both stale jobs fail; fresh jobs are left alone
+        with self.captureOnCommitCallbacks(execute=True):
+            requeued, failed, removed = reap_stale_jobs(stale_after=600)
+        self.assertEqual((requeued, sorted(failed)), ([], sorted([queued.id, running.id])))
+        self.assertEqual(UploadJob.objects.get(id=running.id).error, INTERRUPTED)
+        self.assertEqual(UploadJob.objects.get(id=fresh.id).status, UploadJob.QUEUED)
+        self.assertEqual(sorted(removed), sorted([lost, orphan]))
+        self.assertTrue(default_storage.exists(spooled))
+
+        # --requeue runs a stale job again when its upload is still spooled
+        UploadJob.objects.filter(id=fresh.id).update(updated_at=hour_ago)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('reap_upload_jobs', stale_after=600, requeue=True, stdout=io.StringIO())
+        job = UploadJob.objects.get(id=fresh.id)
+        self.assertEqual((job.status, job.rows_processed), (UploadJob.SUCCEEDED, 5))
+        self.assertFalse(default_storage.exists(spooled))
+
+    def test_data_pages_follow_cursor_across_batches(self):
+        """Pages are read through the stored batch offsets and chain via next_cursor."""
+        from equipment.models import EquipmentDataset
+
+        with self.settings(CSV_CHUNK_ROWS=2):
+            f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+            dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+        # The setting is read per upload, so the override takes effect
+        self.assertEqual(EquipmentDataset.objects.get(id=dataset_id).batch_offsets, [0, 2, 4])
+
+        names, cursor, pages = [], '0', 0
+        while cursor is not None:
+            page = self.client.get('/api/data/', {'id': dataset_id, 'cursor': cursor, 'limit': 3}).json()
+            self.assertEqual(page['count'], 5)
+            names += [r['equipmentName'] for r in page['results']]
+            cursor = page['next_cursor']
+            pages += 1
+        self.assertEqual(pages, 2)
+        self.assertEqual(names, ['Pump A', 'Valve B', 'Tank C', 'Pump D', 'Valve E'])
+        self.assertEqual(page['results'][0]['id'], 3)
+
+        resp = self.client.get('/api/data/', {'id': dataset_id, 'limit': 0})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_type_stats_are_stored_at_ingest(self):
+        """Per-type statistics are computed once and served with one query."""
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+
+        with self.assertNumQueries(1):
+            body = self.client.get('/api/type-stats/', {'id': dataset_id}).json()
+        self.assertEqual(body['record_count'], 5)
+        pump = body['types'][0]
+        self.assertEqual((pump['type'], pump['count']), ('Pump', 2))
+        self.assertAlmostEqual(pump['avgFlowrate'], (150.5 + 175.8) / 2)
+        self.assertEqual(pump['minPressure'], 25.3)
+        self.assertEqual(pump['maxTemperature'], 78.9)
+        self.assertIn('p95Pressure', pump)
+        self.assertNotIn('type_stats', self.client.get('/api/history/').json()[0])
+
+    async def test_async_read_views_serve_concurrently(self):
+        """The polled read endpoints are async views sharing one event loop."""
+        import asyncio
+
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        async with self.acommit_callbacks():
+            dataset_id = (await self.async_client.post('/api/upload/', {'file': f})).json()['id']
+
+        summary, history, page, health = await asyncio.gather(
+            self.async_client.get('/api/summary/', {'id': dataset_id}),
+            self.async_client.get('/api/history/', {'fields': 'id,record_count'}),
+            self.async_client.get('/api/data/', {'id': dataset_id, 'cursor': 3, 'limit': 5}),
+            self.async_client.get('/api/health/'),
+        )
+        self.assertEqual(summary.json()['totalCount'], 5)
+        self.assertEqual(history.json(), [{'id': dataset_id, 'record_count': 5}])
+        self.assertEqual([r['equipmentName'] for r in page.json()['results']], ['Pump D', 'Valve E'])
+        self.assertEqual(health.json()['status'], 'ok')
+
+        again = await self.async_client.get('/api/summary/', {'id': dataset_id}, headers={'If-None-Match': summary['ETag']})
+        self.assertEqual(again.status_code, 304)
+
+    @override_settings(PUSH_POLL_INTERVAL=0.05)
+    async def test_updates_are_pushed_when_a_dataset_is_created(self):
+        """Long polls and the SSE stream wake up with the new summary."""
+        import asyncio
+
+        first = (await self.async_client.get('/api/updates/')).json()
+        self.assertIsNone(first['dataset'])
+        idle = await self.async_client.get('/api/updates/', {'since': first['version'], 'timeout': 0.1})
+        self.assertEqual(idle.status_code, 204)
+
+        poll = asyncio.ensure_future(
+            self.async_client.get('/api/updates/', {'since': first['version'], 'timeout': 5})
+        )
+        events = await self.async_client.get('/api/events/', headers={'Last-Event-ID': first['version']})
+        self.assertEqual(events['Content-Type'], 'text/event-stream')
+        stream = aiter(events.streaming_content)
+        self.assertTrue((await anext(stream)).startswith(b'retry:'))
+
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        async with self.acommit_callbacks():
+            dataset_id = (await self.async_client.post('/api/upload/', {'file': f})).json()['id']
+
+        update = (await poll).json()
+        self.assertNotEqual(update['version'], first['version'])
+        self.assertEqual(update['dataset']['id'], dataset_id)
+        self.assertEqual(update['summary']['totalCount'], 5)
+
+        event = await anext(stream)
+        self.assertIn(b'event: update', event)
+        self.assertIn(f'id: {update["version"]}'.encode(), event)
+        data = json.loads(event.split(b'data: ', 1)[1])
+        self.assertEqual(data['dataset']['file_name'], 'plant.csv')
+        await stream.aclose()
+
+    def test_event_stream_works_under_wsgi(self):
+        """Without ASGI the SSE stream is a blocking generator that ends after the long-poll timeout."""
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+        with override_settings(LONG_POLL_TIMEOUT=0.2, PUSH_POLL_INTERVAL=0.05):
+            resp = self.client.get('/api/events/')
+            self.assertFalse(resp.is_async)
+            chunks = list(resp.streaming_content)
+        self.assertTrue(chunks[0].startswith(b'retry:'))
+        self.assertEqual(len(chunks), 2)
+        data = json.loads(chunks[1].split(b'data: ', 1)[1])
+        self.assertEqual(data['dataset']['id'], dataset_id)
+
+    def test_chunk_reader_selects_and_types_declared_columns(self):
+        """Only the schema's columns are parsed, under canonical names and declared dtypes."""
+        import io
+        from unittest import mock
+        import pandas as pd
+        from equipment.ingest import CSVChunkReader
+
+        csv = (
+            b"Notes,Flow Rate,Extra,Type,Pressure,Temperature,Comment\n"
+            b"x,1.5,9,Pump,2,3,first\n"
+            b"y,2.5,9,Valve,4,5,second\n"
+        )
+        with mock.patch('pandas.read_csv', wraps=pd.read_csv) as read_csv:
+            reader = CSVChunkReader(io.BytesIO(csv), chunksize=10)
+            chunk, = list(reader)
+        self.assertEqual(list(chunk.columns), ['flowrate', 'type', 'pressure', 'temperature'])
+        self.assertEqual(reader.sources['flowrate'], 'Flow Rate')
+        # The unrelated columns are excluded by usecols, not dropped after parsing
+        self.assertEqual(read_csv.call_args.kwargs['usecols'], [1, 3, 4, 5])
+        self.assertIsInstance(chunk['type'].dtype, pd.CategoricalDtype)
+        for column in ('flowrate', 'pressure', 'temperature'):
+            self.assertEqual(chunk[column].dtype, 'float64')
+        self.assertEqual(chunk['flowrate'].tolist(), [1.5, 2.5])
+
+    def test_non_numeric_value_in_numeric_column_is_rejected(self):
+        """A text cell in a numeric column is a 400, not a silent null."""
+        csv = self.CSV + b"Pump F,Pump,fast,20.0,70.0\n"
+        f = SimpleUploadedFile('plant.csv', csv, content_type='text/csv')
+        resp = self.client.post('/api/upload/', {'file': f})
+        self.assertEqual(resp.status_code, 400, resp.content)
+        self.assertIn('Failed to parse CSV', resp.json()['error'])
+
+    def test_merged_sketches_match_one_sketch(self):
+        """Sketching two halves and merging equals sketching the whole file."""
+        import io
+        import numpy as np
+        from equipment.ingest import sketch_csv
+        from equipment.sketches import DatasetSketch
+
+        header, *rows = self.CSV.splitlines(keepends=True)
+        whole = sketch_csv(io.BytesIO(self.CSV))
+        first = sketch_csv(io.BytesIO(header + b''.join(rows[:2])))
+        second = sketch_csv(io.BytesIO(header + b''.join(rows[2:])))
+        merged = DatasetSketch.from_bytes(first.to_bytes()).merge(second)
+
+        self.assertEqual(merged.summary(), whole.summary())
+        self.assertEqual(merged.type_stats(), whole.type_stats())
+        np.testing.assert_allclose(merged.sumsq, whole.sumsq)
+        self.assertEqual(merged.quantiles(0, [0.5]), whole.quantiles(0, [0.5]))
+        self.assertEqual(merged.histograms(), whole.histograms())
+        self.assertEqual(sum(whole.histograms()['pressure']['counts']), 4)
+
+    def test_distribution_serves_quantiles_and_bins(self):
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/distribution/', {'id': dataset_id, 'column': 'flowrate'})
+        flow = resp.json()['columns']['flowrate']
+        self.assertEqual(list(resp.json()['columns']), ['flowrate'])
+        self.assertEqual(sum(flow['counts']), 5)
+        self.assertEqual(len(flow['edges']), len(flow['counts']) + 1)
+        self.assertLessEqual(flow['edges'][0], 0.0)
+        self.assertGreater(flow['edges'][-1], 200.0)
+        self.assertTrue(0.0 <= flow['p50'] <= flow['p95'] <= flow['p99'] <= 200.0)
+        self.assertEqual(self.client.get('/api/distribution/', {'column': 'speed'}).status_code, 400)
+
+    def test_append_updates_summary_and_pages(self):
+        """Appended rows join the summary, type statistics and data pages."""
+        f = SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+        self.client.get('/api/summary/', {'id': dataset_id})
+
+        more = b"Type,Flowrate,Pressure,Temperature\nPump,100.0,20.0,70.0\nFilter,50.0,10.0,60.0\n"
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                f'/api/datasets/{dataset_id}/append/', {'file': SimpleUploadedFile('more.csv', more)},
+            )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        self.assertEqual(resp.json()['appended'], 2)
+
+        summary = self.client.get('/api/summary/', {'id': dataset_id}).json()
+        self.assertEqual(summary['totalCount'], 7)
+        self.assertEqual(summary['typeDistribution'], {'Pump': 3, 'Valve': 2, 'Tank': 1, 'Filter': 1})
+        self.assertAlmostEqual(summary['avgFlowrate'], (150.5 + 200 + 0 + 175.8 + 90 + 100 + 50) / 7)
+        self.assertEqual(summary['minTemperature'], 60.0)
+
+        pump = self.client.get('/api/type-stats/', {'id': dataset_id}).json()['types'][0]
+        self.assertEqual((pump['type'], pump['count'], pump['minFlowrate']), ('Pump', 3, 100.0))
+
+        page = self.client.get('/api/data/', {'id': dataset_id, 'cursor': 4, 'limit': 10}).json()
+        self.assertEqual(page['count'], 7)
+        self.assertEqual([r['type'] for r in page['results']], ['Valve', 'Pump', 'Filter'])
+        self.assertEqual(page['results'][2]['equipmentName'], '')
+
+        from unittest import mock
+        from django.db import connection
+        from equipment import ingest
+        from equipment.models import EquipmentDataset
+
+        dataset = EquipmentDataset.objects.get(id=dataset_id)
+        self.assertGreater(dataset.modified_at, dataset.uploaded_at)
+
+        # Datasets stored before sketches were kept get one rebuilt before
+        # the row is locked
+        EquipmentDataset.objects.filter(id=dataset_id).update(sketch=None)
+        real = ingest.stored_sketch
+        depth = len(connection.savepoint_ids)
+
+        def outside_transaction(dataset):
+            # Only the test's own transactions are open
+            self.assertEqual(len(connection.savepoint_ids), depth)
+            return real(dataset)
+
+        with mock.patch.object(ingest, 'stored_sketch', side_effect=outside_transaction) as rebuilt, \
+                self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(
+                f'/api/datasets/{dataset_id}/append/', {'file': SimpleUploadedFile('more.csv', more)},
+            )
+        self.assertEqual(resp.status_code, 200, resp.content)
+        rebuilt.assert_called_once()
+        self.assertEqual(self.client.get('/api/summary/', {'id': dataset_id}).json()['totalCount'], 9)
+
+        missing = self.client.post('/api/datasets/999/append/', {'file': SimpleUploadedFile('m.csv', more)})
+        self.assertEqual(missing.status_code, 404)
+
+    def test_compressed_uploads_stream_through_parser(self):
+        """gzip, zstd and single-CSV zip uploads parse like the plain file."""
+        import gzip
+        import io
+        import zipfile
+        import zstandard
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr('export/plant.csv', self.CSV)
+        uploads = {
+            'plant.csv.gz': gzip.compress(self.CSV),
+            'plant.csv.zst': zstandard.ZstdCompressor().compress(self.CSV),
+            'plant.zip': archive.getvalue(),
+        }
+        for name, content in uploads.items():
+            resp = self.client.post('/api/upload/', {'file': SimpleUploadedFile(name, content)})
+            self.assertEqual(resp.status_code, 200, resp.content)
+            self.assertEqual(resp.json()['record_count'], 5)
+            self.assertEqual(resp.json()['summary']['typeDistribution'], {'Pump': 2, 'Valve': 2, 'Tank': 1})
+
+    def test_compressed_upload_ratio_limit(self):
+        """A gzip bomb is rejected with 413 once it expands past the ratio."""
+        import gzip
+
+        bomb = b"Type,Flowrate,Pressure,Temperature\n" + b"Pump,1,2,3\n" * 500_000
+        f = SimpleUploadedFile('bomb.csv.gz', gzip.compress(bomb))
+        with override_settings(UPLOAD_MAX_DECOMPRESSION_RATIO=50):
+            resp = self.client.post('/api/upload/', {'file': f})
+        self.assertEqual(resp.status_code, 413, resp.content)
+        self.assertIn('decompresses more than 50x', resp.json()['error'])
+
+    def test_batch_archives_are_decompression_limited(self):
+        """Archive members in a batch count against the same limits as single uploads."""
+        import io
+        import os
+        import tarfile
+        import zipfile
+        from equipment import storage
+        from equipment.jobs import SPOOL_DIR
+
+        bomb = b"Type,Flowrate,Pressure,Temperature\n" + b"Pump,1,2,3\n" * 500_000
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr('a.csv', self.CSV)
+            z.writestr('bomb.csv', bomb)
+        tar = io.BytesIO()
+        with tarfile.open(fileobj=tar, mode='w:gz') as t:
+            info = tarfile.TarInfo('bomb.csv')
+            info.size = len(bomb)
+            t.addfile(info, io.BytesIO(bomb))
+
+        for name, data, limits, message in (
+            ('units.zip', archive.getvalue(), {'UPLOAD_MAX_DECOMPRESSION_RATIO': 50}, 'more than 50x'),
+            ('units.tar.gz', tar.getvalue(), {'UPLOAD_MAX_DECOMPRESSION_RATIO': 0, 'UPLOAD_MAX_DECOMPRESSED_BYTES': 1024 ** 2}, 'exceeds'),
+        ):
+            with self.subTest(name), override_settings(**limits):
+                resp = self.client.post('/api/upload/batch/', {'files': [SimpleUploadedFile(name, data)]})
+            self.assertEqual(resp.status_code, 413, resp.content)
+            self.assertIn(message, resp.json()['error'])
+        spool = storage.dataset_path(SPOOL_DIR)
+        self.assertEqual(os.listdir(spool) if os.path.isdir(spool) else [], [])
+
+    def test_batch_upload_accepts_files_and_archives(self):
+        """Loose CSVs and archive members are ingested together with per-file results."""
+        import io
+        import zipfile
+        from equipment.models import EquipmentDataset
+
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as z:
+            z.writestr('units/u1.csv', self.CSV)
+            z.writestr('units/notes.txt', b'ignored')
+            z.writestr('units/bad.csv', b"Type\nPump\n")
+        files = [
+            SimpleUploadedFile('plant.csv', self.CSV, content_type='text/csv'),
+            SimpleUploadedFile('units.zip', archive.getvalue(), content_type='application/zip'),
+            SimpleUploadedFile('readme.txt', b'x', content_type='text/plain'),
+        ]
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post('/api/upload/batch/', {'files': files})
+        self.assertEqual(resp.status_code, 200)
+        body = resp.json()
+        self.assertEqual((body['created'], body['failed']), (2, 2))
+        self.assertEqual(
+            [(r['file_name'], r['status']) for r in body['results']],
+            [('plant.csv', 'created'), ('u1.csv', 'created'), ('bad.csv', 'failed'), ('readme.txt', 'failed')],
+        )
+        self.assertIn('Missing required columns', body['results'][2]['error'])
+
+        dataset = EquipmentDataset.objects.get(id=body['results'][1]['id'])
+        self.assertEqual(dataset.record_count, 5)
+        self.assertTrue(dataset.has_numeric)
+        self.assertTrue(dataset.data_file)
+        summary = self.client.get('/api/summary/', {'id': dataset.id}).json()
+        self.assertEqual(summary['totalCount'], 5)
+
+    def test_batch_larger_than_retention_keeps_its_datasets(self):
+        """Retention after a batch only removes datasets older than the batch."""
+        from equipment.models import EquipmentDataset
+
+        older = self.client.post('/api/upload/', {'file': SimpleUploadedFile('old.csv', self.CSV)}).json()['id']
+        files = [SimpleUploadedFile(f'plant{i}.csv', self.CSV, content_type='text/csv') for i in range(8)]
+        with override_settings(EQUIPMENT_RETENTION={'KEEP_LAST': 5}):
+            resp = self.client.post('/api/upload/batch/', {'files': files})
+        self.assertEqual(resp.status_code, 200)
+        ids = [r['id'] for r in resp.json()['results']]
+        self.assertEqual(len(ids), 8)
+        self.assertEqual(set(EquipmentDataset.objects.values_list('id', flat=True)), set(ids))
+        self.assertNotIn(older, ids)
+
+
+@override_settings(**TEST_SETTINGS)
+class ChartDataTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+
+    def test_lttb_keeps_endpoints_and_peaks(self):
+        import numpy as np
+        from equipment.downsample import lttb
+
+        y = np.zeros(10_000)
+        y[4321] = 50.0
+        y[100] = np.nan
+        x, ds = lttb(y, 100)
+        self.assertEqual(len(x), 100)
+        self.assertEqual((x[0], x[-1]), (0, 9999))
+        self.assertIn(4321, x)
+        self.assertTrue(np.all(np.diff(x) > 0))
+
+    def test_bucket_stats_reduce_each_bucket(self):
+        import numpy as np
+        from equipment.downsample import bucket_stats
+
+        stats = bucket_stats(np.array([1.0, 3.0, np.nan, 5.0, 2.0, 8.0]), 3)
+        self.assertEqual(stats['x'], [0, 2, 4])
+        self.assertEqual(stats['min'], [1.0, 5.0, 2.0])
+        self.assertEqual(stats['max'], [3.0, 5.0, 8.0])
+        self.assertEqual(stats['mean'], [2.0, 5.0, 5.0])
+
+    def test_bucket_stats_accumulate_across_pieces(self):
+        import numpy as np
+        from equipment.downsample import BucketStats, bucket_stats
+
+        y = np.random.default_rng(0).normal(size=1000)
+        y[::37] = np.nan
+        stats = BucketStats(len(y), 30)
+        for piece in np.split(y, [1, 7, 333, 334, 900]):
+            stats.add(piece)
+        streamed, whole = stats.result(), bucket_stats(y, 30)
+        self.assertEqual(streamed['x'], whole['x'])
+        for key in ('min', 'max', 'mean'):
+            np.testing.assert_allclose(streamed[key], whole[key])
+
+    def test_chart_endpoint_downsamples_and_caches(self):
+        from unittest import mock
+        from equipment import storage
+
+        rows = b''.join(b'Unit %d,Pump,%d,1.5,20\n' % (i, i % 97) for i in range(2000))
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows
+        f = SimpleUploadedFile('big.csv', csv, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+
+        resp = self.client.get('/api/chart/', {'id': dataset_id, 'column': 'flowrate', 'points': 200})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.json()['y']), 200)
+
+        with mock.patch.object(storage, 'open_table') as open_table:
+            again = self.client.get('/api/chart/', {'id': dataset_id, 'column': 'flowrate', 'points': 200})
+        open_table.assert_not_called()
+        self.assertEqual(again.json(), resp.json())
+
+        resp = self.client.get('/api/chart/', {'id': dataset_id, 'method': 'buckets', 'points': 10})
+        self.assertEqual(len(resp.json()['mean']), 10)
+        self.assertEqual(self.client.get('/api/chart/', {'column': 'type'}).status_code, 400)
+
+
+@override_settings(**TEST_SETTINGS)
+class RetentionTests(TestCase):
+    def make(self, name, size=0):
+        from equipment.models import EquipmentDataset
+        from django.core.files.storage import default_storage
+        from django.core.files.base import ContentFile
+
+        path = default_storage.save(f'datasets/{name}.arrow', ContentFile(b'x' * size))
+        return EquipmentDataset.objects.create(
+            file_name=name, record_count=0, summary={}, data_file=path, data_size=size,
+        )
+
+    def test_keep_last_bulk_deletes_rows_and_files(self):
+        from django.core.files.storage import default_storage
+        from equipment.models import EquipmentDataset
+        from equipment.retention import apply_retention
+
+        made = [self.make(f'd{i}', 10) for i in range(4)]
+        with self.captureOnCommitCallbacks(execute=True):
+            ids, names = apply_retention(keep_last=2)
+        self.assertEqual(sorted(ids), [made[0].id, made[1].id])
+        self.assertEqual(list(EquipmentDataset.objects.values_list('file_name', flat=True)), ['d3', 'd2'])
+        self.assertFalse(default_storage.exists(made[0].data_file.name))
+        self.assertTrue(default_storage.exists(made[3].data_file.name))
+
+    def test_size_quota_keeps_newest_within_budget(self):
+        from equipment.models import EquipmentDataset
+        from equipment.retention import apply_retention
+
+        for i in range(3):
+            self.make(f's{i}', 100)
+        apply_retention(keep_last=10, max_bytes=250)
+        self.assertEqual(list(EquipmentDataset.objects.values_list('file_name', flat=True)), ['s2', 's1'])
+
+    def test_datasets_rank_by_last_write(self):
+        from django.utils import timezone
+        from equipment.models import EquipmentDataset
+        from equipment.retention import apply_retention
+
+        made = [self.make(f'w{i}', 10) for i in range(3)]
+        # The oldest upload was appended to last
+        EquipmentDataset.objects.filter(id=made[0].id).update(modified_at=timezone.now())
+        apply_retention(keep_last=2)
+        self.assertEqual(sorted(EquipmentDataset.objects.values_list('file_name', flat=True)), ['w0', 'w2'])
+
+
+@override_settings(**TEST_SETTINGS)
+class AuthenticationTests(TestCase):
+    def setUp(self):
+        from core.authentication import credential_cache
+        credential_cache._entries.clear()
+        self.user = get_user_model().objects.create_user(username='op', email='op@example.com', password='s3cret-pass')
+
+    def test_login_issues_bearer_token_checked_without_hashing(self):
+        from unittest import mock
+        from rest_framework.test import APIRequestFactory
+        from core.authentication import SignedTokenAuthentication
+
+        resp = self.client.post('/api/login/', {'username_or_email': 'op', 'password': 's3cret-pass'})
+        token = resp.json()['access_token']
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        with mock.patch('django.contrib.auth.hashers.check_password') as check:
+            user, _ = SignedTokenAuthentication().authenticate(request)
+        check.assert_not_called()
+        self.assertEqual(user, self.user)
+
+        self.user.set_password('changed-pass')
+        self.user.save()
+        from rest_framework.exceptions import AuthenticationFailed
+        with self.assertRaises(AuthenticationFailed):
+            SignedTokenAuthentication().authenticate(request)
+
+    def test_basic_credentials_are_verified_once(self):
+        from unittest import mock
+        from rest_framework.test import APIRequestFactory
+        from core.authentication import BasicAuthenticationNoBrowserPopup, credential_cache
+
+        header = 'Basic ' + base64.b64encode(b'op:s3cret-pass').decode()
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=header)
+        auth = BasicAuthenticationNoBrowserPopup()
+        with mock.patch('core.authentication.authenticate', wraps=authenticate) as verify:
+            for _ in range(3):
+                user, _ = auth.authenticate(request)
+        self.assertEqual(verify.call_count, 1)
+        self.assertEqual(user, self.user)
+        self.assertGreaterEqual(credential_cache.stats()['hits'], 2)
+
+        # The counts are exported for Prometheus too
+        with self.settings(METRICS_TOKEN='secret'):
+            resp = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        lines = resp.content.decode().splitlines()
+        self.assertIn('# TYPE auth_cache_hits_total counter', lines)
+        values = dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+        self.assertGreaterEqual(int(values['auth_cache_hits_total']), 2)
+        self.assertGreaterEqual(int(values['auth_cache_misses_total']), 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class PDFReportTests(TestCase):
+    def test_report_renders_once_per_summary(self):
+        from unittest import mock
+        from equipment import reports, storage
+
+        rows = b''.join(b'Unit %d,Type%d,%d,%d.5,20\n' % (i, i % 7, i, i % 13) for i in range(3000))
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows
+        f = SimpleUploadedFile('plant.csv', csv, content_type='text/csv')
+        dataset_id = self.client.post('/api/upload/', {'file': f}).json()['id']
+
+        # Chart series are bucketed batch by batch, never loaded whole
+        with mock.patch.object(storage, 'open_table') as open_table:
+            resp = self.client.get('/api/report/', {'id': dataset_id})
+        open_table.assert_not_called()
+        self.assertEqual(resp.status_code, 200)
+        pdf = b''.join(resp.streaming_content)
+        self.assertTrue(pdf.startswith(b'%PDF'))
+        self.assertGreaterEqual(pdf.count(b'/Type /Page\n'), 2)
+
+        with mock.patch.object(reports, 'render_report') as render:
+            again = self.client.get('/api/report/', {'id': dataset_id})
+            self.assertEqual(b''.join(again.streaming_content), pdf)
+        render.assert_not_called()
+
+
+class DatabaseSetupTests(TestCase):
+    def test_sqlite_connections_are_tuned(self):
+        from django.conf import settings
+        from django.db import connection
+
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA synchronous')
+            self.assertEqual(cursor.fetchone()[0], 1)  # NORMAL
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -settings.SQLITE_CACHE_KIB)
+
+    def test_new_database_options_need_django_5_1(self):
+        import os
+        from pathlib import Path
+        from unittest import mock
+        from core.database import database_config
+
+        with mock.patch.dict(os.environ, {}, clear=True):
+            with mock.patch('django.VERSION', (5, 1, 0, 'final', 0)):
+                self.assertEqual(database_config(Path('/tmp'))['OPTIONS']['transaction_mode'], 'IMMEDIATE')
+            with mock.patch('django.VERSION', (4, 2, 0, 'final', 0)):
+                self.assertNotIn('transaction_mode', database_config(Path('/tmp'))['OPTIONS'])
+            with mock.patch('django.VERSION', (5, 0, 0, 'final', 0)), \
+                    mock.patch.dict(os.environ, {'DATABASE_URL': 'postgres://u:p@db.example.com:5432/plant'}):
+                config = database_config(Path('/tmp'))
+            self.assertNotIn('pool', config['OPTIONS'])
+            self.assertEqual(config['CONN_MAX_AGE'], 600)
+
+    def test_database_url_gets_persistent_connections(self):
+        import os
+        from pathlib import Path
+        from unittest import mock
+        from core.database import database_config
+
+        with mock.patch.dict(os.environ, {'DATABASE_URL': 'postgres://u:p@db.example.com:5432/plant'}):
+            config = database_config(Path('/tmp'))
+        self.assertEqual(config['ENGINE'], 'django.db.backends.postgresql')
+        self.assertTrue(config['CONN_HEALTH_CHECKS'])
+        self.assertEqual(config['OPTIONS']['connect_timeout'], 10)
+        self.assertEqual(config['CONN_MAX_AGE'], 0 if 'pool' in config['OPTIONS'] else 600)
+
+    def test_shipped_requirements_pool_postgres_under_asgi(self):
+        import os
+        import re
+        from pathlib import Path
+        from unittest import mock
+        from django.conf import settings
+        from core.database import database_config
+
+        with open(settings.BASE_DIR / 'requirements.txt') as f:
+            requirements = [re.sub(r'\s+', '', line.split('#')[0]).lower() for line in f]
+        self.assertIn('psycopg[binary,pool]', requirements)
+
+        env = {'DATABASE_URL': 'postgres://u:p@db.example.com:5432/plant', 'DJANGO_ASGI': 'true'}
+        # psycopg and psycopg_pool, as the requirements install them
+        with mock.patch.dict(os.environ, env, clear=True), \
+                mock.patch('importlib.util.find_spec', return_value=object()):
+            config = database_config(Path('/tmp'))
+        self.assertIn('pool', config['OPTIONS'])
+        self.assertEqual(config['CONN_MAX_AGE'], 0)
+
+        # Without a pool, ASGI does not keep connections, WSGI does
+        with mock.patch('importlib.util.find_spec', return_value=None):
+            with mock.patch.dict(os.environ, env, clear=True):
+                config = database_config(Path('/tmp'))
+            self.assertNotIn('pool', config['OPTIONS'])
+            self.assertEqual(config['CONN_MAX_AGE'], 0)
+            with mock.patch.dict(os.environ, {'DJANGO_ASGI': 'true'}, clear=True):
+                self.assertEqual(database_config(Path('/tmp'))['CONN_MAX_AGE'], 0)
+            with mock.patch.dict(os.environ, {}, clear=True):
+                self.assertEqual(database_config(Path('/tmp'))['CONN_MAX_AGE'], 600)
+
+    def test_locked_writes_are_retried_with_backoff(self):
+        from unittest import mock
+        from django.db import OperationalError
+        from core.database import retry_on_locked
+
+        locked = OperationalError('database is locked')
+        write = mock.Mock(side_effect=[locked, locked, 'ok'], __qualname__='write')
+        # Retries are skipped inside a transaction, as every TestCase test is
+        with mock.patch('core.database.connection') as connection, mock.patch('core.database.time.sleep') as sleep:
+            connection.in_atomic_block = False
+            self.assertEqual(retry_on_locked(write)(), 'ok')
+            self.assertEqual(write.call_count, 3)
+            self.assertEqual(sleep.call_count, 2)
+
+            broken = mock.Mock(side_effect=OperationalError('no such table: x'), __qualname__='broken')
+            with self.assertRaises(OperationalError):
+                retry_on_locked(broken)()
+            self.assertEqual(broken.call_count, 1)
+
+
+@override_settings(**TEST_SETTINGS)
+class BenchmarkTests(TestCase):
+    def test_suite_measures_every_endpoint_and_flags_regressions(self):
+        import copy
+        from equipment.benchmarks import compare, run_suite
+
+        csv_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, csv_dir, ignore_errors=True)
+        report = run_suite(self.client, rows=[500], types=[4], repeat=1, csv_dir=csv_dir)
+        names = [r['name'] for r in report['results']]
+        self.assertEqual(names, [
+            'upload', 'data_full', 'data_page', 'summary_cold', 'summary_warm',
+            'history_cold', 'history_warm', 'pdf',
+        ])
+        self.assertEqual(report['results'][0]['rows'], 500)
+        self.assertGreater(report['results'][0]['rows_per_second'], 0)
+
+        baseline = copy.deepcopy(report)
+        baseline['results'][-1]['min_seconds'] /= 2
+        flagged = [key for key, _, _, _, regressed in compare(report, baseline) if regressed]
+        self.assertEqual(flagged, ['pdf[rows=500,types=4]'])
+
+
+@override_settings(**TEST_SETTINGS)
+class InstrumentationTests(TestCase):
+    def upload(self):
+        rows = b''.join(b'Unit %d,Type%d,%d,2.5,20\n' % (i, i % 3, i) for i in range(500))
+        csv = b'Equipment Name,Type,Flowrate,Pressure,Temperature\n' + rows
+        return self.client.post('/api/upload/', {'file': SimpleUploadedFile('plant.csv', csv)})
+
+    def test_upload_phases_are_reported_and_aggregated(self):
+        resp = self.upload()
+        self.assertEqual(resp.status_code, 200)
+        phases = [entry.split(';')[0] for entry in resp['Server-Timing'].split(', ')]
+        for phase in ('parse_body', 'read_csv', 'sketch', 'write', 'summary', 'db', 'total'):
+            self.assertIn(phase, phases)
+
+        # Another worker's snapshot is merged into the totals; the parent
+        # process stands in for a live worker
+        from core.instrumentation import BUCKETS
+        snapshot = {
+            'requests': [['api/upload/', 'POST', '200', 2]],
+            'durations': [],
+            'phases': [['api/upload/', 'read_csv', [0] * len(BUCKETS) + [2], 240.0]],
+        }
+        with open(os.path.join(TEST_SETTINGS['METRICS_DIR'], f'{os.getppid()}.json'), 'w') as f:
+            json.dump(snapshot, f)
+        self.addCleanup(os.remove, f.name)
+        # That of a worker that has exited is dropped
+        dead = os.path.join(TEST_SETTINGS['METRICS_DIR'], '999999999.json')
+        with open(dead, 'w') as f:
+            json.dump(snapshot, f)
+
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        with self.settings(METRICS_TOKEN='secret'):
+            self.assertEqual(self.client.get('/api/metrics/').status_code, 401)
+            self.assertEqual(
+                self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer wrong').status_code, 401,
+            )
+            resp = self.client.get('/api/metrics/', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(resp.status_code, 200)
+        self.assertFalse(os.path.exists(dead))
+        self.assertTrue(resp['Content-Type'].startswith('text/plain; version=0.0.4'))
+        lines = resp.content.decode().splitlines()
+        self.assertIn('# TYPE http_request_phase_duration_seconds histogram', lines)
+        values = dict(line.rsplit(' ', 1) for line in lines if not line.startswith('#'))
+        self.assertGreaterEqual(int(values['http_requests_total{route="api/upload/",method="POST",status="200"}']), 3)
+        key = 'http_request_phase_duration_seconds_bucket{route="api/upload/",phase="read_csv",le="%s"}'
+        self.assertEqual(int(values[key % '+Inf']) - int(values[key % '60.0']), 2)
+
+    def test_slow_requests_are_profiled(self):
+        import pstats
+
+        profile_dir = os.path.join(TEST_MEDIA_ROOT, 'profiles')
+        with self.settings(PROFILE_SLOW_REQUESTS=1e-9, PROFILE_SAMPLE_RATE=1.0, PROFILE_DIR=profile_dir, PROFILE_KEEP=1):
+            self.upload()
+            self.client.get('/api/summary/')
+        names = os.listdir(profile_dir)
+        self.assertEqual(len(names), 1)
+        self.assertIn('GET-api-summary-', names[0])
+        stats = pstats.Stats(os.path.join(profile_dir, names[0]))
+        self.assertGreater(stats.total_calls, 0)
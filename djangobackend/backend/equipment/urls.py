@@ -5,11 +5,22 @@ from . import views
 
 urlpatterns = [
     path('health/', csrf_exempt(views.HealthCheckView.as_view()), name='health-check'),
+    path('metrics/', csrf_exempt(views.MetricsView.as_view()), name='metrics'),
     path('login/', csrf_exempt(views.LoginView.as_view()), name='login'),
     path('register/', csrf_exempt(views.RegisterView.as_view()), name='register'),
     path('load-sample/', csrf_exempt(views.LoadSampleDataView.as_view()), name='load-sample'),
     path('upload/', csrf_exempt(views.UploadCSVView.as_view()), name='upload-csv'),
+    path('upload/batch/', csrf_exempt(views.BatchUploadView.as_view()), name='upload-batch'),
+    path('datasets/<int:dataset_id>/append/', csrf_exempt(views.AppendView.as_view()), name='dataset-append'),
+    path('jobs/<uuid:job_id>/', csrf_exempt(views.UploadJobView.as_view()), name='upload-job'),
+    path('events/', csrf_exempt(views.EventsView.as_view()), name='events'),
+    path('updates/', csrf_exempt(views.UpdatesView.as_view()), name='updates'),
     path('summary/', csrf_exempt(views.SummaryView.as_view()), name='summary'),
+    path('type-stats/', csrf_exempt(views.TypeStatsView.as_view()), name='type-stats'),
+    path('distribution/', csrf_exempt(views.DistributionView.as_view()), name='distribution'),
+    path('trends/', csrf_exempt(views.TrendsView.as_view()), name='trends'),
     path('history/', csrf_exempt(views.HistoryView.as_view()), name='history'),
+    path('data/', csrf_exempt(views.DataView.as_view()), name='data'),
+    path('chart/', csrf_exempt(views.ChartDataView.as_view()), name='chart-data'),
     path('report/', csrf_exempt(views.PDFReportView.as_view()), name='pdf-report'),
 ]
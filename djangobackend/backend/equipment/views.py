@@ -3,19 +3,52 @@ from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
-from django.http import JsonResponse
-from .models import EquipmentDataset
-from .serializers import EquipmentDatasetSerializer
-import pandas as pd
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.utils.http import http_date, quote_etag
+from django.utils.cache import get_conditional_response
+from django.views import View
+from django.core.handlers.asgi import ASGIRequest
+from .models import METRIC_FIELDS, EquipmentDataset, UploadJob
+from .serializers import LIST_FIELDS, adataset_list_values, iter_records_json
+from .ingest import AppendError, CSVParseError, MissingColumnsError, append_csv, ingest_csv, preview_csv
+from .compression import CompressedUploadError, DecompressionLimitError, is_supported
+from .jobs import submit_upload
+from .batch import BatchUploadError, ingest_batch
+from .sketches import QUANTILES
+from .summary import NUMERIC_COLUMNS
+from . import storage
+from .downsample import bucket_stats, lttb
+from .caching import (
+    acached_response_data,
+    adatasets_version,
+    cached_response_data,
+    response_etag,
+    response_last_modified,
+    version_etag,
+)
+from .events import get_watcher, poll_updates
+from .executor import iterate_blocking, run_blocking
+from .reports import get_report
+import hmac
+import orjson
+from core.authentication import credential_cache, issue_token
+from core.instrumentation import metrics, render_prometheus, span
 from django.core.files.storage import default_storage
 from django.conf import settings
-from reportlab.pdfgen import canvas
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from django.core.cache import cache
 from django.http import FileResponse
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
-import os
+import datetime
+import functools
 import time
 import logging
 import base64
@@ -26,55 +59,51 @@ class UploadCSVView(APIView):
     permission_classes = [AllowAny]  # Allow anonymous uploads
     authentication_classes = []  # Disable authentication to prevent 403 on invalid tokens
     
+    def wants_async(self, request):
+        # Opt in per request with ?async=1 or "Prefer: respond-async" (RFC 7240)
+        if request.query_params.get('async', '').lower() in ('1', 'true', 'yes'):
+            return True
+        if 'respond-async' in request.META.get('HTTP_PREFER', ''):
+            return True
+        return settings.UPLOAD_ASYNC_DEFAULT
+
     def post(self, request, *args, **kwargs):
         try:
-            # Get uploaded file
-            file_obj = request.FILES.get('file')
+            # Get uploaded file; DRF reads and parses the body on first access
+            with span('parse_body'):
+                file_obj = request.FILES.get('file')
             if not file_obj:
                 return Response({'error': 'No file uploaded'}, status=400)
             
-            # Validate file extension
-            if not file_obj.name.endswith('.csv'):
-                return Response({'error': 'Only CSV files are allowed'}, status=400)
+            # Validate file extension; compressed CSVs are decompressed while parsing
+            if not is_supported(file_obj.name):
+                return Response({'error': 'Only CSV files (.csv, .csv.gz, .csv.zst or .zip) are allowed'}, status=400)
+            
+            # Large uploads can be handed to the worker pool: 202 + job id
+            if self.wants_async(request):
+                job = submit_upload(file_obj)
+                status_url = reverse('upload-job', kwargs={'job_id': job.id})
+                response = Response({
+                    'job_id': str(job.id),
+                    'status': job.status,
+                    'status_url': status_url,
+                }, status=status.HTTP_202_ACCEPTED)
+                response['Location'] = status_url
+                return response
             
-            # Parse CSV directly from memory (production-safe)
+            # Parse CSV in fixed-size chunks so memory stays bounded for large
+            # files, persisting each chunk to columnar storage in the same pass
             try:
-                # Read file content
-                file_content = file_obj.read()
-                if isinstance(file_content, bytes):
-                    file_content = file_content.decode('utf-8')
-                
-                # Parse with pandas
-                from io import StringIO
-                csv_data = StringIO(file_content)
-                df = pd.read_csv(csv_data)
-                
-            except Exception as e:
+                dataset = ingest_csv(file_obj, file_obj.name)
+            except MissingColumnsError as e:
+                return Response({'error': str(e)}, status=400)
+            except DecompressionLimitError as e:
+                return Response({'error': str(e)}, status=413)
+            except CompressedUploadError as e:
+                return Response({'error': str(e)}, status=400)
+            except CSVParseError as e:
                 return Response({'error': f'Failed to parse CSV: {str(e)}'}, status=400)
             
-            # Validate required columns (case-insensitive)
-            cols = [c.strip().lower() for c in df.columns]
-            required = ['type', 'flowrate', 'pressure', 'temperature']
-            missing = [r for r in required if not any(r == c or r in c for c in cols)]
-            if missing:
-                return Response({'error': f'Missing required columns: {", ".join(missing)}. Found columns: {", ".join(df.columns)}'}, status=400)
-            
-            # Generate summary
-            summary = self.get_summary(df)
-            
-            # Create dataset record (no file storage needed)
-            dataset = EquipmentDataset.objects.create(
-                file_name=file_obj.name,
-                record_count=len(df),
-                summary=summary
-            )
-            
-            # Keep only last 5 datasets
-            if EquipmentDataset.objects.count() > 5:
-                old_datasets = EquipmentDataset.objects.all()[5:]
-                for obj in old_datasets:
-                    obj.delete()
-            
             return Response({
                 'id': dataset.id,
                 'file_name': dataset.file_name,
@@ -86,134 +115,521 @@ class UploadCSVView(APIView):
         except Exception as e:
             return Response({'error': f'Upload failed: {str(e)}'}, status=500)
 
-    def get_summary(self, df):
-        # Helper to find a column case-insensitively
-        def find_col(key):
-            for c in df.columns:
-                if c.lower() == key.lower():
-                    return df[c]
-            return None
-
-        flow = find_col('Flowrate')
-        pressure = find_col('Pressure')
-        temp = find_col('Temperature')
-        typ = find_col('Type')
-
-        summary = {
-            'totalCount': len(df),
-            'avgFlowrate': float(flow.mean()) if flow is not None and not flow.empty else None,
-            'avgPressure': float(pressure.mean()) if pressure is not None and not pressure.empty else None,
-            'avgTemperature': float(temp.mean()) if temp is not None and not temp.empty else None,
-            'typeDistribution': typ.value_counts().to_dict() if typ is not None else {},
-            'minFlowrate': float(flow.min()) if flow is not None and not flow.empty else None,
-            'maxFlowrate': float(flow.max()) if flow is not None and not flow.empty else None,
-            'minPressure': float(pressure.min()) if pressure is not None and not pressure.empty else None,
-            'maxPressure': float(pressure.max()) if pressure is not None and not pressure.empty else None,
-            'minTemperature': float(temp.min()) if temp is not None and not temp.empty else None,
-            'maxTemperature': float(temp.max()) if temp is not None and not temp.empty else None,
-        }
-        return summary
+@method_decorator(csrf_exempt, name='dispatch')
+class BatchUploadView(APIView):
+    """
+    Ingest many CSV files in one request: repeat the ``files`` field, or send
+    ZIP/tar archives of CSV files. Responds with one result per CSV.
+    """
+    parser_classes = [MultiPartParser]
+    permission_classes = [AllowAny]
+    authentication_classes = []
 
-class SummaryView(APIView):
-    permission_classes = [AllowAny]  # Allow anonymous access for development
-    authentication_classes = []  # Disable authentication to prevent 403
-    
-    def get(self, request):
-        dataset_id = request.query_params.get('id')
+    def post(self, request, *args, **kwargs):
+        uploads = request.FILES.getlist('files') + request.FILES.getlist('file')
+        if not uploads:
+            return Response({'error': 'No file uploaded'}, status=400)
+        try:
+            results = ingest_batch(uploads)
+        except DecompressionLimitError as e:
+            return Response({'error': str(e)}, status=413)
+        except BatchUploadError as e:
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            return Response({'error': f'Upload failed: {str(e)}'}, status=500)
+
+        created = sum(1 for r in results if r['status'] == 'created')
+        return Response({
+            'created': created,
+            'failed': len(results) - created,
+            'results': results,
+        }, status=200 if created else 400)
+
+@method_decorator(csrf_exempt, name='dispatch')
+class AppendView(APIView):
+    """
+    Append the rows of an uploaded CSV to an existing dataset. The summary
+    and per-type statistics are updated from the stored sketch, so the cost
+    depends on the appended rows only.
+    """
+    parser_classes = [MultiPartParser]
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def post(self, request, dataset_id):
+        with span('parse_body'):
+            file_obj = request.FILES.get('file')
+        if not file_obj:
+            return Response({'error': 'No file uploaded'}, status=400)
+        if not is_supported(file_obj.name):
+            return Response({'error': 'Only CSV files (.csv, .csv.gz, .csv.zst or .zip) are allowed'}, status=400)
+        try:
+            dataset, appended = append_csv(dataset_id, file_obj, file_obj.name)
+        except EquipmentDataset.DoesNotExist:
+            return Response({'error': 'Dataset not found'}, status=404)
+        except AppendError as e:
+            return Response({'error': str(e)}, status=409)
+        except MissingColumnsError as e:
+            return Response({'error': str(e)}, status=400)
+        except DecompressionLimitError as e:
+            return Response({'error': str(e)}, status=413)
+        except CompressedUploadError as e:
+            return Response({'error': str(e)}, status=400)
+        except CSVParseError as e:
+            return Response({'error': f'Failed to parse CSV: {str(e)}'}, status=400)
+        except Exception as e:
+            return Response({'error': f'Append failed: {str(e)}'}, status=500)
+
+        return Response({
+            'id': dataset.id,
+            'file_name': dataset.file_name,
+            'appended': appended,
+            'record_count': dataset.record_count,
+            'summary': dataset.summary,
+        })
+
+def _conditional(view_class):
+    """
+    Serve ``get`` with ETag/Last-Modified derived from the dataset version,
+    so a poll with a matching If-None-Match gets 304 without touching the
+    database.
+    """
+    return method_decorator(
+        condition(etag_func=response_etag, last_modified_func=response_last_modified),
+        name='get',
+    )(view_class)
+
+
+def _revalidating(response):
+    # Let browsers keep the body but always check the ETag before reuse
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
+def _async_conditional(view_class):
+    """
+    ``_conditional`` for async views: the dataset version behind the ETag
+    and Last-Modified headers is read with the async cache API.
+    """
+    get = view_class.get
+
+    @functools.wraps(get)
+    async def conditional_get(self, request, *args, **kwargs):
+        token, modified = await adatasets_version()
+        etag = quote_etag(version_etag(token, request))
+        last_modified = int(modified)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = await get(self, request, *args, **kwargs)
+        response.headers.setdefault('ETag', etag)
+        response.headers.setdefault('Last-Modified', http_date(last_modified))
+        return response
+
+    view_class.get = conditional_get
+    return view_class
+
+
+def _json_response(data, status=200):
+    # Rendered like the DRF views, so both kinds of endpoint emit the same JSON
+    return HttpResponse(JSONRenderer().render(data), content_type='application/json', status=status)
+
+
+# The read endpoints dashboards poll are native async views: under ASGI the
+# event loop waits on the async ORM and cache, and blocking file reads run on
+# the bounded read executor, so idle pollers do not hold threads.
+
+@_async_conditional
+class SummaryView(View):
+    async def get(self, request):
+        status_code, data = await acached_response_data(request, lambda: self.build(request))
+        return _revalidating(_json_response(data, status=status_code))
+
+    async def build(self, request):
+        datasets = EquipmentDataset.objects.values('summary')
+        dataset_id = request.GET.get('id')
         if dataset_id:
             # Get dataset by ID (no user filtering since user field was removed)
-            dataset = EquipmentDataset.objects.filter(id=dataset_id).first()
+            dataset = await datasets.filter(id=dataset_id).afirst()
             if not dataset:
-                return Response({'error': 'Dataset not found'}, status=404)
-            return Response(dataset.summary)
-        # Try to find a dataset with valid equipment data (has avgFlowrate)
-        datasets_to_check = EquipmentDataset.objects.all()[:10]  # Get recent datasets
-            
-        for dataset in datasets_to_check:
-            if dataset.summary and dataset.summary.get('avgFlowrate') is not None:
-                return Response(dataset.summary)
-        
+                return 404, {'error': 'Dataset not found'}
+            return 200, dataset['summary']
+        # Latest dataset with valid equipment data (has avgFlowrate), one indexed lookup
+        dataset = await datasets.filter(has_flowrate=True).afirst()
+        if dataset:
+            return 200, dataset['summary']
+
         # Fallback to latest dataset
-        latest = EquipmentDataset.objects.first()
+        latest = await datasets.afirst()
         if not latest:
-            return Response({'error': 'No data'}, status=404)
-        return Response(latest.summary)
+            return 404, {'error': 'No data'}
+        return 200, latest['summary']
 
-class HistoryView(APIView):
+@_async_conditional
+class HistoryView(View):
+    async def get(self, request):
+        # Sparse fieldsets, e.g. ?fields=id,file_name,record_count, keep
+        # entries small however large the summaries grow
+        fields = None
+        if request.GET.get('fields'):
+            fields = [f.strip() for f in request.GET['fields'].split(',') if f.strip()]
+            unknown = [f for f in fields if f not in LIST_FIELDS]
+            if unknown or not fields:
+                return _json_response(
+                    {'error': f'Unknown fields: {", ".join(unknown)}. Available: {", ".join(LIST_FIELDS)}'},
+                    status=400,
+                )
+        # Return recent datasets (user field no longer exists)
+        data = await acached_response_data(
+            request,
+            lambda: adataset_list_values(EquipmentDataset.objects.all()[:5], fields),
+        )
+        return _revalidating(_json_response(data))
+
+class UpdatesView(View):
+    """
+    Long poll for dashboard updates: ``?since=<version>`` is held until the
+    dataset version changes (200 with the newest dataset and its summary)
+    or for up to ``timeout`` seconds (204). Without ``since`` the current
+    state is returned at once.
+    """
+
+    async def get(self, request):
+        try:
+            timeout = float(request.GET.get('timeout', settings.LONG_POLL_TIMEOUT))
+        except ValueError:
+            return _json_response({'error': 'timeout must be a number'}, status=400)
+        timeout = min(max(timeout, 0), settings.LONG_POLL_TIMEOUT)
+        update = await get_watcher().wait(request.GET.get('since'), timeout)
+        if update is None:
+            return HttpResponse(status=204)
+        return _json_response(update)
+
+class EventsView(View):
+    """
+    Server-Sent Events stream of dashboard updates: one ``update`` event
+    with the newest dataset and its summary whenever the dataset version
+    changes. Reconnecting clients resume from ``Last-Event-ID``.
+    """
+
+    async def get(self, request):
+        since = request.GET.get('since') or request.headers.get('Last-Event-ID')
+        if isinstance(request, ASGIRequest):
+            stream = self.stream(since)
+        else:
+            # WSGI would buffer an async stream completely, so poll in the
+            # worker thread and end the stream after LONG_POLL_TIMEOUT; the
+            # browser reconnects with Last-Event-ID, and a worker is only
+            # held for that long at a time
+            stream = self.stream_sync(since)
+        response = StreamingHttpResponse(stream, content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        # Keep reverse proxies from buffering the stream
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def stream(self, since):
+        watcher = get_watcher()
+        yield f'retry: {int(settings.PUSH_POLL_INTERVAL * 1000) + 1000}\n\n'.encode()
+        while True:
+            update = await watcher.wait(since, settings.PUSH_HEARTBEAT)
+            if update is None:
+                yield b': keep-alive\n\n'
+                continue
+            since = update['version']
+            yield self.event(update)
+
+    @staticmethod
+    def event(update):
+        return b'id: %s\nevent: update\ndata: %s\n\n' % (update['version'].encode(), JSONRenderer().render(update))
+
+    def stream_sync(self, since):
+        yield f'retry: {int(settings.PUSH_POLL_INTERVAL * 1000)}\n\n'.encode()
+        for update in poll_updates(since, settings.LONG_POLL_TIMEOUT):
+            yield b': keep-alive\n\n' if update is None else self.event(update)
+
+@_conditional
+class TypeStatsView(APIView):
+    """Per-equipment-type count and avg/min/max/p95, precomputed at ingest."""
     permission_classes = [AllowAny]
-    authentication_classes = []  # Disable authentication to prevent 403
+    authentication_classes = []
+
     def get(self, request):
-        # Return recent datasets (user field no longer exists)
-        qs = EquipmentDataset.objects.all()[:5]
-        return Response(EquipmentDatasetSerializer(qs, many=True).data)
+        status_code, data = cached_response_data(request, lambda: self.build(request))
+        return _revalidating(Response(data, status=status_code))
 
-class DataView(APIView):
-    permission_classes = [AllowAny]  # Allow anonymous access for development
-    authentication_classes = []  # Disable authentication to prevent 403
+    def build(self, request):
+        fields = ('id', 'record_count', 'type_stats')
+        dataset_id = request.query_params.get('id')
+        if dataset_id:
+            dataset = EquipmentDataset.objects.filter(id=dataset_id).values(*fields).first()
+            if not dataset:
+                return 404, {'error': 'Dataset not found'}
+        else:
+            dataset = EquipmentDataset.objects.filter(has_numeric=True).values(*fields).first()
+            if not dataset:
+                return 404, {'error': 'No data'}
+        return 200, {'id': dataset['id'], 'record_count': dataset['record_count'], 'types': dataset['type_stats']}
+
+@_conditional
+class DistributionView(APIView):
+    """
+    p50/p95/p99 and histogram bins per numeric column, kept up to date at
+    ingest and on append, so serving them does not depend on dataset size.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
 
     def get(self, request):
+        status_code, data = cached_response_data(request, lambda: self.build(request))
+        return _revalidating(Response(data, status=status_code))
+
+    def build(self, request):
+        columns = storage.NUMERIC
+        if request.query_params.get('column'):
+            column = request.query_params['column'].lower()
+            if column not in storage.NUMERIC:
+                return 400, {'error': f'column must be one of: {", ".join(storage.NUMERIC)}'}
+            columns = (column,)
+
+        fields = ('id', 'record_count', 'summary', 'histograms')
         dataset_id = request.query_params.get('id')
+        if dataset_id:
+            dataset = EquipmentDataset.objects.filter(id=dataset_id).values(*fields).first()
+            if not dataset:
+                return 404, {'error': 'Dataset not found'}
+        else:
+            dataset = EquipmentDataset.objects.filter(has_numeric=True).values(*fields).first()
+            if not dataset:
+                return 404, {'error': 'No data'}
+
+        summary = dataset['summary'] or {}
+        result = {}
+        for key, name in NUMERIC_COLUMNS:
+            if name not in columns:
+                continue
+            histogram = dataset['histograms'].get(name, {'edges': [], 'counts': []})
+            result[name] = {
+                **{stat: summary.get(f'{stat}{key}') for stat, _ in QUANTILES},
+                **histogram,
+            }
+        return 200, {'id': dataset['id'], 'record_count': dataset['record_count'], 'columns': result}
+
+def _parse_moment(value):
+    """Parse an ISO date or datetime query param; dates mean midnight UTC."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise ValueError(f'invalid date: {value}')
+        moment = datetime.datetime.combine(day, datetime.time())
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment, datetime.timezone.utc)
+    return moment
+
+
+@_conditional
+class TrendsView(APIView):
+    """
+    Selected summary metrics across many datasets, oldest first, e.g.
+    ``?metrics=avgPressure,maxTemperature&since=2026-09-01&limit=500``.
+
+    Reads the denormalized metric columns in one query, so no summary JSON
+    is decoded. Series are returned column-wise.
+    """
+    permission_classes = [AllowAny]
+    authentication_classes = []
+
+    def get(self, request):
+        status_code, data = cached_response_data(request, lambda: self.build(request))
+        return _revalidating(Response(data, status=status_code))
+
+    def build(self, request):
+        params = request.query_params
+        metrics = [m.strip() for m in params.get('metrics', 'avgFlowrate,avgPressure,avgTemperature').split(',') if m.strip()]
+        unknown = [m for m in metrics if m not in METRIC_FIELDS]
+        if unknown or not metrics:
+            return 400, {'error': f'Unknown metrics: {", ".join(unknown)}. Available: {", ".join(METRIC_FIELDS)}'}
+        try:
+            since = _parse_moment(params['since']) if params.get('since') else None
+            until = _parse_moment(params['until']) if params.get('until') else None
+            limit = min(int(params.get('limit', settings.TRENDS_DEFAULT_POINTS)), settings.TRENDS_MAX_POINTS)
+            if limit < 1:
+                raise ValueError('limit must be >= 1')
+        except ValueError as e:
+            return 400, {'error': f'Invalid parameters: {e}'}
+
+        datasets = EquipmentDataset.objects.all()
+        if since is not None:
+            datasets = datasets.filter(uploaded_at__gte=since)
+        if until is not None:
+            datasets = datasets.filter(uploaded_at__lt=until)
+        # The newest ``limit`` datasets in range, then put back in time order
+        rows = list(datasets.order_by('-uploaded_at').values_list(
+            'id', 'uploaded_at', 'record_count', *(METRIC_FIELDS[m] for m in metrics)
+        )[:limit])
+        rows.reverse()
+        columns = list(zip(*rows)) or [()] * (3 + len(metrics))
+        return 200, {
+            'count': len(rows),
+            'ids': list(columns[0]),
+            'uploaded_at': list(columns[1]),
+            'record_count': list(columns[2]),
+            'series': {metric: list(values) for metric, values in zip(metrics, columns[3:])},
+        }
+
+def _page_params(request):
+    """Parse ``cursor``/``limit`` query params; returns None when not paging."""
+    cursor = request.GET.get('cursor')
+    limit = request.GET.get('limit')
+    if cursor is None and limit is None:
+        return None
+    start = int(cursor or 0)
+    size = min(int(limit or settings.DATA_PAGE_SIZE), settings.DATA_MAX_PAGE_SIZE)
+    if start < 0 or size < 1:
+        raise ValueError('cursor must be >= 0 and limit >= 1')
+    return start, size
+
+
+class DataView(View):
+    async def get(self, request):
+        dataset_id = request.GET.get('id')
+        try:
+            page = _page_params(request)
+        except ValueError as e:
+            return _json_response({'error': f'Invalid pagination parameters: {e}'}, status=400)
+
+        datasets = EquipmentDataset.objects.defer('sketch')
+        if dataset_id:
+            dataset = await datasets.filter(id=dataset_id).afirst()
+            if not dataset:
+                return _json_response({'error': 'Dataset not found'}, status=404)
+        else:
+            # Most recent dataset with numeric Flowrate or Pressure
+            dataset = await datasets.filter(has_numeric=True).afirst()
+        if not dataset or not dataset.has_numeric:
+            return _json_response({'error': 'No dataset with numeric parameters found'}, status=404)
+
+        if page is not None:
+            with span('read'):
+                body = await run_blocking(self.render_page, dataset, *page)
+            return HttpResponse(body, content_type='application/json')
+        # Legacy CSV datasets are parsed here, off the event loop
+        with span('read'):
+            table = await run_blocking(storage.open_table, dataset)
+        if table is None:
+            return _json_response({'error': 'Dataset file is missing'}, status=404)
+        records = iter_records_json(table)
+        if isinstance(request, ASGIRequest):
+            records = iterate_blocking(records)
+        # Under WSGI the worker thread streams the blocking iterator itself;
+        # an async one would be collected in full before the first byte
+        return StreamingHttpResponse(records, content_type='application/json')
+
+    @staticmethod
+    def render_page(dataset, start, limit):
+        # The cursor is the row number to continue from; rows never move, so
+        # it stays valid across requests
+        table = storage.read_rows(dataset, start, limit)
+        rows = table.num_rows if table is not None else 0
+        end = start + rows
+        next_cursor = str(end) if rows and end < dataset.record_count else None
+        body = b''.join(iter_records_json(table, start=start)) if table is not None else b'[]'
+        head = orjson.dumps({'id': dataset.id, 'count': dataset.record_count, 'next_cursor': next_cursor})
+        return head[:-1] + b',"results":' + body + b'}'
+
+class ChartDataView(APIView):
+    """Downsampled flowrate/pressure/temperature series for charts."""
+    permission_classes = [AllowAny]
+    authentication_classes = []  # Disable authentication to prevent 403
 
-        # Build candidate list: requested dataset first (if any), otherwise all for this user
-        candidates = []
+    METHODS = ('lttb', 'buckets')
+
+    def get(self, request):
+        column = request.query_params.get('column', 'flowrate').lower()
+        method = request.query_params.get('method', 'lttb').lower()
+        if column not in storage.NUMERIC:
+            return Response({'error': f'column must be one of: {", ".join(storage.NUMERIC)}'}, status=400)
+        if method not in self.METHODS:
+            return Response({'error': f'method must be one of: {", ".join(self.METHODS)}'}, status=400)
+        try:
+            points = min(int(request.query_params.get('points', settings.CHART_DEFAULT_POINTS)), settings.CHART_MAX_POINTS)
+        except ValueError:
+            return Response({'error': 'points must be an integer'}, status=400)
+        if points < 3:
+            return Response({'error': 'points must be at least 3'}, status=400)
+
+        dataset_id = request.query_params.get('id')
         if dataset_id:
-            requested = EquipmentDataset.objects.filter(id=dataset_id).first()
-            if not requested:
+            dataset = EquipmentDataset.objects.filter(id=dataset_id).first()
+            if not dataset:
                 return Response({'error': 'Dataset not found'}, status=404)
-            candidates.append(requested)
         else:
-            candidates = list(EquipmentDataset.objects.all()[:10])  # Get recent datasets
+            dataset = EquipmentDataset.objects.filter(has_numeric=True).first()
+            if not dataset:
+                return Response({'error': 'No dataset with numeric parameters found'}, status=404)
 
-        # Find the most recent candidate that contains numeric Flowrate or Pressure
-        for dataset in candidates:
-            abs_path = os.path.join(settings.MEDIA_ROOT, dataset.csv_file.name)
-            try:
-                df = pd.read_csv(abs_path)
-            except Exception:
-                continue
-            cols = [c.strip() for c in df.columns]
-            if any(c.lower() in ('flowrate', 'flow rate', 'flow_rate') for c in cols) or any(c.lower() in ('pressure',) for c in cols):
-                df.columns = cols
-                records = []
-                for idx, row in df.iterrows():
-                    records.append({
-                        'id': idx,
-                        'equipmentName': row.get('Equipment Name') or row.get('Equipment') or row.get('Name') or '',
-                        'type': row.get('Type') or '',
-                        'flowrate': None if pd.isna(row.get('Flowrate')) else float(row.get('Flowrate')),
-                        'pressure': None if pd.isna(row.get('Pressure')) else float(row.get('Pressure')),
-                        'temperature': None if pd.isna(row.get('Temperature')) else float(row.get('Temperature')),
-                    })
-                return Response(records)
-        return Response({'error': 'No dataset with numeric parameters found'}, status=404)
+        # record_count is part of the key so a dataset that grows gets new series
+        key = f'chart:{dataset.id}:{dataset.record_count}:{column}:{method}:{points}'
+        result = cache.get(key)
+        if result is None:
+            table = storage.open_table(dataset, columns=[column])
+            if table is None or column not in table.column_names:
+                return Response({'error': f'Dataset has no {column} column'}, status=404)
+            values = table.column(column).to_numpy()
+            if method == 'lttb':
+                x, y = lttb(values, points)
+                series = {'x': x.tolist(), 'y': y.tolist()}
+            else:
+                series = bucket_stats(values, points)
+            result = {
+                'id': dataset.id,
+                'column': column,
+                'method': method,
+                'points': points,
+                'totalCount': dataset.record_count,
+                **series,
+            }
+            cache.set(key, result, settings.CHART_CACHE_TIMEOUT)
+        return Response(result)
+
+class UploadJobView(APIView):
+    """Progress and outcome of an asynchronous upload."""
+    permission_classes = [AllowAny]
+    authentication_classes = []  # Disable authentication to prevent 403
+
+    def get(self, request, job_id):
+        job = UploadJob.objects.filter(id=job_id).first()
+        if not job:
+            return Response({'error': 'Job not found'}, status=404)
+        return Response({
+            'id': str(job.id),
+            'file_name': job.file_name,
+            'status': job.status,
+            'rows_processed': job.rows_processed,
+            'bytes_read': job.bytes_read,
+            'total_bytes': job.total_bytes,
+            'dataset_id': job.dataset_id,
+            'error': job.error or None,
+            'created_at': job.created_at,
+            'updated_at': job.updated_at,
+        })
 
 class PDFReportView(APIView):
     permission_classes = [AllowAny]  # Allow anonymous access for development
 
     def get(self, request):
-        # Generate a PDF from the latest dataset summary for this user
-        if request.user.is_authenticated:
-            latest = EquipmentDataset.objects.filter(user=request.user).first()
+        # Report on the requested dataset, or the latest one (datasets are
+        # no longer tied to users)
+        dataset_id = request.query_params.get('id')
+        if dataset_id:
+            latest = EquipmentDataset.objects.filter(id=dataset_id).first()
         else:
             latest = EquipmentDataset.objects.first()
         if not latest:
             return Response({'error': 'No data'}, status=404)
-        # Create PDF in memory
-        from io import BytesIO
-        buffer = BytesIO()
-        c = canvas.Canvas(buffer)
-        c.setFont("Helvetica", 12)
-        c.drawString(100, 800, f"Equipment Data Report: {latest.file_name}")
-        y = 780
-        for k, v in latest.summary.items():
-            c.drawString(100, y, f"{k}: {v}")
-            y -= 20
-            if y < 100:
-                c.showPage()
-                y = 800
-        c.save()
-        buffer.seek(0)
-        return FileResponse(buffer, as_attachment=True, filename='equipment-report.pdf')
+        # Rendered once per dataset and summary, then streamed from disk
+        path = get_report(latest)
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename='equipment-report.pdf')
 
 @method_decorator(csrf_exempt, name='dispatch')
 class RegisterView(APIView):
@@ -253,7 +669,15 @@ class LoginView(APIView):
         if user is None:
             return Response({'error': 'Invalid credentials'}, status=status.HTTP_401_UNAUTHORIZED)
         token = base64.b64encode(f"{username}:{password}".encode()).decode()
-        return Response({'token': token, 'username': username})
+        # 'token' stays the Basic credential existing clients send; new
+        # clients should use the signed bearer token instead
+        return Response({
+            'token': token,
+            'username': username,
+            'access_token': issue_token(user),
+            'token_type': 'Bearer',
+            'expires_in': settings.AUTH_TOKEN_MAX_AGE,
+        })
 # Append to views.py - LoadSampleDataView
 # Add this at the end of the file
 
@@ -263,61 +687,61 @@ class LoadSampleDataView(APIView):
     authentication_classes = []  # Disable authentication to prevent 403 on invalid tokens
 
     def get(self, request):
-        import os
-        from django.conf import settings
-        
         # Load sample CSV from root of djangobackend
-        sample_path = os.path.join(settings.BASE_DIR, '..', 'sample_equipment_data.csv')
+        sample_path = settings.BASE_DIR.parent / 'sample_equipment_data.csv'
         
         try:
-            df = pd.read_csv(sample_path)
-            # Return summary like the upload endpoint does
-            summary = self._get_summary(df)
+            page = _page_params(request) or (0, settings.DATA_PAGE_SIZE)
+        except ValueError as e:
+            return Response({'error': f'Invalid pagination parameters: {e}'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # Sketched like an upload, so the summary has the same keys
+            start, limit = page
+            with open(sample_path, 'rb') as f:
+                sketch, rows = preview_csv(f, start, limit)
+            end = start + len(rows)
             return Response({
                 'message': 'Sample data loaded',
-                'totalCount': len(df),
-                'summary': summary,
-                'data': df.to_dict('records')
+                'totalCount': sketch.total,
+                'summary': sketch.summary(),
+                'data': rows.to_dict('records'),
+                'next_cursor': str(end) if end < sketch.total else None,
             }, status=status.HTTP_200_OK)
         except Exception as e:
             return Response({'error': f'Failed to load sample data: {str(e)}'}, status=status.HTTP_400_BAD_REQUEST)
-    
-    def _get_summary(self, df):
-        def find_col(key):
-            for c in df.columns:
-                if c.lower() == key.lower():
-                    return df[c]
-            return None
-        
-        flow = find_col('Flowrate')
-        pressure = find_col('Pressure')
-        temp = find_col('Temperature')
-        typ = find_col('Type')
-        
-        return {
-            'totalCount': len(df),
-            'avgFlowrate': float(flow.mean()) if flow is not None and not flow.empty else None,
-            'avgPressure': float(pressure.mean()) if pressure is not None and not pressure.empty else None,
-            'avgTemperature': float(temp.mean()) if temp is not None and not temp.empty else None,
-            'typeDistribution': typ.value_counts().to_dict() if typ is not None else {},
-            'minFlowrate': float(flow.min()) if flow is not None and not flow.empty else None,
-            'maxFlowrate': float(flow.max()) if flow is not None and not flow.empty else None,
-            'minPressure': float(pressure.min()) if pressure is not None and not pressure.empty else None,
-            'maxPressure': float(pressure.max()) if pressure is not None and not pressure.empty else None,
-            'minTemperature': float(temp.min()) if temp is not None and not temp.empty else None,
-            'maxTemperature': float(temp.max()) if temp is not None and not temp.empty else None,
-        }
 
 
-class HealthCheckView(APIView):
-    """Simple health check endpoint to verify deployment."""
-    permission_classes = [AllowAny]
-    authentication_classes = []  # Disable authentication to prevent 403
-    
+class MetricsView(View):
+    """
+    Request counts and latency histograms per route and phase, summed over
+    all worker processes, in the Prometheus text format. Requires
+    ``Authorization: Bearer <METRICS_TOKEN>``; without ``METRICS_TOKEN`` the
+    endpoint is disabled.
+    """
+
     def get(self, request):
+        token = settings.METRICS_TOKEN
+        if not token:
+            return HttpResponse('Metrics are disabled: set METRICS_TOKEN', status=403, content_type='text/plain')
+        supplied = request.headers.get('Authorization', '').encode()
+        if not hmac.compare_digest(supplied, f'Bearer {token}'.encode()):
+            return HttpResponse(status=401, headers={'WWW-Authenticate': 'Bearer'})
+        metrics.flush(force=True)
+        return HttpResponse(
+            render_prometheus(*metrics.collect()),
+            content_type='text/plain; version=0.0.4; charset=utf-8',
+        )
+
+
+class HealthCheckView(View):
+    """Simple health check endpoint to verify deployment."""
+
+    async def get(self, request):
         return JsonResponse({
             'status': 'ok',
             'message': 'Django backend is running successfully',
             'timestamp': time.time(),
-            'null_bytes_fixed': True
+            'null_bytes_fixed': True,
+            'auth_cache': credential_cache.stats(),
         })
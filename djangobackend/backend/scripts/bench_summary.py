@@ -0,0 +1,89 @@
+"""
+Micro-benchmark: legacy per-column summary vs. the shared vectorized engine.
+
+    python scripts/bench_summary.py                 # 1M and 10M rows
+    python scripts/bench_summary.py --rows 1000000 --repeat 5
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.normpath(os.path.join(os.path.dirname(__file__), '..')))
+
+from equipment.summary import summarize  # noqa: E402
+
+
+def legacy_summary(df):
+    # The get_summary implementation previously copy-pasted into
+    # UploadCSVView and LoadSampleDataView, kept here as the baseline.
+    def find_col(key):
+        for c in df.columns:
+            if c.lower() == key.lower():
+                return df[c]
+        return None
+
+    flow = find_col('Flowrate')
+    pressure = find_col('Pressure')
+    temp = find_col('Temperature')
+    typ = find_col('Type')
+
+    return {
+        'totalCount': len(df),
+        'avgFlowrate': float(flow.mean()) if flow is not None and not flow.empty else None,
+        'avgPressure': float(pressure.mean()) if pressure is not None and not pressure.empty else None,
+        'avgTemperature': float(temp.mean()) if temp is not None and not temp.empty else None,
+        'typeDistribution': typ.value_counts().to_dict() if typ is not None else {},
+        'minFlowrate': float(flow.min()) if flow is not None and not flow.empty else None,
+        'maxFlowrate': float(flow.max()) if flow is not None and not flow.empty else None,
+        'minPressure': float(pressure.min()) if pressure is not None and not pressure.empty else None,
+        'maxPressure': float(pressure.max()) if pressure is not None and not pressure.empty else None,
+        'minTemperature': float(temp.min()) if temp is not None and not temp.empty else None,
+        'maxTemperature': float(temp.max()) if temp is not None and not temp.empty else None,
+    }
+
+
+def make_frame(rows, types=8, seed=0):
+    rng = np.random.default_rng(seed)
+    flow = rng.normal(150, 40, rows)
+    flow[rng.random(rows) < 0.01] = np.nan
+    return pd.DataFrame({
+        'Equipment Name': 'Unit',
+        'Type': pd.Series(rng.integers(0, types, rows)).map(lambda i: f'Type{i}'),
+        'Flowrate': flow,
+        'Pressure': rng.normal(25, 5, rows),
+        'Temperature': rng.normal(75, 10, rows),
+    })
+
+
+def best_of(fn, df, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(df)
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1_000_000, 10_000_000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f'{"rows":>12}  {"legacy (s)":>11}  {"engine (s)":>11}  {"speedup":>8}')
+    for rows in args.rows:
+        df = make_frame(rows)
+        legacy = best_of(legacy_summary, df, args.repeat)
+        engine = best_of(summarize, df, args.repeat)
+        print(f'{rows:>12,}  {legacy:>11.4f}  {engine:>11.4f}  {legacy / engine:>7.2f}x')
+        # Extended statistics come from the same block, not extra column scans
+        extended = best_of(lambda d: summarize(d, extra=('std', 'nulls')), df, args.repeat)
+        print(f'{"":>12}  {"":>11}  {extended:>11.4f}  (with std, nulls)')
+
+
+if __name__ == '__main__':
+    main()